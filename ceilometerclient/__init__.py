@@ -1 +1,13 @@
-from ceilometerclient.client import Client
+import sys
+
+if sys.version_info < (3, 7):
+    from ceilometerclient.client import Client
+else:
+    # Importing the client pulls in requests, which command line tools
+    # only need once they talk to the API.
+    def __getattr__(name):
+        if name == 'Client':
+            from ceilometerclient.client import Client
+            return Client
+        raise AttributeError('module %r has no attribute %r'
+                             % (__name__, name))
@@ -0,0 +1,270 @@
+"""Client-side aggregation of events
+
+The API can only compute the sum or max of a meter. :class:`Aggregator`
+computes grouped and time-bucketed count, sum, min, max, average,
+percentiles and rate of change over :class:`records.EventBatch` columns.
+It uses NumPy when it is installed and falls back to pure Python
+otherwise, and can be fed batch by batch from a streamed iterator such
+as :meth:`Client.iter_events`.
+
+Starting from API event dicts, most of the time goes into building the
+batches: on 300,000 events with NumPy, about 1s in all against 4s for
+a plain loop over the dicts, of which the aggregation itself is 0.1s.
+``tools/bench_aggregate.py`` measures both.
+"""
+
+import itertools
+import math
+
+from ceilometerclient import records
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Per-key partial state: count, sum, min, max, first (timestamp, volume),
+# last (timestamp, volume) and, if percentiles are wanted, the volumes.
+_COUNT, _SUM, _MIN, _MAX, _FIRST, _LAST, _VALUES = range(7)
+
+
+def percentile(values, p):
+    """Returns the ``p``th percentile of sorted ``values``, interpolating
+    linearly between the closest ranks.
+    """
+    if not len(values):
+        return None
+    pos = (len(values) - 1) * p / 100.0
+    low = int(math.floor(pos))
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+class Aggregator(object):
+    """Accumulates statistics over batches of events.
+
+    Events are grouped by the string field ``group_by`` (None for a
+    single group) and, if ``bucket`` is given, by the start of the
+    ``bucket``-second time window they fall in. Events without a volume
+    or timestamp are ignored. ``percentiles`` lists the percentiles
+    (0-100) to report; they require keeping every volume.
+
+    Set ``use_numpy`` to False to force the pure Python implementation.
+    """
+
+    def __init__(self, group_by='resource_id', bucket=None, percentiles=(),
+                 use_numpy=None):
+        self.group_by = group_by
+        self.bucket = bucket
+        self.percentiles = tuple(percentiles)
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise ValueError('NumPy is not installed')
+        self.use_numpy = use_numpy
+        self._state = {}
+
+    def add_events(self, events, batch_size=65536):
+        """Adds an iterable of API event dicts, converting them to
+        batches of up to ``batch_size`` events.
+        """
+        events = iter(events)
+        while True:
+            batch = records.EventBatch.from_events(
+                itertools.islice(events, batch_size))
+            if not len(batch):
+                return
+            self.add(batch)
+
+    def add(self, batch):
+        """Adds the events of a :class:`records.EventBatch`."""
+        if not len(batch):
+            return
+        if self.use_numpy:
+            partials = self._partials_numpy(batch)
+        else:
+            partials = self._partials_python(batch)
+        for key, partial in partials:
+            self._merge(key, partial)
+
+    def _key(self, group, start):
+        if self.bucket is None:
+            return group
+        return (group, start)
+
+    def _partials_python(self, batch):
+        if self.group_by is None:
+            groups = itertools.repeat(None)
+        else:
+            groups = batch.column(self.group_by)
+        bucket = self.bucket
+        keep_values = bool(self.percentiles)
+        state = {}
+        for group, volume, timestamp in zip(groups, batch.volumes,
+                                            batch.timestamps):
+            if volume != volume or timestamp != timestamp:
+                continue  # NaN: missing
+            start = None
+            if bucket is not None:
+                start = float(math.floor(timestamp / bucket) * bucket)
+            key = self._key(group, start)
+            s = state.get(key)
+            if s is None:
+                state[key] = [1, volume, volume, volume,
+                              (timestamp, volume), (timestamp, volume),
+                              [volume] if keep_values else None]
+                continue
+            s[_COUNT] += 1
+            s[_SUM] += volume
+            if volume < s[_MIN]:
+                s[_MIN] = volume
+            if volume > s[_MAX]:
+                s[_MAX] = volume
+            if timestamp < s[_FIRST][0]:
+                s[_FIRST] = (timestamp, volume)
+            if timestamp >= s[_LAST][0]:
+                s[_LAST] = (timestamp, volume)
+            if keep_values:
+                s[_VALUES].append(volume)
+        return state.items()
+
+    def _partials_numpy(self, batch):
+        np = numpy
+        volumes = np.frombuffer(batch.volumes, dtype=np.float64)
+        timestamps = np.frombuffer(batch.timestamps, dtype=np.float64)
+        if self.group_by is None:
+            codes = np.zeros(len(batch), dtype=np.int64)
+            values = [None]
+        else:
+            codes = np.frombuffer(batch.codes(self.group_by),
+                                  dtype=np.intc).astype(np.int64)
+            values = batch.values(self.group_by)
+
+        ok = ~(np.isnan(volumes) | np.isnan(timestamps))
+        if not ok.all():
+            volumes, timestamps, codes = (volumes[ok], timestamps[ok],
+                                          codes[ok])
+        if not len(volumes):
+            return []
+
+        # One integer key per (group, bucket) pair.
+        if self.bucket is None:
+            keys = codes
+        else:
+            buckets = np.floor(timestamps / self.bucket).astype(np.int64)
+            low = buckets.min()
+            width = buckets.max() - low + 1
+            keys = codes * width + (buckets - low)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.ravel()
+
+        # Volumes sorted within each key give min, max and percentiles;
+        # timestamps sorted within each key give first and last.
+        by_volume = np.lexsort((volumes, inverse))
+        sorted_volumes = volumes[by_volume]
+        starts = np.searchsorted(inverse[by_volume], np.arange(len(unique)))
+        ends = np.append(starts[1:], len(volumes))
+        by_time = np.lexsort((timestamps, inverse))
+
+        sums = np.bincount(inverse, weights=volumes, minlength=len(unique))
+        firsts = by_time[starts]
+        lasts = by_time[ends - 1]
+
+        # Converted to lists up front: indexing NumPy arrays one element
+        # at a time is slow.
+        if self.bucket is None:
+            groups = [values[code] for code in unique.tolist()]
+            bucket_starts = itertools.repeat(None)
+        else:
+            group_codes, offsets = np.divmod(unique, width)
+            groups = [values[code] for code in group_codes.tolist()]
+            bucket_starts = ((offsets + low) *
+                             float(self.bucket)).tolist()
+        if self.percentiles:
+            chunks = np.split(sorted_volumes, starts[1:])
+        else:
+            chunks = itertools.repeat(None)
+
+        partials = []
+        for (group, start, count, total, low_volume, high_volume,
+             first_ts, first_volume, last_ts, last_volume, chunk) in zip(
+                groups, bucket_starts, (ends - starts).tolist(),
+                sums.tolist(), sorted_volumes[starts].tolist(),
+                sorted_volumes[ends - 1].tolist(),
+                timestamps[firsts].tolist(), volumes[firsts].tolist(),
+                timestamps[lasts].tolist(), volumes[lasts].tolist(),
+                chunks):
+            partials.append((self._key(group, start), [
+                count, total, low_volume, high_volume,
+                (first_ts, first_volume), (last_ts, last_volume), chunk]))
+        return partials
+
+    def _merge(self, key, partial):
+        s = self._state.get(key)
+        if s is None:
+            if partial[_VALUES] is not None:
+                partial[_VALUES] = [partial[_VALUES]]
+            self._state[key] = partial
+            return
+        s[_COUNT] += partial[_COUNT]
+        s[_SUM] += partial[_SUM]
+        s[_MIN] = min(s[_MIN], partial[_MIN])
+        s[_MAX] = max(s[_MAX], partial[_MAX])
+        if partial[_FIRST][0] < s[_FIRST][0]:
+            s[_FIRST] = partial[_FIRST]
+        if partial[_LAST][0] >= s[_LAST][0]:
+            s[_LAST] = partial[_LAST]
+        if partial[_VALUES] is not None:
+            s[_VALUES].append(partial[_VALUES])
+
+    def results(self):
+        """Returns a dict of statistics for each key.
+
+        Keys are the group value, or a (group value, bucket start) pair
+        when bucketing. Each value is a dict with ``count``, ``sum``,
+        ``min``, ``max``, ``avg``, ``rate`` (change in volume per second
+        between the first and last event, or None if they share a
+        timestamp) and one ``pNN`` entry per requested percentile.
+        """
+        results = {}
+        for key, s in self._state.items():
+            (first_ts, first_volume), (last_ts, last_volume) = (s[_FIRST],
+                                                                s[_LAST])
+            stats = {
+                'count': s[_COUNT],
+                'sum': s[_SUM],
+                'min': s[_MIN],
+                'max': s[_MAX],
+                'avg': s[_SUM] / s[_COUNT],
+                'rate': (None if last_ts == first_ts else
+                         (last_volume - first_volume) / (last_ts - first_ts)),
+            }
+            if self.percentiles:
+                volumes = self._sorted_values(s[_VALUES])
+                for p in self.percentiles:
+                    stats['p%g' % p] = float(percentile(volumes, p))
+            results[key] = stats
+        return results
+
+    def _sorted_values(self, chunks):
+        if self.use_numpy:
+            return numpy.sort(numpy.concatenate(
+                [numpy.asarray(chunk, dtype=numpy.float64)
+                 for chunk in chunks]))
+        values = []
+        for chunk in chunks:
+            values.extend(chunk)
+        values.sort()
+        return values
+
+
+def aggregate(events, **kwargs):
+    """Aggregates a :class:`records.EventBatch` or an iterable of API
+    event dicts. Keyword arguments are passed to :class:`Aggregator`.
+    """
+    aggregator = Aggregator(**kwargs)
+    if isinstance(events, records.EventBatch):
+        aggregator.add(events)
+    else:
+        aggregator.add_events(events)
+    return aggregator.results()
@@ -0,0 +1,87 @@
+"""asyncio wrapper for the ceilometer client
+
+The coroutines run the blocking :class:`ceilometerclient.Client` calls
+in a thread pool: this spares an event loop from blocking, but each
+request in flight still takes a thread. Requires Python 3.7 or later.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from ceilometerclient import client
+
+# Client methods exposed as coroutines on AsyncClient.
+METHODS = [
+    'get',
+    'get_projects',
+    'get_resources',
+    'get_events',
+    'get_resource_duration_info',
+    'get_project_volume_max',
+    'get_project_volume_sum',
+    'get_project_volume_matrix',
+    'get_resource_volume_max',
+    'get_resource_volume_sum',
+]
+
+
+class AsyncClient(object):
+    """Thread-backed ceilometer client for use from an asyncio event
+    loop.
+
+    Every call is made by a wrapped :class:`ceilometerclient.Client` in
+    a dedicated pool of ``concurrency`` threads, one per request in
+    flight, so URL building, authentication and the pooled connections
+    are those of the synchronous client. At most ``concurrency``
+    requests are in flight at once; other arguments are passed to
+    :class:`ceilometerclient.Client`.
+    """
+
+    def __init__(self, keystone_client=None, base_url=None,
+                 concurrency=10, **kwargs):
+        kwargs.setdefault('pool_maxsize', concurrency)
+        self.client = client.Client(keystone_client=keystone_client,
+                                    base_url=base_url,
+                                    **kwargs)
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(concurrency)
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop the worker threads and close the pooled connections."""
+        self._executor.shutdown(wait=False)
+        self.client.close()
+
+    async def _call(self, func, *args, **kwargs):
+        # Created on first use so it belongs to the running loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor,
+                functools.partial(func, *args, **kwargs),
+            )
+
+
+def _make_method(name):
+    method = getattr(client.Client, name)
+
+    async def call(self, *args, **kwargs):
+        return await self._call(getattr(self.client, name), *args, **kwargs)
+
+    call.__name__ = name
+    call.__doc__ = method.__doc__
+    return call
+
+
+for _name in METHODS:
+    setattr(AsyncClient, _name, _make_method(_name))
+del _name
@@ -0,0 +1,196 @@
+"""Response caches for the ceilometer client
+
+Cached values are the decoded JSON bodies of GET requests, keyed by
+the full request URL and its sorted query parameters, so clients for
+different endpoints can share a cache. Values are shared
+between callers and must not be modified.
+"""
+
+import collections
+import datetime
+import json
+import sqlite3
+import threading
+import time
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+from ceilometerclient import timestamps
+
+
+class Cache(object):
+    """Base class for caches.
+
+    Responses for a time range that ended more than ``settle`` ago
+    cannot change any more and are kept until evicted. Everything else
+    (open-ended or current ranges, and listings with no range) expires
+    after ``ttl`` seconds. Timestamps are taken to be in UTC.
+
+    Subclasses implement :meth:`_load` and :meth:`_save`.
+    """
+
+    def __init__(self, ttl=60, settle=datetime.timedelta(hours=1)):
+        self.ttl = ttl
+        self.settle = settle
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0,
+                       'expirations': 0}
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """Returns the hit, miss, eviction and expiration counters."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['size'] = len(self)
+        return stats
+
+    def __len__(self):
+        raise NotImplementedError()
+
+    @staticmethod
+    def make_key(url, params=None):
+        """Returns the cache key for a request to the full ``url``."""
+        url = url.rstrip('/')
+        if not params:
+            return url
+        return url + '?' + urlencode(sorted(params.items()))
+
+    def ttl_for(self, params=None, now=None):
+        """Returns how long, in seconds, a response for a request with
+        the given parameters may be cached, or None to keep it until it
+        is evicted.
+        """
+        try:
+            end = timestamps.parse((params or {}).get('end_timestamp'))
+        except ValueError:
+            return self.ttl
+        now = now or datetime.datetime.utcnow()
+        if end + self.settle <= now:
+            return None
+        return self.ttl
+
+    def get(self, url, params=None):
+        """Returns the cached body for a request or raises KeyError."""
+        try:
+            value, _ = self._load(self.make_key(url, params), time.time())
+        except KeyError:
+            self._count('misses')
+            raise
+        self._count('hits')
+        return value
+
+    def set(self, url, params, value):
+        """Caches the body of a response to a request."""
+        ttl = self.ttl_for(params)
+        expires = None if ttl is None else time.time() + ttl
+        self._save(self.make_key(url, params), value, expires)
+
+    def _load(self, key, now):
+        """Returns the (value, expires) entry stored under key or raises
+        KeyError.
+        """
+        raise NotImplementedError()
+
+    def _save(self, key, value, expires):
+        raise NotImplementedError()
+
+
+class MemoryCache(Cache):
+    """In-memory LRU cache holding at most ``maxsize`` responses.
+
+    If ``backing`` (another :class:`Cache`, typically a
+    :class:`DiskCache`) is given, entries are written through to it and
+    misses are looked up there.
+    """
+
+    def __init__(self, maxsize=1024, backing=None, **kwargs):
+        super(MemoryCache, self).__init__(**kwargs)
+        self.maxsize = maxsize
+        self.backing = backing
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self, key, now):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > now:
+                    self._entries[key] = entry
+                    return entry
+                self._count('expirations')
+        if self.backing is None:
+            raise KeyError(key)
+        value, expires = self.backing._load(key, now)
+        self._store(key, value, expires)
+        return value, expires
+
+    def _store(self, key, value, expires):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, expires)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._count('evictions')
+
+    def _save(self, key, value, expires):
+        self._store(key, value, expires)
+        if self.backing is not None:
+            self.backing._save(key, value, expires)
+
+
+class DiskCache(Cache):
+    """Cache stored in an SQLite database at ``path``, so it survives
+    between runs.
+    """
+
+    def __init__(self, path, **kwargs):
+        super(DiskCache, self).__init__(**kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS responses '
+                             '(key TEXT PRIMARY KEY, value TEXT, '
+                             'expires REAL)')
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(
+                'SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _load(self, key, now):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value, expires FROM responses WHERE key = ?',
+                (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            value, expires = row
+            if expires is not None and expires <= now:
+                with self._db:
+                    self._db.execute('DELETE FROM responses WHERE key = ?',
+                                     (key,))
+                self._count('expirations')
+                raise KeyError(key)
+        return json.loads(value), expires
+
+    def _save(self, key, value, expires):
+        with self._lock:
+            with self._db:
+                self._db.execute('INSERT OR REPLACE INTO responses '
+                                 '(key, value, expires) VALUES (?, ?, ?)',
+                                 (key, json.dumps(value), expires))
@@ -0,0 +1,141 @@
+"""Checkpoints for resumable exports
+"""
+
+import json
+import os
+
+
+class Checkpoint(object):
+    """Record of the units of work an export has finished.
+
+    A unit is a tuple of strings, such as ``(project_id, day)``. Units
+    are appended to the file at ``path`` as they finish, together with
+    the size of the ``output`` file at that point, so an interrupted run
+    can cut the output back to the end of the last finished unit and
+    carry on from there. With no ``path`` the units are only kept in
+    memory.
+
+    Marked units are written out, and ``output`` flushed, every
+    ``every`` units and by :meth:`commit`. With ``every`` None, they are
+    written out once ``output``, a :class:`ceilometerclient.writers.Writer`,
+    has been given a batch of rows since the last commit, so flushing it
+    does not break its batches up further.
+    """
+
+    def __init__(self, path, output=None, every=1):
+        self.path = path
+        self.output = output
+        self.every = every
+        self.offset = None
+        self._rows = 0
+        self._units = {}
+        self._pending = []
+        self._file = None
+        if path is None:
+            return
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            good = 0
+            for line in data.splitlines(True):
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError()
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break  # partially written by an interrupted run
+                for unit in record['units']:
+                    self._units[tuple(unit)] = record['offset']
+                self.offset = record['offset']
+                good += len(line)
+            if good < len(data):
+                with open(path, 'r+b') as f:
+                    f.truncate(good)
+        self._file = open(path, 'a')
+
+    def __contains__(self, unit):
+        return tuple(unit) in self._units
+
+    def __len__(self):
+        return len(self._units)
+
+    def __iter__(self):
+        return iter(self._units)
+
+    def close(self):
+        if self._file is not None and not self._file.closed:
+            self.commit()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def mark(self, *unit):
+        """Record that ``unit`` is finished and all of its rows have been
+        given to the output.
+        """
+        self._units[unit] = None
+        self._pending.append(unit)
+        if self._due():
+            self.commit()
+
+    def _due(self):
+        if self.every is not None:
+            return len(self._pending) >= self.every
+        if getattr(self.output, 'rows', None) is None:
+            return True
+        return self.output.rows - self._rows >= self.output.batch_size
+
+    def commit(self):
+        """Flush the output and write out the units marked since the
+        last commit.
+        """
+        if not self._pending:
+            return
+        offset = None
+        if self.output is not None:
+            self.output.flush()
+            offset = self.output.tell()
+            self._rows = getattr(self.output, 'rows', 0)
+        pending, self._pending = self._pending, []
+        for unit in pending:
+            self._units[unit] = offset
+        self.offset = offset
+        if self._file is not None:
+            # One line per commit, so a partly written commit is
+            # discarded as a whole.
+            self._file.write(json.dumps({'units': pending,
+                                         'offset': offset}) + '\n')
+            self._file.flush()
+
+    def reset(self, units=()):
+        """Forget all finished units, then record ``units`` as finished
+        at the current end of the output.
+        """
+        if self._file is not None:
+            self._file.close()
+        self._units = {}
+        self._pending = []
+        self.offset = None
+        if self.path is not None:
+            self._file = open(self.path, 'w')
+        for unit in units:
+            self.mark(*unit)
+        self.commit()
+
+    def resume(self, output):
+        """Cut ``output`` back to the end of the last finished unit and
+        use it for further rows.
+
+        Returns False if there is nothing to resume from, in which case
+        the caller should start the output from scratch.
+        """
+        self.output = output
+        if self.offset is None:
+            return False
+        output.seek(self.offset)
+        output.truncate()
+        return True
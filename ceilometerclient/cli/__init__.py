@@ -0,0 +1,34 @@
+"""The ceilometer-export command
+
+Each subcommand writes one report to a file::
+
+    ceilometer-export resources resources.csv
+    ceilometer-export bandwidth --days 7 bandwidth.csv
+"""
+
+import argparse
+import importlib
+
+# Subcommands, with the module implementing each and a description.
+COMMANDS = [
+    ('resources', 'ceilometerclient.cli.resources',
+     'Dump every resource, its type and lifetime.'),
+    ('bandwidth', 'ceilometerclient.cli.bandwidth',
+     'Dump the daily bandwidth of every project.'),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='ceilometer-export',
+        description='Dump ceilometer data to a file.')
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+    subparsers.required = True
+    modules = {}
+    for name, module_name, description in COMMANDS:
+        module = modules[name] = importlib.import_module(module_name)
+        subparser = subparsers.add_parser(name, help=description,
+                                          description=description)
+        module.add_arguments(subparser)
+    args = parser.parse_args(argv)
+    return modules[args.command].run(args, parser)
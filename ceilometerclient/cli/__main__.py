@@ -0,0 +1,5 @@
+import sys
+
+from ceilometerclient import cli
+
+sys.exit(cli.main())
@@ -0,0 +1,218 @@
+"""The bandwidth command: daily bandwidth totals of every project
+"""
+
+import datetime
+import os
+import sys
+
+from ceilometerclient import checkpoint
+from ceilometerclient.cli import common
+from ceilometerclient import pipeline
+from ceilometerclient import writers
+
+METER_FORMAT = 'akanda.bandwidth:%s.%s.%s'
+
+BANDWIDTH_CATEGORIES = ['internal', 'external']
+BANDWIDTH_TYPES = ['in', 'out']
+BANDWIDTH_VALUETYPES = ['packets', 'bytes']
+
+BANDWIDTH_FIELDS = ['project_id', 'date', 'category', 'type']
+BANDWIDTH_FIELDS.extend(BANDWIDTH_VALUETYPES)
+BANDWIDTH_FIELD_TYPES = dict((valuetype, float)
+                             for valuetype in BANDWIDTH_VALUETYPES)
+
+
+BANDWIDTH_ROWS = [(category, type_)
+                  for category in BANDWIDTH_CATEGORIES
+                  for type_ in BANDWIDTH_TYPES]
+BANDWIDTH_METERS = [METER_FORMAT % (category, type_, valuetype)
+                    for category, type_ in BANDWIDTH_ROWS
+                    for valuetype in BANDWIDTH_VALUETYPES]
+
+
+class RowCollector(list):
+    """A list of rows that can stand in for a csv writer."""
+
+    writerow = list.append
+
+
+def report_windows(days):
+    """Returns the (start, end) timestamps of each of the last ``days``
+    whole days, most recent first.
+    """
+    today = datetime.datetime.today().replace(hour=0,
+                                              minute=0,
+                                              second=0,
+                                              microsecond=0,
+                                              )
+    return [(today - datetime.timedelta(days=(i + 1)),
+             today - datetime.timedelta(days=i))
+            for i in range(days)]
+
+
+def dump_bandwidth(ceilometer, dumper, days, workers=1, checkpoint=None,
+                   skip=None, projects=None, stats=None):
+    """Writes the bandwidth rows of every project, or of ``projects`` if
+    given, for each of the last ``days`` days.
+
+    Fetching the volumes of a project, building its rows and writing
+    them run at the same time, as the stages of a pipeline.
+
+    Each finished (project_id, day) unit is marked in ``checkpoint``, if
+    given. Units in ``skip`` (by default, those already in
+    ``checkpoint``) are not fetched again. The stats of the stages are
+    added to the ``stats`` list, if given.
+
+    Returns the number of rows written.
+    """
+    windows = report_windows(days)
+    if skip is None:
+        skip = checkpoint if checkpoint is not None else ()
+
+    def list_projects():
+        for project_id in (ceilometer.get_projects() if projects is None
+                           else projects):
+            if project_id is None:
+                continue  # for some reason we get None sometimes
+
+            todo = [(start_timestamp, end_timestamp)
+                    for start_timestamp, end_timestamp in windows
+                    if (project_id, start_timestamp.isoformat())
+                    not in skip]
+            if todo:
+                yield project_id, todo
+
+    def fetch(work):
+        project_id, todo = work
+        matrix = ceilometer.get_project_volume_matrix(project_id,
+                                                      BANDWIDTH_METERS,
+                                                      todo,
+                                                      workers=workers,
+                                                      )
+        return [(project_id, todo, matrix)]
+
+    def build_rows(fetched):
+        project_id, todo, matrix = fetched
+        for (start_timestamp, end_timestamp), volumes in zip(todo, matrix):
+            volumes = iter(volumes)
+            rows = []
+            for category, type_ in BANDWIDTH_ROWS:
+                # row base fields
+                row_dict = dict(
+                    project_id=project_id,
+                    date=start_timestamp,
+                    category=category,
+                    type=type_,
+                    )
+
+                # fill in values for the row
+                for valuetype in BANDWIDTH_VALUETYPES:
+                    row_dict[valuetype] = next(volumes)
+
+                # only write the row if we have data
+                if any((row_dict.get(valuetype) is not None)
+                       for valuetype in BANDWIDTH_VALUETYPES):
+                    rows.append(row_dict)
+
+            # The rows of a unit travel together, so a failure cannot
+            # leave some of them written but the unit not marked.
+            yield rows, (project_id, start_timestamp.isoformat())
+
+    def write(unit_rows):
+        rows, unit = unit_rows
+        for row_dict in rows:
+            dumper.writerow(row_dict)
+        if checkpoint is not None:
+            checkpoint.mark(*unit)
+        return rows
+
+    flow = pipeline.Pipeline(list_projects(), [
+        pipeline.Stage('fetch', fetch, queue_size=workers),
+        pipeline.Stage('rows', build_rows, queue_size=2),
+        pipeline.Stage('write', write),
+    ])
+    flow.run()
+    if stats is not None:
+        stats.extend(flow.stats())
+    return flow.stats()[-1]['items_out']
+
+
+def update_bandwidth(ceilometer, filename, format, days, workers=1,
+                     done=None):
+    """Brings an existing export up to date with the last ``days`` days.
+
+    Only the (project_id, day) units that are not finished are fetched.
+    These are the units missing from ``done``, the checkpoint of an
+    interrupted export, or without one, those the file has no rows for.
+    They are merged with the rows of the existing file that are still
+    within the reported days, and the result replaces the file, sorted
+    by project with the most recent day first.
+    """
+    windows = report_windows(days)
+    dates = set(str(start_timestamp) for start_timestamp, _ in windows)
+
+    with open(filename, 'rb') as output:
+        existing = [row for row in writers.read_rows(output, format)
+                    if row['date'] in dates]
+    if done is None:
+        done = set(_unit(row) for row in existing)
+
+    fetched = checkpoint.Checkpoint(None)
+    rows = RowCollector()
+    dump_bandwidth(ceilometer, rows, days, workers,
+                   checkpoint=fetched,
+                   skip=done,
+                   )
+    for row in rows:
+        row['date'] = str(row['date'])
+
+    # Fetched units replace any rows the file already had for them.
+    rows.extend(row for row in existing if _unit(row) not in fetched)
+
+    # Stable sorts, from the least to the most significant column.
+    rows.sort(key=lambda row: BANDWIDTH_TYPES.index(row['type']))
+    rows.sort(key=lambda row: BANDWIDTH_CATEGORIES.index(row['category']))
+    rows.sort(key=lambda row: row['date'], reverse=True)
+    rows.sort(key=lambda row: row['project_id'])
+
+    partial = filename + '.partial'
+    with open(partial, 'wb') as output:
+        dumper = writers.FORMATS[format](output, BANDWIDTH_FIELDS,
+                                         types=BANDWIDTH_FIELD_TYPES)
+        dumper.writeheader()
+        dumper.writerows(rows)
+        dumper.close()
+    os.rename(partial, filename)
+
+
+def _unit(row):
+    return row['project_id'], row['date'].replace(' ', 'T')
+
+
+def dump(ceilometer, dumper, args, checkpoint=None, projects=None):
+    stats = [] if args.pipeline_stats else None
+    written = dump_bandwidth(ceilometer, dumper, args.days, args.workers,
+                             checkpoint=checkpoint, projects=projects,
+                             stats=stats)
+    if stats:
+        sys.stderr.write(pipeline.format_stats(stats))
+    return written
+
+
+def update(ceilometer, args, done):
+    update_bandwidth(ceilometer, args.filename, args.format, args.days,
+                     args.workers, done=done)
+
+
+REPORT = common.Report(BANDWIDTH_FIELDS, BANDWIDTH_FIELD_TYPES, dump)
+
+
+def add_arguments(parser):
+    common.add_arguments(parser)
+    parser.add_argument('--since-last-run', action='store_true',
+                        help='fetch only the days missing from an existing '
+                        'output file and merge them into it')
+
+
+def run(args, parser):
+    return common.export(REPORT, args, parser, update=update)
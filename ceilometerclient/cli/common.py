@@ -0,0 +1,253 @@
+"""Options and export loop shared by the ceilometer-export commands
+
+Modules that are slow to import (the client and requests, Keystone,
+multiprocessing) are only imported by the functions that use them, so
+``--help`` and argument errors return quickly.
+"""
+
+import collections
+import functools
+import os
+import sys
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+from ceilometerclient import checkpoint
+from ceilometerclient import metrics
+from ceilometerclient import writers
+
+# What a command exports: the output fields, their types, and a function
+# called as dump(ceilometer, dumper, args, checkpoint=None, projects=None)
+# writing the rows and returning their number.
+Report = collections.namedtuple('Report', 'fields types dump')
+
+
+def add_arguments(parser):
+    """Adds the options every export command takes."""
+    parser.add_argument('--os-auth_url', metavar='URL',
+                        default=os.environ.get('OS_AUTH_URL',
+                                               'http://localhost:5000/v2.0'),
+                        type=str, help='Keystone Authentication URL')
+    parser.add_argument('--os-username',
+                        default=os.environ.get('OS_USERNAME', None),
+                        type=str, help='Username for Keystone')
+    parser.add_argument('--os-password',
+                        default=os.environ.get('OS_PASSWORD'),
+                        type=str, help='Password for Keystone')
+    parser.add_argument('--os-tenant_name',
+                        default=os.environ.get('OS_TENANT_NAME'),
+                        type=str, help='Tenant name for Keystone')
+    parser.add_argument('--token-cache', metavar='FILE', type=str,
+                        help='file to keep the Keystone token and '
+                        'endpoint in between runs')
+    parser.add_argument('--base-url', default='http://localhost:8777',
+                        type=str, help='Ceilometer URL')
+    parser.add_argument('--days', metavar='N', type=int, default=1,
+                        help='number of days to include in the csvt')
+    parser.add_argument('--workers', metavar='N', type=int, default=1,
+                        help='number of concurrent API requests')
+    parser.add_argument('--rate-limit', metavar='N', type=float,
+                        help='send at most N API requests per second, '
+                        'shared between the processes')
+    parser.add_argument('--adaptive-concurrency', action='store_true',
+                        help='lower the number of concurrent API requests '
+                        'below --workers while the API is overloaded')
+    parser.add_argument('--timeout', metavar='SECONDS', type=float,
+                        help='give up on an API request, and retry it, '
+                        'after SECONDS without a response')
+    parser.add_argument('--hedge-after', metavar='SECONDS', type=float,
+                        help='send a second copy of an API request still '
+                        'unanswered after SECONDS')
+    parser.add_argument('--processes', metavar='N', type=int, default=1,
+                        help='number of processes to split the projects '
+                        'between; the output is sorted by project')
+    parser.add_argument('--checkpoint', metavar='FILE', type=str,
+                        help='file recording the finished work '
+                        '(default: the output file name + .checkpoint)')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue an interrupted export, appending '
+                        'only the missing rows')
+    parser.add_argument('--format', choices=sorted(writers.FORMATS),
+                        help='output format (default: guessed from the '
+                        'output file name, or csv)')
+    parser.add_argument('--metrics', choices=sorted(metrics.EXPORTS),
+                        help='print per-endpoint request metrics to stderr '
+                        'in this format when done')
+    parser.add_argument('--pipeline-stats', action='store_true',
+                        help='print the throughput and queue depth of each '
+                        'export stage to stderr when done')
+    parser.add_argument('filename', metavar='FILE', type=str,
+                        help='name of the output file')
+
+
+def make_client(args, hooks=()):
+    """Returns a client for the Keystone credentials or the base URL
+    given on the command line.
+    """
+    from ceilometerclient import client
+    from ceilometerclient import policy
+    from ceilometerclient import throttle
+    limits = {}
+    if args.timeout or args.hedge_after:
+        limits['policy'] = policy.RequestPolicy(timeout=args.timeout,
+                                                hedge_after=args.hedge_after)
+    if args.rate_limit:
+        limits['rate_limit'] = args.rate_limit / max(args.processes, 1)
+    if args.adaptive_concurrency:
+        limits['concurrency_limit'] = throttle.AdaptiveConcurrency(
+            initial=min(4, args.workers), maximum=args.workers)
+    if not args.os_username:
+        return client.Client(base_url=args.base_url,
+                             pool_maxsize=args.workers,
+                             hooks=hooks,
+                             **limits)
+
+    from ceilometerclient import credentials
+    insecure = urlparse(args.os_auth_url).scheme != 'https'
+
+    def keystone():
+        import keystoneclient.v2_0.client as ksclient
+        return ksclient.Client(username=args.os_username,
+                               password=args.os_password,
+                               tenant_name=args.os_tenant_name,
+                               auth_url=args.os_auth_url,
+                               insecure=insecure)
+    # Keystone is only contacted if the cached token is missing or
+    # has expired.
+    keystone_credentials = credentials.Credentials(
+        factory=keystone,
+        identity=(args.os_auth_url, args.os_username,
+                  args.os_tenant_name),
+        path=args.token_cache)
+    return client.Client(credentials=keystone_credentials,
+                         pool_maxsize=args.workers,
+                         hooks=hooks,
+                         **limits)
+
+
+def _collector(args):
+    if not args.metrics:
+        return [], None
+    collector = metrics.Metrics()
+    return [collector], collector
+
+
+def export_shard(report, args, index, projects):
+    """Exports ``projects`` to the partial output of shard ``index``,
+    with a client of its own.
+    """
+    from ceilometerclient import shards
+    hooks, collector = _collector(args)
+    ceilometer = make_client(args, hooks)
+    try:
+        with open(shards.path(args.filename, index), 'wb') as output:
+            dumper = writers.FORMATS[args.format](output, report.fields,
+                                                  types=report.types)
+            dumper.writeheader()
+            written = report.dump(ceilometer, dumper, args,
+                                  projects=projects)
+            dumper.close()
+        return written
+    finally:
+        ceilometer.close()
+        if collector is not None:
+            sys.stderr.write(metrics.EXPORTS[args.metrics](collector))
+
+
+def export_sharded(report, args):
+    """Exports with ``args.processes`` processes, each exporting some of
+    the projects, and merges their outputs into one sorted by project.
+    """
+    from ceilometerclient import shards
+    ceilometer = make_client(args)
+    try:
+        projects = ceilometer.get_projects()
+    finally:
+        ceilometer.close()
+    parts = shards.split(projects, args.processes)
+    timings = shards.run(functools.partial(export_shard, report, args),
+                         parts, args.processes)
+    shards.merge_files(args.filename, len(parts), args.format,
+                       report.fields, types=report.types)
+    sys.stderr.write(shards.format_timings(timings))
+
+
+def export(report, args, parser, update=None):
+    """Runs an export command.
+
+    If ``update`` is given and ``args.since_last_run`` is set, an
+    existing output file is brought up to date by calling
+    ``update(ceilometer, args, done)`` instead, where ``done`` is the
+    checkpoint of an interrupted run, or None if the file is complete.
+
+    The checkpoint is removed once the export has finished, so only an
+    interrupted export can be resumed.
+    """
+    since_last_run = getattr(args, 'since_last_run', False)
+    args.format = args.format or writers.guess_format(args.filename)
+    writer_class = writers.FORMATS[args.format]
+    if args.resume and not writer_class.resumable:
+        parser.error('%s output cannot be resumed' % args.format)
+
+    if args.processes > 1:
+        if args.resume or since_last_run:
+            parser.error('--resume and --since-last-run cannot be used '
+                         'with --processes')
+        return export_sharded(report, args)
+
+    hooks, collector = _collector(args)
+    ceilometer = make_client(args, hooks)
+
+    exists = os.path.exists(args.filename)
+    resume = args.resume and exists
+
+    try:
+        if not writer_class.resumable:
+            # The output cannot be cut back, so there is nothing for a
+            # checkpoint to resume from.
+            if update is not None and since_last_run and exists:
+                update(ceilometer, args, None)
+            else:
+                _write(report, args, ceilometer)
+            return
+
+        checkpoint_path = args.checkpoint or args.filename + '.checkpoint'
+        interrupted = os.path.exists(checkpoint_path)
+        with checkpoint.Checkpoint(checkpoint_path, every=None) as done:
+            if update is not None and since_last_run and exists:
+                update(ceilometer, args, done if interrupted else None)
+            else:
+                _write(report, args, ceilometer, done, resume)
+        os.remove(checkpoint_path)
+    finally:
+        ceilometer.close()
+        if collector is not None:
+            sys.stderr.write(metrics.EXPORTS[args.metrics](collector))
+
+
+def _write(report, args, ceilometer, done=None, resume=False):
+    writer_class = writers.FORMATS[args.format]
+    with open(args.filename, 'r+b' if resume else 'wb') as output:
+        resumed = done is not None and resume and done.resume(output)
+        if done is not None and not resumed:
+            output.seek(0)
+            output.truncate()
+            done.reset()
+        dumper = writer_class(output, report.fields, types=report.types)
+        if not resumed:
+            dumper.writeheader()
+        if done is None:
+            report.dump(ceilometer, dumper, args)
+        else:
+            # Units are written out as the writer fills a batch, rather
+            # than cutting its batches short.
+            done.output = dumper
+            try:
+                report.dump(ceilometer, dumper, args, checkpoint=done)
+            finally:
+                # Record the finished units while the output is open.
+                done.commit()
+        dumper.close()
@@ -0,0 +1,246 @@
+"""The resources command: one row per typed meter of every resource
+"""
+
+import collections
+import sys
+
+from ceilometerclient.cli import common
+from ceilometerclient import concurrency
+from ceilometerclient import pipeline
+
+
+RESOURCE_FIELDS = ['project_id', 'resource_id', 'name', 'display_name',
+                   'type', 'instance_flavor', 'network_id', 'cidr', 'mac',
+                   'ips', 'first_seen', 'last_seen', 'duration', 'size']
+RESOURCE_TYPES = {'duration': float, 'size': float}
+
+# Meter dispatch table. Each resource is listed with the meters recorded
+# for it, and the meter tells what kind of resource it is. Handlers
+# registered with meter_type() return the type-specific fields of the
+# row for such a meter, and name the follow-up API calls (see CALLS)
+# needed to complete it.
+_EXACT_METERS = {}
+_PREFIX_METERS = []
+_classified = {}
+
+
+def meter_type(type_, meter=None, prefix=None, calls=('duration',)):
+    """Registers the decorated function as the handler for resources
+    listed with ``meter``, or any meter starting with ``prefix``.
+
+    The function is called with the meter and the resource metadata
+    and returns a dict of row fields.
+    """
+    def register(func):
+        handler = (type_, func, tuple(calls))
+        if meter is not None:
+            _EXACT_METERS[meter] = handler
+        else:
+            _PREFIX_METERS.append((prefix, handler))
+        _classified.clear()
+        return func
+    return register
+
+
+def classify(meter):
+    """Returns the (type, handler, calls) registered for a meter, or
+    None if we do not report on it.
+    """
+    try:
+        return _classified[meter]
+    except KeyError:
+        pass
+    handler = _EXACT_METERS.get(meter)
+    if handler is None:
+        for prefix, candidate in _PREFIX_METERS:
+            if meter.startswith(prefix):
+                handler = candidate
+                break
+    _classified[meter] = handler
+    return handler
+
+
+@meter_type('instance', prefix='instance:')
+def _instance(meter, metadata):
+    return {'instance_flavor': meter.partition(':')[-1]}
+
+
+@meter_type('volume', 'volume.size', calls=('size', 'duration'))
+def _volume(meter, metadata):
+    return {}
+
+
+@meter_type('image', 'image.size')
+def _image(meter, metadata):
+    return {}
+
+
+@meter_type('network', 'network')
+def _network(meter, metadata):
+    return {}
+
+
+@meter_type('subnet', 'subnet')
+def _subnet(meter, metadata):
+    return {'network_id': metadata.get('network_id'),
+            'cidr': metadata.get('cidr'),
+            }
+
+
+@meter_type('port', 'port')
+def _port(meter, metadata):
+    return {'network_id': metadata.get('network_id'),
+            'mac': metadata.get('mac_address'),
+            'ips': ','.join([item['ip_address']
+                             for item in metadata.get('fixed_ips', [])
+                             if 'ip_address' in item]),
+            }
+
+
+def _fetch_duration(ceilometer, resource_id, meter):
+    duration_info = ceilometer.get_resource_duration_info(
+        resource_id=resource_id,
+        meter=meter,
+        )
+    return {'first_seen': duration_info.get('start_timestamp'),
+            'last_seen': duration_info.get('end_timestamp'),
+            'duration': duration_info.get('duration'),
+            }
+
+
+def _fetch_size(ceilometer, resource_id, meter):
+    return {'size': ceilometer.get_resource_volume_max(
+        resource_id=resource_id,
+        meter=meter,
+        )}
+
+
+# Follow-up API calls, by name, returning row fields.
+CALLS = {
+    'duration': _fetch_duration,
+    'size': _fetch_size,
+}
+
+
+def iter_planned_rows(ceilometer, checkpoint=None, projects=None):
+    """Classifies every meter of every resource in one pass.
+
+    Yields a ((project_id, resource_id, meter) unit, row, calls) tuple
+    for each row to write, where the row lacks the fields the calls,
+    (name, resource_id, meter) tuples, will fill in. Units already in
+    ``checkpoint`` are skipped. Only the resources of ``projects`` are
+    listed, if given.
+    """
+    if projects is None:
+        projects = ceilometer.get_projects()
+    for project_id in projects:
+        if project_id is None:
+            continue  # for some reason we get None sometimes
+
+        for resource in ceilometer.get_resources(project_id=project_id):
+            resource_id = resource['resource_id']
+            metadata = resource['metadata']
+            base = None
+            for item in resource['meter']:
+                meter = item.get('counter_name')
+                handler = classify(meter)
+                if handler is None:
+                    continue
+                unit = (project_id, resource_id, meter)
+                if checkpoint is not None and unit in checkpoint:
+                    continue
+                if base is None:
+                    base = dict.fromkeys(RESOURCE_FIELDS)
+                    base.update(project_id=project_id,
+                                resource_id=resource_id,
+                                name=metadata.get('name'),
+                                display_name=metadata.get('display_name'),
+                                size=metadata.get('size'),
+                                )
+                type_, fields, calls = handler
+                row = dict(base)
+                row['type'] = type_
+                row.update(fields(meter, metadata))
+                yield unit, row, [(name, resource_id, meter)
+                                  for name in calls]
+
+
+def run_plan(ceilometer, planned, workers=1):
+    """Makes the follow-up calls of a batch of planned rows, each
+    distinct call once and up to ``workers`` at a time, and returns the
+    completed (unit, row) pairs in order.
+    """
+    unique = list(collections.OrderedDict.fromkeys(
+        call for _, _, calls in planned for call in calls))
+
+    def fetch(call):
+        name, resource_id, meter = call
+        return CALLS[name](ceilometer, resource_id, meter)
+
+    results = dict(zip(unique, concurrency.imap_ordered(fetch, unique,
+                                                        workers=workers)))
+    rows = []
+    for unit, row, calls in planned:
+        for call in calls:
+            row.update(results[call])
+        rows.append((unit, row))
+    return rows
+
+
+def dump_resources(ceilometer, dumper, workers=1, checkpoint=None,
+                   batch_size=1000, projects=None, stats=None):
+    """Writes a row for every typed meter of every resource.
+
+    Listing the resources, making the API calls the rows need and
+    writing them run at the same time, as the stages of a pipeline.
+    Rows are planned in batches of ``batch_size``, and the API calls
+    each batch needs are made with up to ``workers`` in flight. Rows are
+    still written in the order the server lists the resources.
+
+    Each row written is marked in ``checkpoint`` as a (project_id,
+    resource_id, meter) unit, if given, and units already marked there
+    are skipped. Only ``projects`` are exported, if given. The stats of
+    the stages are added to the ``stats`` list, if given.
+
+    Returns the number of rows written.
+    """
+    def fetch(batch):
+        return run_plan(ceilometer, batch, workers)
+
+    def write(planned):
+        unit, row = planned
+        dumper.writerow(row)
+        if checkpoint is not None:
+            checkpoint.mark(*unit)
+        return (row,)
+
+    flow = pipeline.Pipeline(
+        pipeline.batches(iter_planned_rows(ceilometer, checkpoint, projects),
+                         batch_size),
+        [pipeline.Stage('fetch', fetch, queue_size=2),
+         pipeline.Stage('write', write, queue_size=batch_size)])
+    flow.run()
+    if stats is not None:
+        stats.extend(flow.stats())
+    return flow.stats()[-1]['items_out']
+
+
+def dump(ceilometer, dumper, args, checkpoint=None, projects=None):
+    stats = [] if args.pipeline_stats else None
+    written = dump_resources(ceilometer, dumper, args.workers,
+                             checkpoint=checkpoint, projects=projects,
+                             stats=stats)
+    if stats:
+        sys.stderr.write(pipeline.format_stats(stats))
+    return written
+
+
+REPORT = common.Report(RESOURCE_FIELDS, RESOURCE_TYPES, dump)
+
+
+def add_arguments(parser):
+    common.add_arguments(parser)
+
+
+def run(args, parser):
+    return common.export(REPORT, args, parser)
@@ -1,53 +1,334 @@
 """Client wrapper
 """
 
-import copy
+import collections
+import datetime
 
 import requests
+from requests.adapters import HTTPAdapter
+try:
+    from urllib3.util.retry import Retry
+except ImportError:
+    from requests.packages.urllib3.util.retry import Retry
+
+from ceilometerclient import concurrency
+from ceilometerclient import credentials as credentials_
+from ceilometerclient import decoding
+from ceilometerclient import jsonstream
+from ceilometerclient import metrics
+from ceilometerclient import ranges
+from ceilometerclient import throttle
+
+# Length of the windows iter_events fetches a time range in by default.
+EVENTS_WINDOW = datetime.timedelta(days=1)
 
 
 class Client(object):
     """Ceilometer client.
+
+    Requests go through a :class:`requests.Session` so TCP (and TLS)
+    connections to the API are kept alive and reused between calls.
+    ``pool_maxsize`` bounds the connections kept per host and, with
+    ``pool_block`` set, is also a hard limit on concurrent connections.
+    Connection errors and resets are retried ``max_retries`` times with
+    exponential backoff.
+
+    A ``policy``, a :class:`ceilometerclient.policy.RequestPolicy`, sets
+    per-endpoint timeouts, retries with jittered backoff and hedged
+    requests. Only connecting is then retried at the connection level,
+    and the policy retries the rest.
+
+    If ``cache`` (a :class:`ceilometerclient.cache.Cache`) is given, the
+    decoded responses of the query methods are cached in it.
+
+    Concurrent identical GETs made through the query methods share one
+    request unless ``single_flight`` is False.
+
+    The methods querying a time range take an optional ``planner``, a
+    :class:`ceilometerclient.ranges.RangePlanner`, to fetch long ranges
+    in windows.
+
+    The endpoint and token of ``keystone_client`` are cached in a
+    :class:`ceilometerclient.credentials.Credentials` shared by every
+    client using the same Keystone credentials, unless ``credentials``
+    is passed instead. A request rejected with 401 Unauthorized is sent
+    once more with a new token.
+
+    Response bodies are decoded by ``decoder``, the name of a
+    :mod:`ceilometerclient.decoding` backend or a function, by default
+    the fastest installed. Decoded values may be shared with the cache
+    and other callers, and must not be modified.
+
+    If ``store`` (a :class:`ceilometerclient.store.EventStore`) is
+    given, events fetched for a time range are kept in it, and only the
+    parts of a range it does not cover are requested from the server by
+    :meth:`get_events` and the resource volume methods.
+
+    ``rate_limit`` caps the requests sent per second; it is a number, or
+    a :class:`ceilometerclient.throttle.TokenBucket` to share between
+    clients. ``concurrency_limit``, a
+    :class:`ceilometerclient.throttle.AdaptiveConcurrency`, limits the
+    requests in flight and adapts the limit to the health of the server.
+
+    ``hooks`` is a list of :class:`ceilometerclient.metrics.Hook`
+    objects, such as :class:`ceilometerclient.metrics.Metrics`, called
+    around every request.
     """
 
     def __init__(self, keystone_client=None,
                  base_url=None,
                  service_type="metering",
-                 endpoint_type="adminURL"):
-        if not keystone_client and not base_url:
+                 endpoint_type="adminURL",
+                 pool_connections=10,
+                 pool_maxsize=10,
+                 pool_block=False,
+                 max_retries=3,
+                 backoff_factor=0.1,
+                 cache=None,
+                 single_flight=True,
+                 hooks=(),
+                 credentials=None,
+                 decoder=None,
+                 store=None,
+                 rate_limit=None,
+                 concurrency_limit=None,
+                 policy=None):
+        if not keystone_client and not base_url and credentials is None:
             raise ValueError("Need to pass either keystone_client or base_url")
 
-        self.keystone_client = keystone_client
-        if keystone_client:
-            base_url = keystone_client.service_catalog.get_endpoints(
-                service_type=service_type,
-                endpoint_type=endpoint_type)
-            self.base_url = base_url[service_type][0][endpoint_type].rstrip("/")
+        if credentials is None and keystone_client:
+            credentials = credentials_.Credentials.for_keystone_client(
+                keystone_client)
+        self.credentials = credentials
+        if credentials is not None:
+            self.base_url = credentials.endpoint(service_type, endpoint_type)
         else:
             self.base_url = base_url
         self.version = 'v1'
+        self.cache = cache
+        self.single_flight = (concurrency.SingleFlight() if single_flight
+                              else None)
+        if rate_limit is not None and not isinstance(rate_limit,
+                                                     throttle.TokenBucket):
+            rate_limit = throttle.TokenBucket(rate_limit)
+        self.rate_limit = rate_limit
+        self.concurrency_limit = concurrency_limit
+        # The limits come first, so the other hooks do not count the
+        # time spent waiting for them.
+        self.hooks = [limit for limit in (rate_limit, concurrency_limit)
+                      if limit is not None] + list(hooks)
+        self.decode = decoding.get_decoder(decoder)
+        self.store = store
+
+        self.policy = policy
+        retries = Retry(total=max_retries,
+                        connect=max_retries,
+                        read=max_retries if policy is None else 0,
+                        status=0,
+                        backoff_factor=backoff_factor,
+                        )
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block,
+                              max_retries=retries,
+                              )
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        """Close the pooled connections held by the client."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def pool_stats(self):
+        """Returns connection reuse counters for the pools held by the
+        client.
+
+        ``requests`` is the number of HTTP requests sent,
+        ``new_connections`` the number of connections opened to serve
+        them and ``pool_hits`` the number of requests that reused an
+        already open connection.
+        """
+        stats = {'requests': 0, 'new_connections': 0}
+        adapters = set(self.session.adapters.values())
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                stats['requests'] += pool.num_requests
+                stats['new_connections'] += pool.num_connections
+        stats['pool_hits'] = max(stats['requests'] - stats['new_connections'],
+                                 0)
+        return stats
 
     def get(self, url, **kwargs):
         """Emit a get request with the Keystone authentication token set in
         headers.
 
         """
-        if self.keystone_client:
-            if 'headers' in kwargs:
-                kwargs['headers']['X-Auth-Token'] = self.keystone_client.auth_token
+        full_url = self._full_url(url)
+        if self.credentials is None:
+            return self._send(url, full_url, kwargs)
+
+        token = self.credentials.token()
+        if 'headers' in kwargs:
+            kwargs['headers']['X-Auth-Token'] = token
+        else:
+            kwargs['headers'] = {'X-Auth-Token': token}
+        r = self._send(url, full_url, kwargs)
+        if r.status_code == requests.codes.unauthorized:
+            # The token may have been revoked or expired early.
+            r.close()
+            headers = dict(kwargs['headers'])
+            headers['X-Auth-Token'] = self.credentials.refresh(stale=token)
+            kwargs['headers'] = headers
+            r = self._send(url, full_url, kwargs)
+        return r
+
+    @property
+    def keystone_client(self):
+        if self.credentials is None:
+            return None
+        return self.credentials.keystone_client
+
+    def _full_url(self, url):
+        return '/'.join([self.base_url,
+                         self.version,
+                         url.lstrip('/'),
+                         ])
+
+    def _send(self, url, full_url, kwargs):
+        if self.policy is None:
+            return self._attempt(url, full_url, kwargs)
+        return self.policy.send(
+            lambda kwargs: self._attempt(url, full_url, kwargs),
+            url, kwargs)
+
+    def _attempt(self, url, full_url, kwargs):
+        if not self.hooks:
+            return self.session.get(full_url, **kwargs)
+
+        request = metrics.Request(url, kwargs.get('params'))
+        # Hooks whose before() has run, and whose after() must, since
+        # a limit may be holding a slot for the request.
+        entered = []
+        try:
+            for hook in self.hooks:
+                hook.before(request)
+                entered.append(hook)
+            request.started = metrics.clock()
+            request.response = self.session.get(full_url, **kwargs)
+        except BaseException as e:
+            request.error = e
+            raise
+        finally:
+            if request.started is not None:
+                request.elapsed = metrics.clock() - request.started
+            self._after(entered, request)
+        return request.response
+
+    @staticmethod
+    def _after(hooks, request):
+        """Calls the after() method of every hook, even if some raise.
+        The first error is raised unless the request itself failed.
+        """
+        error = None
+        for hook in hooks:
+            try:
+                hook.after(request)
+            except Exception as e:
+                error = error or e
+        if error is not None and request.error is None:
+            raise error
+
+    def cache_stats(self):
+        """Returns the counters of the response cache, or None if the
+        client has no cache.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.stats()
+
+    def single_flight_stats(self):
+        """Returns the number of query requests made and the number
+        ``saved`` by sharing an identical request already in flight, or
+        None if single-flight is off.
+        """
+        if self.single_flight is None:
+            return None
+        return self.single_flight.stats()
+
+    def policy_stats(self):
+        """Returns the timeout, retry and hedging counters of the request
+        policy, or None if there is none.
+        """
+        if self.policy is None:
+            return None
+        return self.policy.stats()
+
+    def throttle_stats(self):
+        """Returns the stats of the rate and concurrency limits, under
+        ``rate_limit`` and ``concurrency_limit``, for those set.
+        """
+        stats = {}
+        if self.rate_limit is not None:
+            stats['rate_limit'] = self.rate_limit.stats()
+        if self.concurrency_limit is not None:
+            stats['concurrency_limit'] = self.concurrency_limit.stats()
+        return stats
+
+    def _get_json(self, url, params=None, not_found=None, key=None,
+                  default=None):
+        """Returns the decoded body of a GET request, or only its ``key``
+        item (``default`` if missing), answering from the cache when
+        possible and sharing identical requests in flight.
+
+        If ``not_found`` is given, a 404 response raises ValueError with
+        that message.
+        """
+        body = None
+        full_url = self._full_url(url)
+        if self.cache is not None:
+            try:
+                body = self.cache.get(full_url, params)
+            except KeyError:
+                pass
+        if body is None:
+            if self.single_flight is None:
+                body = self._fetch_json(url, params, not_found)
             else:
-                kwargs['headers'] = {'X-Auth-Token': self.keystone_client.auth_token}
+                body = self.single_flight.do(
+                    (full_url,
+                     tuple(sorted(params.items())) if params else None),
+                    self._fetch_json, url, params, not_found)
+        if key is None:
+            return body
+        return body.get(key, default)
 
-        return requests.get('/'.join([self.base_url,
-                                      self.version,
-                                      url.lstrip('/'),
-                                  ]),
-                            **kwargs)
+    def _fetch_json(self, url, params, not_found):
+        if params is None:
+            r = self.get(url)
+        else:
+            r = self.get(url, params=params)
+        if not_found and r.status_code == requests.codes.not_found:
+            raise ValueError(not_found)
+        body = self.decode(r.content)
+
+        if self.cache is not None and r.status_code == requests.codes.ok:
+            self.cache.set(self._full_url(url), params, body)
+        return body
 
     def get_projects(self):
         """Returns list of project ids known to the server."""
-        r = self.get('/projects')
-        return r.json.get('projects', [])
+        return self._get_json('/projects', key='projects', default=[])
 
     def get_resources(self, project_id, start_timestamp=None,
                       end_timestamp=None):
@@ -58,34 +339,117 @@ class Client(object):
         if end_timestamp:
             args['end_timestamp'] = end_timestamp.isoformat()
 
-        r = self.get('/projects/%s/resources' % project_id,
-                     params=args)
-        if r.status_code == requests.codes.not_found:
-            raise ValueError('Unknown project %r' % project_id)
-        return r.json.get('resources', [])
+        return self._get_json('/projects/%s/resources' % project_id,
+                              params=args,
+                              not_found='Unknown project %r' % project_id,
+                              key='resources', default=[])
 
     def get_events(self, resource_id, meter, start_timestamp=None,
-                      end_timestamp=None):
-        """Returns events about the resource in the time range."""
+                      end_timestamp=None, planner=None):
+        """Returns events about the resource in the time range.
+
+        If a :class:`ceilometerclient.ranges.RangePlanner` is given, a
+        range with both ends set is fetched in windows.
+        """
+        if planner is not None and start_timestamp and end_timestamp:
+            return planner.run(
+                lambda start, end: self.get_events(resource_id, meter,
+                                                   start, end),
+                start_timestamp, end_timestamp, ranges.concatenate, size=len)
+
+        if self.store is not None and start_timestamp and end_timestamp:
+            return self._get_stored_events(resource_id, meter,
+                                           start_timestamp, end_timestamp)
+
+        return self._fetch_events(resource_id, meter, start_timestamp,
+                                  end_timestamp)
+
+    def _fetch_events(self, resource_id, meter, start_timestamp,
+                      end_timestamp):
         args = {}
         if start_timestamp:
             args['start_timestamp'] = start_timestamp.isoformat()
         if end_timestamp:
             args['end_timestamp'] = end_timestamp.isoformat()
 
-        r = self.get('/resources/%s/meters/%s' % (resource_id, meter),
-                     params=args)
-        if r.status_code == requests.codes.not_found:
-            raise ValueError('Unknown resource %r' % resource_id)
-        return r.json.get('events', [])
+        return self._get_json('/resources/%s/meters/%s' % (resource_id, meter),
+                              params=args,
+                              not_found='Unknown resource %r' % resource_id,
+                              key='events', default=[])
+
+    def _get_stored_events(self, resource_id, meter, start_timestamp,
+                           end_timestamp):
+        """Returns events of the range from the store, fetching and
+        storing those of the parts it does not cover.
+        """
+        fetched = [((start, end), self._fetch_events(resource_id, meter,
+                                                     start, end))
+                   for start, end in self.store.gaps(
+                       resource_id, meter, start_timestamp, end_timestamp)]
+        events = self.store.events(resource_id, meter, start_timestamp,
+                                   end_timestamp)
+        for (start, end), gap_events in fetched:
+            self.store.add(resource_id, meter, start, end, gap_events)
+            events.extend(gap_events)
+        if fetched:
+            events.sort(key=lambda event: event['timestamp'])
+        return events
+
+    def iter_events(self, resource_id, meter, start_timestamp=None,
+                    end_timestamp=None, window=EVENTS_WINDOW,
+                    chunk_size=65536):
+        """Yields events about the resource in the time range one at a
+        time.
+
+        Response bodies are parsed incrementally as they are read, so
+        only one event is held in memory at once. When both timestamps
+        are given, the range is fetched in consecutive windows of
+        ``window`` (a :class:`datetime.timedelta`, one day by default)
+        so no single response covers the whole range; pass None to
+        fetch it in one request. A range open at either end is always
+        fetched in one request.
+        """
+        if window and start_timestamp and end_timestamp:
+            windows = []
+            while start_timestamp < end_timestamp:
+                windows.append((start_timestamp,
+                                min(start_timestamp + window, end_timestamp)))
+                start_timestamp += window
+        else:
+            windows = [(start_timestamp, end_timestamp)]
+
+        for start, end in windows:
+            args = {}
+            if start:
+                args['start_timestamp'] = start.isoformat()
+            if end:
+                args['end_timestamp'] = end.isoformat()
+
+            r = self.get('/resources/%s/meters/%s' % (resource_id, meter),
+                         params=args,
+                         stream=True)
+            try:
+                if r.status_code == requests.codes.not_found:
+                    raise ValueError('Unknown resource %r' % resource_id)
+                chunks = r.iter_content(chunk_size)
+                for event in jsonstream.iter_items(chunks, 'events'):
+                    yield event
+            finally:
+                r.close()
 
     def get_resource_duration_info(self, resource_id, meter,
             start_timestamp=None, end_timestamp=None,
-            search_offset=0,
+            search_offset=0, planner=None,
             ):
         """Returns duration, min, and max timestamp of the resource
         for the given meter within the time range.
         """
+        if planner is not None and start_timestamp and end_timestamp:
+            return planner.run(
+                lambda start, end: self.get_resource_duration_info(
+                    resource_id, meter, start, end, search_offset),
+                start_timestamp, end_timestamp, ranges.durations)
+
         args = {'search_offset': search_offset,
                 }
         if start_timestamp:
@@ -93,17 +457,54 @@ class Client(object):
         if end_timestamp:
             args['end_timestamp'] = end_timestamp.isoformat()
 
-        r = self.get('/resources/%s/meters/%s/duration' % (resource_id, meter),
-                     params=args)
-        if r.status_code == requests.codes.not_found:
-            raise ValueError('Unknown resource %r' % resource_id)
-        return copy.copy(r.json)
+        return self._get_json('/resources/%s/meters/%s/duration' %
+                              (resource_id, meter),
+                              params=args,
+                              not_found='Unknown resource %r' % resource_id)
+
+    def iter_resources_duration_info(self, pairs, start_timestamp=None,
+            end_timestamp=None, search_offset=0, workers=4):
+        """Yields ((resource_id, meter), duration info) for each of the
+        (resource_id, meter) ``pairs``, as each response arrives.
+
+        The v1 API has no bulk query, so the individual calls are made
+        with up to ``workers`` in flight. Repeated pairs are only
+        fetched, and yielded, once.
+        """
+        unique = collections.OrderedDict.fromkeys(
+            (resource_id, meter) for resource_id, meter in pairs)
+
+        def fetch(pair):
+            resource_id, meter = pair
+            return pair, self.get_resource_duration_info(
+                resource_id, meter, start_timestamp, end_timestamp,
+                search_offset)
+
+        return concurrency.imap_unordered(fetch, unique, workers=workers)
+
+    def get_resources_duration_info(self, pairs, start_timestamp=None,
+            end_timestamp=None, search_offset=0, workers=4):
+        """Returns a dict mapping each of the (resource_id, meter)
+        ``pairs`` to its duration info, fetched with up to ``workers``
+        calls in flight. See :meth:`iter_resources_duration_info`.
+        """
+        return dict(self.iter_resources_duration_info(
+            pairs, start_timestamp, end_timestamp, search_offset, workers))
 
     def _get_project_sum_or_max(self, sum_or_max, project_id, meter,
-            start_timestamp=None, end_timestamp=None, search_offset=0):
+            start_timestamp=None, end_timestamp=None, search_offset=0,
+            planner=None):
         """Returns the total or max volume for the specified meter for a
         project within the time range.
         """
+        if planner is not None and start_timestamp and end_timestamp:
+            return planner.run(
+                lambda start, end: self._get_project_sum_or_max(
+                    sum_or_max, project_id, meter, start, end,
+                    search_offset),
+                start_timestamp, end_timestamp,
+                ranges.add if sum_or_max == 'sum' else ranges.maximum)
+
         args = {'search_offset': search_offset,
                 }
         if start_timestamp:
@@ -111,13 +512,14 @@ class Client(object):
         if end_timestamp:
             args['end_timestamp'] = end_timestamp.isoformat()
 
-        r = self.get(('/projects/%s/meters/%s/volume/%s' %
-                      (project_id, meter, sum_or_max)),
-                     params=args)
-        return r.json.get('volume')
+        return self._get_json(('/projects/%s/meters/%s/volume/%s' %
+                               (project_id, meter, sum_or_max)),
+                              params=args,
+                              key='volume')
 
     def get_project_volume_max(self, project_id, meter,
-            start_timestamp=None, end_timestamp=None, search_offset=0):
+            start_timestamp=None, end_timestamp=None, search_offset=0,
+            planner=None):
         """Returns the max volume for the specified meter for a project
         within the time range.
         """
@@ -127,10 +529,12 @@ class Client(object):
                                             start_timestamp,
                                             end_timestamp,
                                             search_offset,
+                                            planner,
                                             )
 
     def get_project_volume_sum(self, project_id, meter,
-            start_timestamp=None, end_timestamp=None, search_offset=0):
+            start_timestamp=None, end_timestamp=None, search_offset=0,
+            planner=None):
         """Returns the total volume for the specified meter for a project
         within the time range.
         """
@@ -140,15 +544,114 @@ class Client(object):
                                             start_timestamp,
                                             end_timestamp,
                                             search_offset,
+                                            planner,
                                             )
 
+    def get_fleet_volume(self, meter, sum_or_max='sum', start_timestamp=None,
+            end_timestamp=None, projects=None, workers=8):
+        """Returns the total (or max) volume of a meter for every project
+        within the time range, and over all of them.
+
+        The projects are those of ``get_projects()`` unless ``projects``
+        is given, and are queried with up to ``workers`` calls in flight.
+        A project whose query fails does not stop the others; the result
+        is a dict of the ``volumes`` by project id, the ``total`` (or
+        max) of those volumes, and the ``errors`` by project id, as
+        exceptions.
+        """
+        if sum_or_max not in ('sum', 'max'):
+            raise ValueError('Expected sum or max, got %r' % (sum_or_max,))
+        if projects is None:
+            projects = self.get_projects()
+        projects = [project_id for project_id in projects
+                    if project_id is not None]
+
+        def fetch(project_id):
+            try:
+                return project_id, self._get_project_sum_or_max(
+                    sum_or_max, project_id, meter, start_timestamp,
+                    end_timestamp), None
+            except Exception as e:
+                return project_id, None, e
+
+        volumes = {}
+        errors = {}
+        for project_id, volume, error in concurrency.imap_unordered(
+                fetch, collections.OrderedDict.fromkeys(projects),
+                workers=workers):
+            if error is not None:
+                errors[project_id] = error
+            else:
+                volumes[project_id] = volume
+        merge = ranges.add if sum_or_max == 'sum' else ranges.maximum
+        return {'volumes': volumes,
+                'total': merge(volumes.values()),
+                'errors': errors,
+                }
+
+    def get_project_volume_matrix(self, project_id, meters, windows,
+            sum_or_max='sum', workers=4):
+        """Returns the total (or max) volume of several meters over several
+        time windows for a project.
+
+        ``windows`` is a list of (start_timestamp, end_timestamp) pairs.
+        The result has one row per window holding one value per meter,
+        both in the order given. The v1 API has no bulk query, so the
+        individual calls are made with up to ``workers`` in flight and
+        repeated (meter, window) pairs are only fetched once.
+        """
+        keys = [(meter, tuple(window))
+                for window in windows
+                for meter in meters]
+        unique = list(collections.OrderedDict.fromkeys(keys))
+
+        def fetch(key):
+            meter, (start_timestamp, end_timestamp) = key
+            return self._get_project_sum_or_max(sum_or_max,
+                                                project_id,
+                                                meter,
+                                                start_timestamp,
+                                                end_timestamp,
+                                                )
+
+        values = dict(zip(unique, concurrency.imap_ordered(fetch, unique,
+                                                           workers=workers)))
+        return [[values[(meter, tuple(window))] for meter in meters]
+                for window in windows]
+
     def _get_resource_sum_or_max(self, sum_or_max, resource_id, meter,
             start_timestamp=None, end_timestamp=None,
-            search_offset=0,
+            search_offset=0, planner=None,
             ):
         """Returns the total or max volume for the specified meter for
         a resource within the time range.
         """
+        if planner is not None and start_timestamp and end_timestamp:
+            return planner.run(
+                lambda start, end: self._get_resource_sum_or_max(
+                    sum_or_max, resource_id, meter, start, end,
+                    search_offset),
+                start_timestamp, end_timestamp,
+                ranges.add if sum_or_max == 'sum' else ranges.maximum)
+
+        if (self.store is not None and start_timestamp and end_timestamp
+                and not search_offset):
+            # Stored events answer the covered parts of the range.
+            values = [self.store.volume(resource_id, meter, start_timestamp,
+                                        end_timestamp, sum_or_max)]
+            values.extend(self._fetch_resource_sum_or_max(
+                sum_or_max, resource_id, meter, start, end, search_offset)
+                for start, end in self.store.gaps(
+                    resource_id, meter, start_timestamp, end_timestamp))
+            merge = ranges.add if sum_or_max == 'sum' else ranges.maximum
+            return merge(values)
+
+        return self._fetch_resource_sum_or_max(sum_or_max, resource_id,
+                                               meter, start_timestamp,
+                                               end_timestamp, search_offset)
+
+    def _fetch_resource_sum_or_max(self, sum_or_max, resource_id, meter,
+            start_timestamp, end_timestamp, search_offset):
         args = {'search_offset': search_offset,
                 }
         if start_timestamp:
@@ -156,14 +659,14 @@ class Client(object):
         if end_timestamp:
             args['end_timestamp'] = end_timestamp.isoformat()
 
-        r = self.get('/resources/%s/meters/%s/volume/%s' %
-                     (resource_id, meter, sum_or_max),
-                     params=args)
-        return r.json.get('volume')
+        return self._get_json('/resources/%s/meters/%s/volume/%s' %
+                              (resource_id, meter, sum_or_max),
+                              params=args,
+                              key='volume')
 
     def get_resource_volume_max(self, resource_id, meter,
             start_timestamp=None, end_timestamp=None,
-            search_offset=0,
+            search_offset=0, planner=None,
             ):
         return self._get_resource_sum_or_max('max',
                                              resource_id,
@@ -171,11 +674,12 @@ class Client(object):
                                              start_timestamp,
                                              end_timestamp,
                                              search_offset,
+                                             planner,
                                              )
 
     def get_resource_volume_sum(self, resource_id, meter,
             start_timestamp=None, end_timestamp=None,
-            search_offset=0,
+            search_offset=0, planner=None,
             ):
         """Returns the total volume for the specified meter for a resource
         within the time range.
@@ -186,4 +690,5 @@ class Client(object):
                                              start_timestamp,
                                              end_timestamp,
                                              search_offset,
+                                             planner,
                                              )
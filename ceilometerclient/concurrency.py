@@ -0,0 +1,295 @@
+"""Thread pool helpers for issuing client calls concurrently
+"""
+
+import collections
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class CancelledError(Exception):
+    """Raised when the result of a cancelled call is requested."""
+
+
+class Future(object):
+    """Result of a call submitted to a :class:`ThreadPool`.
+    """
+
+    _PENDING, _RUNNING, _DONE, _CANCELLED = range(4)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._state = self._PENDING
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+
+    def _finish(self, result=None, exception=None):
+        with self._lock:
+            if self._state in (self._DONE, self._CANCELLED):
+                return False
+            self._state = self._DONE
+            self._result = result
+            self._exception = exception
+            callbacks, self._callbacks = self._callbacks, []
+        self._event.set()
+        for callback in callbacks:
+            callback(self)
+        return True
+
+    def set_running(self):
+        """Mark the call as started. Returns False if it was cancelled."""
+        with self._lock:
+            if self._state != self._PENDING:
+                return False
+            self._state = self._RUNNING
+            return True
+
+    def set_result(self, result):
+        return self._finish(result=result)
+
+    def set_exception(self, exception):
+        return self._finish(exception=exception)
+
+    def cancel(self):
+        """Cancel the call if it has not started yet."""
+        with self._lock:
+            if self._state != self._PENDING:
+                return self._state == self._CANCELLED
+            self._state = self._CANCELLED
+            self._exception = CancelledError()
+            callbacks, self._callbacks = self._callbacks, []
+        self._event.set()
+        for callback in callbacks:
+            callback(self)
+        return True
+
+    def cancelled(self):
+        return self._state == self._CANCELLED
+
+    def done(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """Wait for the call to finish. Returns False on timeout."""
+        return self._event.wait(timeout)
+
+    def add_done_callback(self, callback):
+        """Call ``callback(future)`` once the call has finished."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def result(self):
+        """Block until the call finishes and return its result, raising
+        the exception it raised, if any.
+        """
+        self._event.wait()
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
+class ThreadPool(object):
+    """A fixed-size pool of daemon worker threads.
+
+    Threads are started on the first submission and stopped by
+    :meth:`shutdown`.
+    """
+
+    def __init__(self, workers=4):
+        if workers < 1:
+            raise ValueError('Need at least one worker, got %r' % workers)
+        self.workers = workers
+        self._tasks = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def _start_threads(self):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('Cannot submit to a pool after shutdown')
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._work)
+                t.daemon = True
+                t.start()
+                self._threads.append(t)
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            future, func, args, kwargs = task
+            if not future.set_running():
+                continue
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, func, *args, **kwargs):
+        """Schedule ``func(*args, **kwargs)`` and return its
+        :class:`Future`.
+        """
+        if len(self._threads) < self.workers:
+            self._start_threads()
+        future = Future()
+        self._tasks.put((future, func, args, kwargs))
+        return future
+
+    def imap(self, func, iterable, window=None):
+        """Like :func:`itertools.imap`, but calls ``func`` in the pool.
+
+        Results are yielded in input order. At most ``window`` items
+        (default twice the number of workers) are in flight, so the
+        input is consumed lazily and memory stays bounded however long
+        it is.
+        """
+        window = window or 2 * self.workers
+        pending = collections.deque()
+        try:
+            for item in iterable:
+                pending.append(self.submit(func, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def imap_unordered(self, func, iterable, window=None):
+        """Like :meth:`imap`, but yields results as they complete."""
+        window = window or 2 * self.workers
+        completed = queue.Queue()
+        pending = set()
+        try:
+            for item in iterable:
+                future = self.submit(func, item)
+                pending.add(future)
+                future.add_done_callback(completed.put)
+                if len(pending) >= window:
+                    future = completed.get()
+                    pending.discard(future)
+                    yield future.result()
+            while pending:
+                future = completed.get()
+                pending.discard(future)
+                yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self, wait=True):
+        """Stop the worker threads once the queued calls have run."""
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._tasks.put(None)
+        if wait:
+            for t in threads:
+                t.join()
+
+
+class SingleFlight(object):
+    """Collapses concurrent identical calls into one.
+
+    While a call for a key is running, other threads calling
+    :meth:`do` with the same key wait for it and share its result (or
+    its exception) instead of making the call again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {'calls': 0, 'saved': 0}
+
+    def do(self, key, func, *args, **kwargs):
+        """Returns ``func(*args, **kwargs)``, or the result of the call
+        for ``key`` already in flight.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._stats['calls'] += 1
+            else:
+                self._stats['saved'] += 1
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._forget(key)
+            future.set_exception(e)
+            raise
+        self._forget(key)
+        future.set_result(result)
+        return result
+
+    def _forget(self, key):
+        # Later calls start afresh instead of getting this result.
+        with self._lock:
+            del self._calls[key]
+
+    def stats(self):
+        """Returns the number of calls made, and the number ``saved`` by
+        sharing the result of a call in flight.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+def imap_ordered(func, iterable, workers=1, window=None):
+    """Apply ``func`` to each item of ``iterable`` with up to ``workers``
+    concurrent calls, yielding the results in input order.
+
+    With a single worker the calls are made serially in the calling
+    thread.
+    """
+    if workers <= 1:
+        for item in iterable:
+            yield func(item)
+        return
+    pool = ThreadPool(workers)
+    try:
+        for result in pool.imap(func, iterable, window=window):
+            yield result
+    finally:
+        pool.shutdown(wait=False)
+
+
+def imap_unordered(func, iterable, workers=1, window=None):
+    """Like :func:`imap_ordered`, but yields the results as the calls
+    complete.
+    """
+    if workers <= 1:
+        for item in iterable:
+            yield func(item)
+        return
+    pool = ThreadPool(workers)
+    try:
+        for result in pool.imap_unordered(func, iterable, window=window):
+            yield result
+    finally:
+        pool.shutdown(wait=False)
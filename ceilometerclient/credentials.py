@@ -0,0 +1,256 @@
+"""Keystone endpoint and token caching
+
+A :class:`Credentials` holds the API endpoints looked up in the Keystone
+service catalog and the current token, so clients built on the same
+Keystone credentials do not ask Keystone again. It renews the token in
+the background shortly before it expires, and can keep both in a file
+between runs so a short-lived job need not contact Keystone at all.
+"""
+
+import calendar
+import datetime
+import json
+import os
+import threading
+import time
+import weakref
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+
+def _expires(keystone_client):
+    """Returns when the token of a Keystone client expires, in seconds
+    since the epoch, or None if it is not known.
+    """
+    auth_ref = getattr(keystone_client, 'auth_ref', None)
+    expires = getattr(auth_ref, 'expires', None)
+    if not isinstance(expires, datetime.datetime):
+        return None
+    if expires.tzinfo is not None:
+        expires = expires.replace(tzinfo=None) - expires.utcoffset()
+    return calendar.timegm(expires.timetuple())
+
+
+def _string(value):
+    return value if isinstance(value, string_types) else None
+
+
+def _identity(keystone_client):
+    """Returns the Keystone URL, user and tenant of a client, or None if
+    the URL or the user is not known.
+
+    Clients authenticated with a token may have no user name, so the
+    user ID is used as well, from the client or its token.
+    """
+    auth_ref = getattr(keystone_client, 'auth_ref', None)
+    user_id = (_string(getattr(keystone_client, 'user_id', None)) or
+               _string(getattr(auth_ref, 'user_id', None)))
+    identity = (getattr(keystone_client, 'auth_url', None),
+                user_id,
+                getattr(keystone_client, 'username', None),
+                getattr(keystone_client, 'tenant_id', None),
+                getattr(keystone_client, 'tenant_name', None))
+    if not isinstance(identity[0], string_types) or not all(
+            value is None or isinstance(value, string_types)
+            for value in identity):
+        return None
+    if identity[1] is None and identity[2] is None:
+        return None
+    return identity
+
+
+class Credentials(object):
+    """Cached service endpoints and token for one set of Keystone
+    credentials.
+
+    Either pass an authenticated ``keystone_client``, or a ``factory``
+    returning one, which is only called once the client is needed, and
+    the ``identity`` (a tuple of strings, such as the auth URL, user and
+    tenant) the credentials belong to.
+
+    A token due to expire within ``refresh_before`` seconds is renewed
+    in a background thread while the old one is still used, or before
+    the next request if ``background`` is False or it has already
+    expired.
+
+    If ``path`` is given, endpoints and tokens are also kept in that
+    file, readable only by the user, and reused until they expire.
+    """
+
+    # Only kept while some client uses them.
+    _shared = weakref.WeakValueDictionary()
+    _shared_lock = threading.Lock()
+
+    def __init__(self, keystone_client=None, factory=None, identity=None,
+                 path=None, refresh_before=300, background=True):
+        if keystone_client is None and factory is None:
+            raise ValueError('Need either keystone_client or factory')
+        self.keystone_client = keystone_client
+        self.factory = factory
+        if identity is None and keystone_client is not None:
+            identity = _identity(keystone_client)
+        self.identity = identity
+        self.path = path
+        self.refresh_before = refresh_before
+        self.background = background
+        self._token = None
+        self._token_expires = None
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self._stats = {'authentications': 0, 'catalog_lookups': 0,
+                       'background_refreshes': 0, 'loaded': 0}
+        if path is not None and identity is not None:
+            self._load()
+
+    @classmethod
+    def for_keystone_client(cls, keystone_client, **kwargs):
+        """Returns the Credentials shared by all clients using
+        ``keystone_client``, or another client for the same user and
+        tenant. A client whose user is not known gets Credentials of its
+        own.
+        """
+        key = _identity(keystone_client)
+        if key is None:
+            return cls(keystone_client, **kwargs)
+        with cls._shared_lock:
+            credentials = cls._shared.get(key)
+            if credentials is None:
+                credentials = cls._shared[key] = cls(keystone_client,
+                                                     **kwargs)
+        return credentials
+
+    def stats(self):
+        """Returns the number of Keystone authentications, catalog
+        lookups and background token refreshes made, and of entries
+        loaded from the file.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _keystone(self):
+        if self.keystone_client is None:
+            # Creating the client authenticates it.
+            self.keystone_client = self.factory()
+            self._count('authentications')
+        return self.keystone_client
+
+    def endpoint(self, service_type, endpoint_type):
+        """Returns the URL of a service from the catalog."""
+        key = '%s/%s' % (service_type, endpoint_type)
+        with self._lock:
+            url = self._endpoints.get(key)
+        if url is not None:
+            return url
+        with self._refresh_lock:
+            keystone = self._keystone()
+            endpoints = keystone.service_catalog.get_endpoints(
+                service_type=service_type,
+                endpoint_type=endpoint_type)
+            url = endpoints[service_type][0][endpoint_type].rstrip('/')
+            self._count('catalog_lookups')
+            with self._lock:
+                self._endpoints[key] = url
+            self._save()
+        return url
+
+    def token(self):
+        """Returns a token that has not expired."""
+        with self._lock:
+            token, expires = self._token, self._token_expires
+        if token is None or (expires is not None and expires <= time.time()):
+            return self.refresh(stale=token)
+        if (expires is not None and
+                expires - time.time() <= self.refresh_before):
+            if not self.background:
+                return self.refresh(stale=token)
+            self._refresh_in_background(token)
+        return token
+
+    def refresh(self, stale=None):
+        """Returns a token other than ``stale``, authenticating again if
+        no other thread has already done so.
+        """
+        with self._refresh_lock:
+            with self._lock:
+                token, expires = self._token, self._token_expires
+            if (token is not None and token != stale and
+                    (expires is None or expires > time.time())):
+                return token
+            created = self.keystone_client is None
+            keystone = self._keystone()
+            token, expires = keystone.auth_token, _expires(keystone)
+            if not created and (token is None or token == stale or
+                                (expires is not None and
+                                 expires <= time.time())):
+                keystone.authenticate()
+                self._count('authentications')
+                token, expires = keystone.auth_token, _expires(keystone)
+            with self._lock:
+                self._token, self._token_expires = token, expires
+            self._save()
+            return token
+
+    def _refresh_in_background(self, stale):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._stats['background_refreshes'] += 1
+
+        def refresh():
+            try:
+                self.refresh(stale=stale)
+            finally:
+                with self._lock:
+                    self._refreshing = False
+        thread = threading.Thread(target=refresh)
+        thread.daemon = True
+        thread.start()
+
+    # The cache file
+
+    def _file_key(self):
+        return '|'.join(value or '' for value in self.identity)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _load(self):
+        entry = self._read().get(self._file_key())
+        if not entry:
+            return
+        self._endpoints.update(entry.get('endpoints', {}))
+        expires = entry.get('token_expires')
+        if entry.get('token') and expires and expires > time.time():
+            self._token, self._token_expires = entry['token'], expires
+        self._stats['loaded'] += 1
+
+    def _save(self):
+        if self.path is None or self.identity is None:
+            return
+        with self._lock:
+            entry = {'endpoints': dict(self._endpoints)}
+            if self._token_expires is not None:
+                # Tokens of unknown lifetime are not kept.
+                entry['token'] = self._token
+                entry['token_expires'] = self._token_expires
+        entries = self._read()
+        entries[self._file_key()] = entry
+        partial = '%s.%d' % (self.path, os.getpid())
+        fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entries, f)
+        os.rename(partial, self.path)
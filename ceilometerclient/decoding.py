@@ -0,0 +1,58 @@
+"""JSON decoding of response bodies
+
+Bodies are decoded straight from the bytes received, by the fastest
+JSON library installed: orjson, then ujson, then the standard library
+json module. The optional libraries are only imported once a decoder is
+asked for.
+"""
+
+import importlib
+import json
+import sys
+
+PY2 = sys.version_info[0] == 2
+
+
+def _json_loads(data):
+    if not PY2 and isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def _module_loads(name):
+    def load():
+        try:
+            return importlib.import_module(name).loads
+        except ImportError:
+            return None
+    return load
+
+
+# Backends in order of preference, with functions returning their loads
+# function, or None where not installed.
+BACKENDS = [
+    ('orjson', _module_loads('orjson')),
+    ('ujson', _module_loads('ujson')),
+    ('json', lambda: _json_loads),
+]
+
+
+def available():
+    """Returns the names of the installed backends, fastest first."""
+    return [name for name, load in BACKENDS if load() is not None]
+
+
+def get_decoder(decoder=None):
+    """Returns a function decoding a JSON document from bytes.
+
+    ``decoder`` is the name of a backend, a function to use as it is,
+    or None for the fastest backend installed.
+    """
+    if callable(decoder):
+        return decoder
+    for name, load in BACKENDS:
+        if decoder in (None, name):
+            loads = load()
+            if loads is not None:
+                return loads
+    raise ValueError('JSON backend %r is not installed' % decoder)
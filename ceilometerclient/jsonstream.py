@@ -0,0 +1,103 @@
+"""Incremental parsing of large JSON responses
+"""
+
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _Reader(object):
+    """Text buffer filled on demand from an iterator of byte chunks."""
+
+    def __init__(self, chunks, encoding='utf-8'):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._json = json.JSONDecoder()
+        self.buf = u''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self):
+        """Read one more chunk. Returns False once the input is used up."""
+        if self.exhausted:
+            return False
+        # Drop what has been consumed so the buffer does not grow with
+        # the size of the response.
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk)
+            self.buf += chunk
+            return True
+        self.buf += self._decoder.decode(b'', True)
+        self.exhausted = True
+        return False
+
+    def peek(self):
+        """Returns the next non-whitespace character, or '' at the end."""
+        while True:
+            buf = self.buf
+            while self.pos < len(buf) and buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return u''
+
+    def expect(self, chars):
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError('Expected one of %r at offset %d, got %r' %
+                             (chars, self.pos, c))
+        self.pos += 1
+        return c
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may be cut short.
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_items(chunks, key, encoding='utf-8'):
+    """Yields the items of the array stored under ``key`` in a JSON
+    object, decoding ``chunks`` of the document as they arrive.
+
+    Only one item is held in memory at a time (other top-level values
+    are decoded and discarded), so the memory used does not depend on
+    the length of the array.
+    """
+    reader = _Reader(chunks, encoding)
+    reader.expect(u'{')
+    if reader.peek() == u'}':
+        return
+    while True:
+        name = reader.value()
+        reader.expect(u':')
+        if name == key:
+            reader.expect(u'[')
+            if reader.peek() == u']':
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(u',]') == u']':
+                        break
+        else:
+            reader.value()
+        if reader.expect(u',}') == u'}':
+            return
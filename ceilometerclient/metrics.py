@@ -0,0 +1,313 @@
+"""Request hooks and metrics
+
+:meth:`Client.get` calls the ``before`` and ``after`` methods of each
+of the client's hooks around every request. :class:`Metrics` is a hook
+that keeps per-endpoint latency histograms, response sizes, status code
+counts and retry counts, and exports them as a summary dict or in
+statsd or Prometheus text format.
+
+Endpoints are identified by their URL template, such as
+``/resources/{resource_id}/meters/{meter}/duration``, so requests for
+different resources are counted together.
+"""
+
+import bisect
+import threading
+import time
+
+# Path segments followed by an identifier, and the name it is given in
+# endpoint templates.
+_PARAMETERS = {
+    'projects': '{project_id}',
+    'resources': '{resource_id}',
+    'meters': '{meter}',
+}
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+           float('inf'))
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    clock = time.time  # Python 2
+
+
+def endpoint_template(url):
+    """Returns the template of an API path, replacing identifiers with
+    placeholders.
+    """
+    template = []
+    name = None
+    for segment in url.strip('/').split('/'):
+        if name is not None:
+            template.append(name)
+            name = None
+        else:
+            template.append(segment)
+            name = _PARAMETERS.get(segment)
+    return '/' + '/'.join(template)
+
+
+class Request(object):
+    """What hooks know about a request.
+
+    ``elapsed`` is the time in seconds until the response headers were
+    received. After the request, either ``response`` or ``error`` is
+    set.
+    """
+
+    __slots__ = ('url', 'params', 'started', 'elapsed', 'response', 'error')
+
+    def __init__(self, url, params=None):
+        self.url = url
+        self.params = params
+        self.started = None
+        self.elapsed = None
+        self.response = None
+        self.error = None
+
+    @property
+    def endpoint(self):
+        return endpoint_template(self.url)
+
+
+class Hook(object):
+    """Base class for request hooks."""
+
+    def before(self, request):
+        """Called with a :class:`Request` before it is sent."""
+
+    def after(self, request):
+        """Called with a :class:`Request` once it has a response or
+        failed.
+        """
+
+
+class Histogram(object):
+    """Counts of observations falling into fixed buckets."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimates the ``q`` quantile (0-1) by interpolating within the
+        bucket it falls in.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                upper = min(upper, self.max)
+                lower = max(lower, self.min)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.max
+
+    def cumulative(self):
+        """Returns (upper bound, observations at or below it) pairs."""
+        total = 0
+        pairs = []
+        for upper, count in zip(self.buckets, self.counts):
+            total += count
+            pairs.append((upper, total))
+        return pairs
+
+
+class _Endpoint(object):
+
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.bytes = 0
+        self.statuses = {}
+        self.errors = 0
+        self.retries = 0
+
+
+def _response_size(response):
+    try:
+        length = response.headers.get('Content-Length')
+        if length is not None:
+            return int(length)
+        if getattr(response, '_content_consumed', True):
+            return len(response.content)
+    except (TypeError, ValueError):
+        pass
+    return 0  # streamed and not read yet, or unknown
+
+
+def _retries(response):
+    retries = getattr(getattr(response, 'raw', None), 'retries', None)
+    history = getattr(retries, 'history', None)
+    return len(history) if isinstance(history, tuple) else 0
+
+
+class Metrics(Hook):
+    """Hook collecting per-endpoint request metrics.
+
+    It is safe to share between threads and between clients.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self._buckets = buckets
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def after(self, request):
+        endpoint = request.endpoint
+        response = request.response
+        if response is not None:
+            size = _response_size(response)
+            retries = _retries(response)
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = _Endpoint(self._buckets)
+            stats.latency.observe(request.elapsed)
+            if response is None:
+                stats.errors += 1
+                return
+            status = response.status_code
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.bytes += size
+            stats.retries += retries
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+    def summary(self):
+        """Returns a dict of statistics for each endpoint template.
+
+        Latencies are in seconds; the percentiles are estimated from the
+        histogram buckets.
+        """
+        summary = {}
+        with self._lock:
+            for endpoint, stats in self._endpoints.items():
+                latency = stats.latency
+                summary[endpoint] = {
+                    'requests': latency.count,
+                    'errors': stats.errors,
+                    'statuses': dict(stats.statuses),
+                    'retries': stats.retries,
+                    'bytes': stats.bytes,
+                    'latency': {
+                        'sum': latency.sum,
+                        'avg': latency.sum / latency.count,
+                        'min': latency.min,
+                        'max': latency.max,
+                        'p50': latency.quantile(0.5),
+                        'p90': latency.quantile(0.9),
+                        'p99': latency.quantile(0.99),
+                    },
+                }
+        return summary
+
+    def format_summary(self):
+        """Returns the summary as a human readable table."""
+        lines = ['%-60s %8s %6s %9s %9s %9s %12s' % (
+            'endpoint', 'requests', 'errors', 'avg ms', 'p90 ms', 'max ms',
+            'bytes')]
+        for endpoint, stats in sorted(self.summary().items()):
+            latency = stats['latency']
+            lines.append('%-60s %8d %6d %9.1f %9.1f %9.1f %12d' % (
+                endpoint, stats['requests'], stats['errors'],
+                latency['avg'] * 1000, latency['p90'] * 1000,
+                latency['max'] * 1000, stats['bytes']))
+        return '\n'.join(lines) + '\n'
+
+    def to_statsd(self, prefix='ceilometerclient'):
+        """Returns the metrics as statsd lines: counters for requests,
+        statuses, errors, retries and bytes, and gauges for latencies
+        in milliseconds.
+        """
+        lines = []
+        for endpoint, stats in sorted(self.summary().items()):
+            name = '%s.%s' % (prefix, _statsd_name(endpoint))
+            lines.append('%s.requests:%d|c' % (name, stats['requests']))
+            for status, count in sorted(stats['statuses'].items()):
+                lines.append('%s.status.%s:%d|c' % (name, status, count))
+            lines.append('%s.errors:%d|c' % (name, stats['errors']))
+            lines.append('%s.retries:%d|c' % (name, stats['retries']))
+            lines.append('%s.bytes:%d|c' % (name, stats['bytes']))
+            for key in ('avg', 'p50', 'p90', 'p99', 'max'):
+                lines.append('%s.latency.%s:%.3f|g' % (
+                    name, key, stats['latency'][key] * 1000))
+        return '\n'.join(lines) + '\n'
+
+    def to_prometheus(self, prefix='ceilometerclient'):
+        """Returns the metrics in the Prometheus text exposition
+        format.
+        """
+        with self._lock:
+            endpoints = sorted(
+                (endpoint, stats.latency.cumulative(), stats.latency.sum,
+                 stats.latency.count, dict(stats.statuses), stats.errors,
+                 stats.retries, stats.bytes)
+                for endpoint, stats in self._endpoints.items())
+        lines = [
+            '# HELP %s_request_duration_seconds Time until the response '
+            'headers were received.' % prefix,
+            '# TYPE %s_request_duration_seconds histogram' % prefix,
+        ]
+        for endpoint, buckets, total, count, _, _, _, _ in endpoints:
+            for upper, cumulative in buckets:
+                le = '+Inf' if upper == float('inf') else repr(upper)
+                lines.append('%s_request_duration_seconds_bucket'
+                             '{endpoint="%s",le="%s"} %d'
+                             % (prefix, endpoint, le, cumulative))
+            lines.append('%s_request_duration_seconds_sum{endpoint="%s"} %r'
+                         % (prefix, endpoint, total))
+            lines.append('%s_request_duration_seconds_count{endpoint="%s"} %d'
+                         % (prefix, endpoint, count))
+        lines.extend([
+            '# HELP %s_responses_total Responses by status code.' % prefix,
+            '# TYPE %s_responses_total counter' % prefix,
+        ])
+        for endpoint, _, _, _, statuses, _, _, _ in endpoints:
+            for status, count in sorted(statuses.items()):
+                lines.append('%s_responses_total{endpoint="%s",code="%s"} %d'
+                             % (prefix, endpoint, status, count))
+        for name, index, help in [
+                ('errors', 5, 'Requests that failed without a response.'),
+                ('retries', 6, 'Connection and read retries.'),
+                ('response_bytes', 7, 'Size of the response bodies.')]:
+            lines.extend([
+                '# HELP %s_%s_total %s' % (prefix, name, help),
+                '# TYPE %s_%s_total counter' % (prefix, name),
+            ])
+            for values in endpoints:
+                lines.append('%s_%s_total{endpoint="%s"} %d'
+                             % (prefix, name, values[0], values[index]))
+        return '\n'.join(lines) + '\n'
+
+
+def _statsd_name(endpoint):
+    return '.'.join(segment.strip('{}')
+                    for segment in endpoint.strip('/').split('/'))
+
+
+EXPORTS = {
+    'summary': Metrics.format_summary,
+    'statsd': Metrics.to_statsd,
+    'prometheus': Metrics.to_prometheus,
+}
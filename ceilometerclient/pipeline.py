@@ -0,0 +1,192 @@
+"""Running the steps of an export concurrently
+
+A :class:`Pipeline` connects a source of items to a series of
+:class:`Stage` objects with bounded queues, each stage running in its
+own thread, so listing resources, fetching their details and writing
+rows overlap instead of taking turns. Items pass through the stages in
+order, and a stage that falls behind makes the ones before it wait
+rather than fill memory.
+"""
+
+import itertools
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from ceilometerclient import metrics
+
+# Marks the end of the items in a queue.
+_END = object()
+
+# Seconds between checks for a failure elsewhere while blocked.
+_POLL = 0.1
+
+
+class Stage(object):
+    """A step of a pipeline.
+
+    ``func`` is called with each item and returns an iterable of the
+    items to pass on to the next stage, or None. The input queue of the
+    stage holds up to ``queue_size`` items.
+    """
+
+    def __init__(self, name, func, queue_size=100):
+        self.name = name
+        self.func = func
+        self.queue_size = queue_size
+
+
+class _Queue(object):
+    """A bounded queue recording how full it gets."""
+
+    def __init__(self, maxsize, failed):
+        self._queue = queue.Queue(maxsize)
+        self._failed = failed
+        self.puts = 0
+        self.depth_total = 0
+        self.depth_max = 0
+
+    def put(self, item):
+        depth = self._queue.qsize()
+        self.puts += 1
+        self.depth_total += depth
+        self.depth_max = max(self.depth_max, depth)
+        while not self._failed.is_set():
+            try:
+                self._queue.put(item, timeout=_POLL)
+                return
+            except queue.Full:
+                pass
+        raise _Stopped()
+
+    def get(self):
+        while not self._failed.is_set():
+            try:
+                return self._queue.get(timeout=_POLL)
+            except queue.Empty:
+                pass
+        raise _Stopped()
+
+
+class _Stopped(Exception):
+    """Raised in the other threads once one of them has failed."""
+
+
+class Pipeline(object):
+    """Passes the items of ``source``, an iterable, through ``stages``.
+
+    The source is read in a thread of its own, so a generator making
+    API calls runs alongside the stages.
+    """
+
+    def __init__(self, source, stages):
+        self.source = source
+        self.stages = list(stages)
+        self._stats = []
+
+    def run(self):
+        """Runs the pipeline until every item has passed through all the
+        stages. If the source or a stage raises an exception, the other
+        threads stop and the exception is raised here. An exception
+        raised while waiting, such as KeyboardInterrupt, stops them too
+        before it is passed on.
+        """
+        failed = threading.Event()
+        errors = []
+        queues = [_Queue(stage.queue_size, failed) for stage in self.stages]
+        stats = [{'stage': stage.name, 'items_in': 0, 'items_out': 0,
+                  'busy': 0.0} for stage in self.stages]
+
+        def guard(func, *args):
+            try:
+                func(*args)
+            except _Stopped:
+                pass
+            except Exception as e:
+                errors.append(e)
+                failed.set()
+
+        def feed():
+            for item in self.source:
+                queues[0].put(item)
+            queues[0].put(_END)
+
+        def work(index):
+            stage, inbox, counters = (self.stages[index], queues[index],
+                                      stats[index])
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            while True:
+                item = inbox.get()
+                if item is _END:
+                    break
+                counters['items_in'] += 1
+                started = metrics.clock()
+                for result in stage.func(item) or ():
+                    counters['items_out'] += 1
+                    if outbox is not None:
+                        counters['busy'] += metrics.clock() - started
+                        outbox.put(result)
+                        started = metrics.clock()
+                counters['busy'] += metrics.clock() - started
+            if outbox is not None:
+                outbox.put(_END)
+
+        started = metrics.clock()
+        threads = [threading.Thread(target=guard, args=(feed,))]
+        threads.extend(threading.Thread(target=guard, args=(work, index))
+                       for index in range(len(self.stages)))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except BaseException:
+            # Interrupted: stop the stages before leaving, so none is
+            # still writing once the caller cleans up.
+            failed.set()
+            for thread in threads:
+                thread.join()
+            raise
+        elapsed = metrics.clock() - started
+
+        for counters, inbox in zip(stats, queues):
+            counters['rate'] = counters['items_in'] / elapsed if elapsed else 0
+            counters['queue_max'] = inbox.depth_max
+            counters['queue_mean'] = (float(inbox.depth_total) / inbox.puts
+                                      if inbox.puts else 0.0)
+        self._stats = stats
+        if errors:
+            raise errors[0]
+
+    def stats(self):
+        """Returns, for each stage of the last run, the number of items it
+        took in and passed on, the seconds it was busy (not waiting for
+        the stages around it), the items it took in per second, and the
+        largest and mean depth of its input queue.
+        """
+        return [dict(counters) for counters in self._stats]
+
+
+def format_stats(stats):
+    """Returns a table of the stats of the stages of a pipeline."""
+    lines = ['%-12s %9s %9s %9s %11s %9s %10s\n' % (
+        'stage', 'in', 'out', 'busy s', 'in/s', 'queue max', 'queue mean')]
+    for counters in stats:
+        lines.append('%(stage)-12s %(items_in)9d %(items_out)9d '
+                     '%(busy)9.3f %(rate)11.1f %(queue_max)9d '
+                     '%(queue_mean)10.1f\n' % counters)
+    return ''.join(lines)
+
+
+def batches(iterable, size):
+    """Yields the items of ``iterable`` in lists of ``size``."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,157 @@
+"""Timeouts, retries and hedged requests
+
+A :class:`RequestPolicy` bounds how long a request may take, retries
+requests that time out, fail or get a transient server error, and
+optionally sends a second copy of a slow request, keeping whichever
+response arrives first. All the API calls are GETs, so repeating them
+is safe.
+"""
+
+import random
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import requests
+
+from ceilometerclient import metrics
+
+
+class RequestPolicy(object):
+    """How requests are timed out, retried and hedged.
+
+    ``timeout`` is passed to requests: seconds, or a (connect, read)
+    pair. A request that times out, fails with a connection error or
+    gets one of the ``retry_statuses`` is retried up to ``retries``
+    times, after a random delay of up to ``backoff_factor * 2 **
+    attempt`` seconds, capped at ``backoff_max``. If ``hedge_after`` is
+    set, a request still unanswered after that many seconds is sent
+    again, and the first response is used.
+
+    ``endpoints`` maps endpoint templates, as reported by
+    :class:`ceilometerclient.metrics.Metrics` (such as
+    ``/resources/{resource_id}/meters/{meter}``), to dicts overriding
+    ``timeout``, ``retries`` or ``hedge_after`` for that endpoint.
+    """
+
+    def __init__(self, timeout=None, retries=3, backoff_factor=0.1,
+                 backoff_max=10.0, retry_statuses=(502, 503, 504),
+                 hedge_after=None, endpoints=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.hedge_after = hedge_after
+        self.endpoints = dict(endpoints or {})
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'timeouts': 0, 'errors': 0,
+                       'retries': 0, 'hedges': 0, 'hedge_wins': 0}
+
+    def stats(self):
+        """Returns the number of requests made through the policy, of
+        attempts that timed out or failed otherwise, of retries, of
+        hedged requests sent and of those answered first.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def settings(self, url):
+        """Returns the timeout, retries and hedge_after for a request."""
+        settings = {'timeout': self.timeout,
+                    'retries': self.retries,
+                    'hedge_after': self.hedge_after,
+                    }
+        if self.endpoints:
+            settings.update(self.endpoints.get(
+                metrics.endpoint_template(url), {}))
+        return settings
+
+    def backoff(self, attempt):
+        """Returns the seconds to wait before retry number ``attempt``
+        (counting from 0).
+        """
+        return random.uniform(0, min(self.backoff_max,
+                                     self.backoff_factor * 2 ** attempt))
+
+    def send(self, send, url, kwargs):
+        """Returns the response of ``send(kwargs)``, applying the policy
+        for ``url``.
+        """
+        settings = self.settings(url)
+        if settings['timeout'] is not None and 'timeout' not in kwargs:
+            kwargs = dict(kwargs, timeout=settings['timeout'])
+        self._count('requests')
+        attempt = 0
+        while True:
+            try:
+                response = self._hedged(send, kwargs,
+                                        settings['hedge_after'])
+            except (requests.exceptions.Timeout,
+                    requests.exceptions.ConnectionError) as e:
+                self._count('timeouts' if isinstance(
+                    e, requests.exceptions.Timeout) else 'errors')
+                if attempt >= settings['retries']:
+                    raise
+            else:
+                if (response.status_code not in self.retry_statuses or
+                        attempt >= settings['retries']):
+                    return response
+                response.close()
+            self._count('retries')
+            time.sleep(self.backoff(attempt))
+            attempt += 1
+
+    def _hedged(self, send, kwargs, hedge_after):
+        if not hedge_after:
+            return send(kwargs)
+
+        results = queue.Queue()
+
+        def attempt(hedge):
+            try:
+                results.put((hedge, send(kwargs), None))
+            except Exception as e:
+                results.put((hedge, None, e))
+
+        def start(hedge):
+            thread = threading.Thread(target=attempt, args=(hedge,))
+            thread.daemon = True
+            thread.start()
+
+        start(False)
+        outstanding = 0
+        try:
+            hedge, response, error = results.get(timeout=hedge_after)
+        except queue.Empty:
+            self._count('hedges')
+            start(True)
+            outstanding = 1
+            hedge, response, error = results.get()
+            if error is not None:
+                # Wait for the other copy rather than fail early.
+                outstanding = 0
+                hedge, response, error = results.get()
+        if outstanding:
+            discard = threading.Thread(target=self._discard, args=(results,))
+            discard.daemon = True
+            discard.start()
+        if error is not None:
+            raise error
+        if hedge:
+            self._count('hedge_wins')
+        return response
+
+    @staticmethod
+    def _discard(results):
+        _, response, _ = results.get()
+        if response is not None:
+            response.close()
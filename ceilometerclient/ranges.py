@@ -0,0 +1,174 @@
+"""Splitting long time ranges into windows
+
+A single query over a month or a year can time out or return an
+enormous body. :class:`RangePlanner` splits a [start, end) range into
+consecutive windows, fetches them concurrently and merges the results.
+The window size adapts to the latency and size of the responses seen so
+far, and a window whose request times out is split in two and retried.
+
+The API treats ranges as half-open, so an event at a window boundary is
+only returned by the later window.
+"""
+
+import datetime
+import threading
+
+import requests
+
+from ceilometerclient import concurrency
+from ceilometerclient import metrics
+from ceilometerclient import timestamps
+
+
+def _seconds(delta):
+    return delta.days * 86400 + delta.seconds + delta.microseconds / 1e6
+
+
+def concatenate(results):
+    """Merges lists of events, keeping the window order."""
+    merged = []
+    for result in results:
+        merged.extend(result)
+    return merged
+
+
+def add(results):
+    """Merges volume sums. Returns None if no window had a value."""
+    values = [value for value in results if value is not None]
+    if not values:
+        return None
+    return sum(values)
+
+
+def maximum(results):
+    """Merges volume maxima. Returns None if no window had a value."""
+    values = [value for value in results if value is not None]
+    if not values:
+        return None
+    return max(values)
+
+
+def durations(results):
+    """Merges duration info, taking the earliest start and latest end
+    timestamps and the time between them.
+    """
+    starts = [result['start_timestamp'] for result in results
+              if result.get('start_timestamp')]
+    ends = [result['end_timestamp'] for result in results
+            if result.get('end_timestamp')]
+    if not starts or not ends:
+        return {'start_timestamp': None, 'end_timestamp': None,
+                'duration': None}
+    start = min(starts, key=timestamps.parse)
+    end = max(ends, key=timestamps.parse)
+    return {'start_timestamp': start,
+            'end_timestamp': end,
+            'duration': _seconds(timestamps.parse(end) -
+                                 timestamps.parse(start)),
+            }
+
+
+class RangePlanner(object):
+    """Fetches long time ranges in adaptively sized windows.
+
+    Windows start ``window`` long and are kept between ``min_window``
+    and ``max_window`` (all :class:`datetime.timedelta`). After every
+    response the next windows are resized so a request takes about
+    ``target_latency`` seconds and, where the caller can tell the size
+    of a result (such as the number of events), returns about
+    ``target_size`` items. Up to ``workers`` windows are fetched at
+    once.
+
+    A planner may be shared between calls, which then share what it has
+    learnt about the server.
+    """
+
+    def __init__(self, window=datetime.timedelta(days=1),
+                 min_window=datetime.timedelta(minutes=5),
+                 max_window=datetime.timedelta(days=31),
+                 target_latency=1.0,
+                 target_size=10000,
+                 workers=4,
+                 split_on=(requests.exceptions.Timeout,
+                           requests.exceptions.ConnectionError)):
+        self.min_window = _seconds(min_window)
+        self.max_window = _seconds(max_window)
+        self.target_latency = target_latency
+        self.target_size = target_size
+        self.workers = workers
+        self.split_on = split_on
+        self._window = self._clamp(_seconds(window))
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'splits': 0}
+
+    def _clamp(self, seconds):
+        return min(max(seconds, self.min_window), self.max_window)
+
+    @property
+    def window(self):
+        """The size of the next window."""
+        return datetime.timedelta(seconds=self._window)
+
+    def stats(self):
+        """Returns the number of window requests made, of windows split
+        after a failure, and the current window size in seconds.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['window'] = self._window
+        return stats
+
+    def observe(self, span, latency, size=None):
+        """Resizes the window after a window of ``span`` seconds took
+        ``latency`` seconds and returned ``size`` items.
+        """
+        factor = self.target_latency / max(latency, 0.001)
+        if size:
+            factor = min(factor, float(self.target_size) / size)
+        # Change gradually, as single responses are noisy.
+        factor = min(max(factor, 0.5), 2.0)
+        with self._lock:
+            self._window = self._clamp(span * factor)
+
+    def windows(self, start, end):
+        """Yields consecutive (start, end) windows covering the range,
+        sized when each is requested.
+        """
+        while start < end:
+            step = datetime.timedelta(seconds=self._window)
+            yield start, min(start + step, end)
+            start += step
+
+    def run(self, fetch, start, end, merge, size=None):
+        """Returns the merged results of ``fetch(start, end)`` over the
+        windows of a range.
+
+        ``merge`` combines the window results, in order, into one (see
+        :func:`concatenate`, :func:`add`, :func:`maximum` and
+        :func:`durations`). ``size``, if given, returns the number of
+        items in a result.
+        """
+        def fetch_window(window):
+            window_start, window_end = window
+            span = _seconds(window_end - window_start)
+            with self._lock:
+                self._stats['requests'] += 1
+            started = metrics.clock()
+            try:
+                result = fetch(window_start, window_end)
+            except self.split_on:
+                if span < 2 * self.min_window:
+                    raise
+                with self._lock:
+                    self._stats['splits'] += 1
+                    self._window = self._clamp(span / 2)
+                middle = window_start + datetime.timedelta(seconds=span / 2)
+                return merge([fetch_window((window_start, middle)),
+                              fetch_window((middle, window_end))])
+            self.observe(span, metrics.clock() - started,
+                         size(result) if size is not None else None)
+            return result
+
+        return merge(list(concurrency.imap_ordered(fetch_window,
+                                                   self.windows(start, end),
+                                                   workers=self.workers)))
@@ -0,0 +1,275 @@
+"""Compact typed representations of events and resources
+
+The API returns events and resources as JSON objects that repeat the
+same keys and identifier strings for every record. The classes here
+store them more compactly: :class:`Event` and :class:`Resource` use
+``__slots__`` and interned strings, and :class:`EventBatch` stores
+events column by column, with repeated strings dictionary-encoded and
+volumes and timestamps in numeric arrays.
+"""
+
+import array
+import calendar
+import datetime
+import sys
+
+try:
+    intern = sys.intern
+except AttributeError:
+    pass  # builtin on Python 2
+
+
+def _intern(value):
+    if value is None:
+        return None
+    try:
+        return intern(value)
+    except TypeError:
+        # Python 2 only interns byte strings
+        return value
+
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# Seconds since the epoch of recently seen minutes, as timestamps in a
+# response are usually close together.
+_minute_seconds = {}
+
+
+def parse_timestamp(value):
+    """Returns a UTC ISO 8601 timestamp as seconds since the epoch."""
+    if value is None:
+        return None
+    try:
+        minute = _minute_seconds.get(value[:16])
+        if minute is None:
+            if len(_minute_seconds) > 65536:
+                _minute_seconds.clear()
+            minute = _minute_seconds[value[:16]] = calendar.timegm(
+                (int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                 int(value[11:13]), int(value[14:16]), 0))
+        seconds = minute + int(value[17:19])
+    except (TypeError, ValueError):
+        raise ValueError('Invalid timestamp %r' % (value,))
+    if len(value) > 20 and value[19] == '.':
+        fraction = value[20:].rstrip('Z')
+        if fraction:
+            seconds += float('0.' + fraction)
+    return seconds
+
+
+def format_timestamp(seconds):
+    """Returns seconds since the epoch as a UTC ISO 8601 timestamp."""
+    return (_EPOCH + datetime.timedelta(seconds=seconds)).isoformat()
+
+
+# Fields of an event stored as strings, in the order used by Event.
+EVENT_STRING_FIELDS = ('resource_id', 'project_id', 'user_id',
+                       'counter_name', 'counter_type', 'source')
+
+
+class Event(object):
+    """A single meter event."""
+
+    __slots__ = EVENT_STRING_FIELDS + ('counter_volume', 'timestamp',
+                                       'resource_metadata')
+
+    def __init__(self, resource_id=None, project_id=None, user_id=None,
+                 counter_name=None, counter_type=None, source=None,
+                 counter_volume=None, timestamp=None,
+                 resource_metadata=None):
+        self.resource_id = resource_id
+        self.project_id = project_id
+        self.user_id = user_id
+        self.counter_name = counter_name
+        self.counter_type = counter_type
+        self.source = source
+        self.counter_volume = counter_volume
+        self.timestamp = timestamp
+        self.resource_metadata = resource_metadata
+
+    @classmethod
+    def from_dict(cls, event, metadata=False):
+        """Builds an Event from an API event dict.
+
+        The timestamp is parsed into seconds since the epoch. The
+        resource metadata is only kept if ``metadata`` is true.
+        """
+        return cls(_intern(event.get('resource_id')),
+                   _intern(event.get('project_id')),
+                   _intern(event.get('user_id')),
+                   _intern(event.get('counter_name')),
+                   _intern(event.get('counter_type')),
+                   _intern(event.get('source')),
+                   event.get('counter_volume'),
+                   parse_timestamp(event.get('timestamp')),
+                   event.get('resource_metadata') if metadata else None,
+                   )
+
+    def to_dict(self):
+        """Returns the event in the form the API uses."""
+        event = dict((name, getattr(self, name))
+                     for name in EVENT_STRING_FIELDS)
+        event['counter_volume'] = self.counter_volume
+        event['timestamp'] = (None if self.timestamp is None
+                              else format_timestamp(self.timestamp))
+        if self.resource_metadata is not None:
+            event['resource_metadata'] = self.resource_metadata
+        return event
+
+    def __eq__(self, other):
+        if not isinstance(other, Event):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name)
+                   for name in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<Event %s %s %r at %r>' % (self.resource_id,
+                                           self.counter_name,
+                                           self.counter_volume,
+                                           self.timestamp)
+
+
+class Resource(object):
+    """A resource, as listed by :meth:`Client.get_resources`."""
+
+    __slots__ = ('resource_id', 'project_id', 'user_id', 'timestamp',
+                 'metadata', 'meters')
+
+    def __init__(self, resource_id=None, project_id=None, user_id=None,
+                 timestamp=None, metadata=None, meters=()):
+        self.resource_id = resource_id
+        self.project_id = project_id
+        self.user_id = user_id
+        self.timestamp = timestamp
+        self.metadata = metadata
+        self.meters = meters
+
+    @classmethod
+    def from_dict(cls, resource):
+        """Builds a Resource from an API resource dict."""
+        return cls(_intern(resource.get('resource_id')),
+                   _intern(resource.get('project_id')),
+                   _intern(resource.get('user_id')),
+                   parse_timestamp(resource.get('timestamp')),
+                   resource.get('metadata') or {},
+                   tuple(_intern(item.get('counter_name'))
+                         for item in resource.get('meter', [])),
+                   )
+
+    def __repr__(self):
+        return '<Resource %s %r>' % (self.resource_id, self.meters)
+
+
+class _StringColumn(object):
+    """Dictionary-encoded column of strings."""
+
+    __slots__ = ('codes', 'values', '_index')
+
+    def __init__(self):
+        self.codes = array.array('i')
+        self.values = []
+        self._index = {}
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+    def __iter__(self):
+        values = self.values
+        return (values[code] for code in self.codes)
+
+
+class EventBatch(object):
+    """Events stored column by column.
+
+    String fields are dictionary-encoded (see :meth:`codes` and
+    :meth:`values`), and volumes and timestamps (seconds since the
+    epoch) are held in ``array('d')`` columns, ``volumes`` and
+    ``timestamps``. Missing volumes are stored as NaN.
+    """
+
+    def __init__(self, metadata=False):
+        self._strings = dict((name, _StringColumn())
+                             for name in EVENT_STRING_FIELDS)
+        self.volumes = array.array('d')
+        self.timestamps = array.array('d')
+        self.metadata = [] if metadata else None
+
+    @classmethod
+    def from_events(cls, events, metadata=False):
+        """Builds a batch from an iterable of API event dicts, such as
+        :meth:`Client.iter_events`.
+        """
+        batch = cls(metadata=metadata)
+        batch.extend(events)
+        return batch
+
+    def append(self, event):
+        """Adds an API event dict to the batch."""
+        self.extend((event,))
+
+    def extend(self, events):
+        """Adds an iterable of API event dicts to the batch."""
+        # Attribute lookups are hoisted out of the per-event loop.
+        strings = [(name, column._index, column.values, column.codes.append)
+                   for name, column in self._strings.items()]
+        add_volume = self.volumes.append
+        add_timestamp = self.timestamps.append
+        metadata = self.metadata
+        nan = float('nan')
+        for event in events:
+            get = event.get
+            for name, index, values, add_code in strings:
+                value = get(name)
+                code = index.get(value)
+                if code is None:
+                    code = index[value] = len(values)
+                    values.append(_intern(value))
+                add_code(code)
+            volume = get('counter_volume')
+            add_volume(nan if volume is None else volume)
+            timestamp = parse_timestamp(get('timestamp'))
+            add_timestamp(nan if timestamp is None else timestamp)
+            if metadata is not None:
+                metadata.append(get('resource_metadata'))
+
+    def __len__(self):
+        return len(self.volumes)
+
+    def column(self, name):
+        """Returns an iterator over the values of a field."""
+        if name == 'counter_volume':
+            return iter(self.volumes)
+        if name == 'timestamp':
+            return iter(self.timestamps)
+        return iter(self._strings[name])
+
+    def codes(self, name):
+        """Returns the dictionary codes of a string field, one per
+        event, as an ``array('i')``.
+        """
+        return self._strings[name].codes
+
+    def values(self, name):
+        """Returns the distinct values of a string field, indexed by
+        code.
+        """
+        return self._strings[name].values
+
+    def __getitem__(self, i):
+        volume = self.volumes[i]
+        timestamp = self.timestamps[i]
+        strings = self._strings
+        return Event(counter_volume=None if volume != volume else volume,
+                     timestamp=None if timestamp != timestamp else timestamp,
+                     resource_metadata=(None if self.metadata is None
+                                        else self.metadata[i]),
+                     **dict((name, strings[name][i])
+                            for name in EVENT_STRING_FIELDS))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
@@ -0,0 +1,122 @@
+"""Splitting an export across processes
+
+A single process spends much of a large export decoding JSON and
+building rows. :func:`split` divides the projects into shards,
+:func:`run` exports each shard in its own process, each to a partial
+output, and :func:`merge` combines the partial outputs into one sorted
+by project.
+"""
+
+import heapq
+import multiprocessing
+import os
+import time
+
+from ceilometerclient import writers
+
+
+def split(projects, count):
+    """Divides projects into at most ``count`` shards of about the same
+    size. Each shard lists its projects in sorted order.
+    """
+    projects = sorted(set(project for project in projects
+                          if project is not None))
+    shards = [projects[i::count] for i in range(count)]
+    return [shard for shard in shards if shard]
+
+
+def _timed(job):
+    func, index, projects = job
+    started = time.time()
+    rows = func(index, projects)
+    return {'shard': index,
+            'projects': len(projects),
+            'rows': rows,
+            'seconds': time.time() - started,
+            }
+
+
+def run(func, shards, processes=None):
+    """Calls ``func(index, projects)`` for each shard in a pool of
+    ``processes`` worker processes (by default, one per CPU).
+
+    ``func`` must be a module level function, and returns the number of
+    rows it wrote. Returns, for each shard in order, a dict with the
+    shard index, the number of projects and rows, and the seconds it
+    took.
+    """
+    pool = multiprocessing.Pool(processes or len(shards) or 1)
+    try:
+        return pool.map(_timed, [(func, index, projects)
+                                 for index, projects in enumerate(shards)],
+                        chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def merge(partials, dumper, key='project_id'):
+    """Writes the rows of several iterables, each sorted by ``key``, to
+    ``dumper`` in order of ``key``. Rows with the same key keep their
+    order. Returns the number of rows written.
+    """
+    def decorate(index, rows):
+        for position, row in enumerate(rows):
+            yield row[key], index, position, row
+
+    written = 0
+    for _, _, _, row in heapq.merge(*[decorate(index, rows)
+                                      for index, rows in enumerate(partials)]):
+        dumper.writerow(row)
+        written += 1
+    return written
+
+
+def path(filename, index):
+    """Returns the name of the partial output of a shard."""
+    return '%s.shard%d' % (filename, index)
+
+
+def _read(partial, format):
+    # The file is only opened once the merge asks for its first row.
+    with open(partial, 'rb') as f:
+        for row in writers.iter_rows(f, format):
+            yield row
+
+
+def merge_files(filename, count, format, fields, types=None,
+                key='project_id'):
+    """Merges the partial outputs of ``count`` shards, written in
+    ``format``, into ``filename``, and removes them. Returns the number
+    of rows written.
+
+    The partial outputs are read as the merge goes, so at most a batch
+    of rows of each is held in memory at once.
+    """
+    paths = [path(filename, index) for index in range(count)]
+    partials = [_read(partial, format) for partial in paths]
+    try:
+        with open(filename, 'wb') as output:
+            dumper = writers.FORMATS[format](output, fields, types=types)
+            dumper.writeheader()
+            written = merge(partials, dumper, key)
+            dumper.close()
+    finally:
+        for rows in partials:
+            rows.close()
+    for partial in paths:
+        os.remove(partial)
+    return written
+
+
+def format_timings(timings):
+    """Returns a report of the time each shard took."""
+    lines = []
+    for timing in timings:
+        lines.append('shard %(shard)d: %(projects)d projects, %(rows)d rows '
+                     'in %(seconds).2fs\n' % timing)
+    total = sum(timing['rows'] for timing in timings)
+    slowest = max([timing['seconds'] for timing in timings] or [0])
+    lines.append('%d shards, %d rows, slowest shard %.2fs\n'
+                 % (len(timings), total, slowest))
+    return ''.join(lines)
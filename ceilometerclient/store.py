@@ -0,0 +1,154 @@
+"""Local store of fetched events
+
+An :class:`EventStore` keeps the events fetched for each resource and
+meter in an SQLite database, indexed by time, along with the time
+ranges it holds every event of. A client given a store asks the server
+only for the parts of a range the store does not cover, and answers
+the rest from disk.
+"""
+
+import datetime
+import json
+import sqlite3
+import threading
+
+from ceilometerclient import timestamps
+
+
+def _isoformat(timestamp):
+    if isinstance(timestamp, datetime.datetime):
+        return timestamps.utc(timestamp).isoformat()
+    return timestamp
+
+
+class EventStore(object):
+    """Events and the time ranges covered, stored in an SQLite database
+    at ``path`` (by default, in memory).
+
+    Only ranges that ended more than ``settle`` ago are recorded as
+    covered, as later events may still arrive for more recent ones.
+    Naive timestamps are taken to be in UTC and timezone-aware ones are
+    converted to it; events are returned in timestamp order.
+    """
+
+    def __init__(self, path=':memory:', settle=datetime.timedelta(hours=1)):
+        self.path = path
+        self.settle = settle
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._stats = {'queries': 0, 'gaps': 0}
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS events '
+                             '(resource_id TEXT, meter TEXT, '
+                             'timestamp TEXT, volume REAL, event TEXT)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS events_time '
+                             'ON events (resource_id, meter, timestamp)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS covered '
+                             '(resource_id TEXT, meter TEXT, '
+                             'start_timestamp TEXT, end_timestamp TEXT)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS covered_start '
+                             'ON covered '
+                             '(resource_id, meter, start_timestamp)')
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self):
+        """Returns the number of ranges queried, of gaps they had, and
+        of events stored.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['events'] = self._db.execute(
+                'SELECT COUNT(*) FROM events').fetchone()[0]
+        return stats
+
+    def _gaps(self, resource_id, meter, start, end):
+        covered = self._db.execute(
+            'SELECT start_timestamp, end_timestamp FROM covered '
+            'WHERE resource_id = ? AND meter = ? '
+            'AND start_timestamp < ? AND end_timestamp > ? '
+            'ORDER BY start_timestamp',
+            (resource_id, meter, end, start)).fetchall()
+        gaps = []
+        for covered_start, covered_end in covered:
+            if covered_start > start:
+                gaps.append((start, covered_start))
+            start = max(start, covered_end)
+        if start < end:
+            gaps.append((start, end))
+        return gaps
+
+    def gaps(self, resource_id, meter, start, end):
+        """Returns the (start, end) parts of a range that are not
+        covered, in order.
+        """
+        with self._lock:
+            gaps = self._gaps(resource_id, meter, _isoformat(start),
+                              _isoformat(end))
+            self._stats['queries'] += 1
+            self._stats['gaps'] += len(gaps)
+        return [(timestamps.parse(gap_start), timestamps.parse(gap_end))
+                for gap_start, gap_end in gaps]
+
+    def events(self, resource_id, meter, start, end):
+        """Returns the stored events of a range."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT event FROM events WHERE resource_id = ? '
+                'AND meter = ? AND timestamp >= ? AND timestamp < ? '
+                'ORDER BY timestamp, rowid',
+                (resource_id, meter, _isoformat(start),
+                 _isoformat(end))).fetchall()
+        return [json.loads(event) for event, in rows]
+
+    def volume(self, resource_id, meter, start, end, sum_or_max='sum'):
+        """Returns the total (or max) volume of the stored events of a
+        range, or None if there are none.
+        """
+        with self._lock:
+            return self._db.execute(
+                'SELECT %s(volume) FROM events WHERE resource_id = ? '
+                'AND meter = ? AND timestamp >= ? AND timestamp < ?'
+                % ('SUM' if sum_or_max == 'sum' else 'MAX'),
+                (resource_id, meter, _isoformat(start),
+                 _isoformat(end))).fetchone()[0]
+
+    def add(self, resource_id, meter, start, end, events, now=None):
+        """Stores all the events of a range and records it as covered.
+        Events of the parts already covered are not stored again.
+
+        Ranges that have not settled are only covered, and their events
+        only kept, up to ``settle`` before ``now``.
+        """
+        start, end = timestamps.utc(start), timestamps.utc(end)
+        now = timestamps.utc(now or datetime.datetime.utcnow())
+        end = min(end, now - self.settle)
+        if end <= start:
+            return
+        start, end = _isoformat(start), _isoformat(end)
+        with self._lock:
+            gaps = self._gaps(resource_id, meter, start, end)
+            rows = [(resource_id, meter, event['timestamp'],
+                     event.get('counter_volume'), json.dumps(event))
+                    for event in events
+                    if any(gap_start <= event['timestamp'] < gap_end
+                           for gap_start, gap_end in gaps)]
+            with self._db:
+                self._db.executemany(
+                    'INSERT INTO events VALUES (?, ?, ?, ?, ?)', rows)
+                # Merge with the covered ranges this one overlaps or
+                # touches.
+                merged = self._db.execute(
+                    'SELECT rowid, start_timestamp, end_timestamp '
+                    'FROM covered WHERE resource_id = ? AND meter = ? '
+                    'AND start_timestamp <= ? AND end_timestamp >= ?',
+                    (resource_id, meter, end, start)).fetchall()
+                for rowid, covered_start, covered_end in merged:
+                    start = min(start, covered_start)
+                    end = max(end, covered_end)
+                    self._db.execute('DELETE FROM covered WHERE rowid = ?',
+                                     (rowid,))
+                self._db.execute('INSERT INTO covered VALUES (?, ?, ?, ?)',
+                                 (resource_id, meter, start, end))
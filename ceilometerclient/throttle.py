@@ -0,0 +1,147 @@
+"""Client-side limits on the load put on the API
+
+:class:`TokenBucket` caps the rate of requests. :class:`AdaptiveConcurrency`
+limits the requests in flight, and adjusts the limit the way TCP
+adjusts its congestion window: it grows by about one request per round
+trip while the server is healthy, and is halved when requests fail with
+a server error or time out, or take much longer than the fastest seen
+recently.
+
+Both are :class:`ceilometerclient.metrics.Hook` objects. They may be
+shared between clients, which then share the limits.
+"""
+
+import threading
+import time
+
+from ceilometerclient import metrics
+
+
+class TokenBucket(metrics.Hook):
+    """Allows ``rate`` requests per second on average, and bursts of up
+    to ``burst`` requests (by default, one second's worth).
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError('Expected a positive rate, got %r' % (rate,))
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self._tokens = self.burst
+        self._updated = metrics.clock()
+        self._lock = threading.Lock()
+        self._stats = {'acquired': 0, 'delayed': 0, 'wait': 0.0}
+
+    def stats(self):
+        """Returns the number of requests let through and of those
+        delayed, and the total seconds they were delayed.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def acquire(self):
+        """Waits until a request may be sent."""
+        with self._lock:
+            now = metrics.clock()
+            self._tokens = min(self.burst, self._tokens +
+                               (now - self._updated) * self.rate)
+            self._updated = now
+            # Take the token now, even if it is yet to be refilled, so
+            # waiting callers are served in order.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+            self._stats['acquired'] += 1
+            if wait:
+                self._stats['delayed'] += 1
+                self._stats['wait'] += wait
+        if wait:
+            time.sleep(wait)
+
+    def before(self, request):
+        self.acquire()
+
+
+class AdaptiveConcurrency(metrics.Hook):
+    """Limits the requests in flight to a limit between ``minimum`` and
+    ``maximum``, starting at ``initial``.
+
+    The limit is multiplied by ``backoff`` after a request fails with a
+    5xx or 429 status or an exception of any kind, or takes more than
+    ``latency_tolerance`` times the baseline latency, at most once per
+    round trip. The baseline is the lowest latency seen, drifting
+    slowly upwards so it follows lasting changes.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=64,
+                 latency_tolerance=2.0, backoff=0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self._limit = float(min(max(initial, minimum), maximum))
+        self._in_flight = 0
+        self._baseline = None
+        self._decreased = None
+        self._condition = threading.Condition()
+        self._stats = {'increases': 0, 'decreases': 0, 'waits': 0}
+
+    @property
+    def limit(self):
+        """The number of requests currently allowed in flight."""
+        return int(self._limit)
+
+    def stats(self):
+        """Returns the current limit and requests in flight, the number
+        of times the limit was raised and lowered, and the number of
+        requests that waited for a slot.
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats['limit'] = int(self._limit)
+            stats['in_flight'] = self._in_flight
+        return stats
+
+    def before(self, request):
+        with self._condition:
+            if self._in_flight >= int(self._limit):
+                self._stats['waits'] += 1
+                while self._in_flight >= int(self._limit):
+                    self._condition.wait()
+            self._in_flight += 1
+
+    def _overloaded(self, request):
+        if request.error is not None or request.response is None:
+            return True
+        status = request.response.status_code
+        if status >= 500 or status == 429:
+            return True
+        return (self._baseline is not None and
+                request.elapsed > self.latency_tolerance * self._baseline)
+
+    def after(self, request):
+        with self._condition:
+            self._in_flight -= 1
+            overloaded = self._overloaded(request)
+            if request.error is None and request.elapsed is not None:
+                if (self._baseline is None or
+                        request.elapsed < self._baseline):
+                    self._baseline = request.elapsed
+                else:
+                    self._baseline += (request.elapsed -
+                                       self._baseline) * 0.01
+            if overloaded:
+                # Requests sent before the last decrease saw the old
+                # limit, and do not count against the new one.
+                if (self._decreased is None or request.started is None or
+                        request.started >= self._decreased):
+                    self._limit = max(self.minimum,
+                                      self._limit * self.backoff)
+                    self._decreased = metrics.clock()
+                    self._stats['decreases'] += 1
+            elif self._limit < self.maximum:
+                before = int(self._limit)
+                self._limit = min(self.maximum,
+                                  self._limit + 1.0 / self._limit)
+                if int(self._limit) > before:
+                    self._stats['increases'] += 1
+            self._condition.notify_all()
@@ -0,0 +1,29 @@
+"""Timestamps as the API writes them
+"""
+
+import datetime
+
+# Formats of the timestamps in requests and responses, in UTC.
+FORMATS = ['%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S']
+
+
+def parse(value):
+    """Returns the datetime of an API timestamp, raising ValueError if
+    it is not one.
+    """
+    for fmt in FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            pass
+    raise ValueError('Invalid timestamp %r' % (value,))
+
+
+def utc(value):
+    """Returns a datetime as a naive one in UTC, converting it if it is
+    timezone-aware.
+    """
+    offset = value.utcoffset()
+    if offset is None:
+        return value
+    return value.replace(tzinfo=None) - offset
@@ -0,0 +1,291 @@
+"""Output formats for the export tools
+
+Every writer takes rows as dicts keyed by field name, like
+:class:`csv.DictWriter`, and buffers them in batches of ``batch_size``
+before writing them to a binary file object. Writers do not close the
+file; :meth:`Writer.close` only writes out what is buffered and any
+trailer the format needs.
+
+Values are written as they are, except where ``types`` maps a field to
+``int``, ``float`` or ``str``; the columnar formats use those types for
+their schema and store other fields as strings.
+"""
+
+import csv
+import gzip
+import io
+import json
+import sys
+
+PY2 = sys.version_info[0] == 2
+
+
+def _convert(value, type_):
+    if value is None or value == '':
+        return None
+    return type_(value)
+
+
+class Writer(object):
+    """Base class for buffered row writers.
+
+    ``resumable`` writers only append to their file, so it can be cut
+    back to the position returned by :meth:`tell` after a flush and
+    written to again (see :class:`ceilometerclient.checkpoint`). The
+    number of rows given to the writer is kept in ``rows``.
+    """
+
+    resumable = True
+
+    def __init__(self, fileobj, fields, batch_size=1000, types=None):
+        self.fileobj = fileobj
+        self.fields = list(fields)
+        self.batch_size = batch_size
+        self.types = dict(types or {})
+        self.rows = 0
+        self._rows = []
+
+    def writeheader(self):
+        pass
+
+    def writerow(self, row):
+        self.rows += 1
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self._write_batch()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def _write_batch(self):
+        if self._rows:
+            rows, self._rows = self._rows, []
+            self._write(rows)
+
+    def _write(self, rows):
+        raise NotImplementedError()
+
+    def flush(self):
+        """Write out the buffered rows and flush the file."""
+        self._write_batch()
+        self.fileobj.flush()
+
+    def tell(self):
+        return self.fileobj.tell()
+
+    def close(self):
+        self.flush()
+
+
+class CSVWriter(Writer):
+    """Comma separated values with a header line."""
+
+    def __init__(self, fileobj, fields, **kwargs):
+        super(CSVWriter, self).__init__(fileobj, fields, **kwargs)
+        if PY2:
+            self._text = fileobj
+        else:
+            self._text = io.TextIOWrapper(fileobj, encoding='utf-8',
+                                          newline='', write_through=True)
+        self._writer = csv.writer(self._text)
+
+    def _tuples(self, rows):
+        fields = self.fields
+        return [tuple(row.get(field) for field in fields) for row in rows]
+
+    def writeheader(self):
+        self._writer.writerow(self.fields)
+
+    def _write(self, rows):
+        self._writer.writerows(self._tuples(rows))
+
+    def close(self):
+        super(CSVWriter, self).close()
+        if not PY2:
+            # Leave the underlying file open for the caller.
+            self._text.detach()
+
+
+class GzipCSVWriter(CSVWriter):
+    """gzip-compressed CSV.
+
+    Every batch is compressed as a separate gzip member. Concatenated
+    members are a valid gzip file, and the file can be cut back after
+    any of them.
+    """
+
+    def __init__(self, fileobj, fields, compresslevel=6, **kwargs):
+        Writer.__init__(self, fileobj, fields, **kwargs)
+        self.compresslevel = compresslevel
+
+    def _compress(self, write_rows):
+        buf = io.BytesIO() if PY2 else io.StringIO(newline='')
+        write_rows(csv.writer(buf))
+        data = buf.getvalue()
+        if not PY2:
+            data = data.encode('utf-8')
+        member = io.BytesIO()
+        with gzip.GzipFile(fileobj=member, mode='wb',
+                           compresslevel=self.compresslevel) as z:
+            z.write(data)
+        self.fileobj.write(member.getvalue())
+
+    def writeheader(self):
+        self._compress(lambda writer: writer.writerow(self.fields))
+
+    def _write(self, rows):
+        tuples = self._tuples(rows)
+        self._compress(lambda writer: writer.writerows(tuples))
+
+    def close(self):
+        Writer.close(self)
+
+
+class JSONLinesWriter(Writer):
+    """One JSON object per line. Values JSON cannot represent, such as
+    datetimes, are written as strings.
+    """
+
+    def _write(self, rows):
+        fields = self.fields
+        lines = [json.dumps(dict((field, row.get(field))
+                                 for field in fields),
+                            default=str, sort_keys=True)
+                 for row in rows]
+        self.fileobj.write(('\n'.join(lines) + '\n').encode('utf-8'))
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('The parquet and arrow formats require pyarrow')
+    return pyarrow
+
+
+class _ColumnarWriter(Writer):
+
+    resumable = False
+
+    def __init__(self, fileobj, fields, **kwargs):
+        super(_ColumnarWriter, self).__init__(fileobj, fields, **kwargs)
+        pa = self._pa = _pyarrow()
+        arrow_types = {int: pa.int64(), float: pa.float64()}
+        self._schema = pa.schema([
+            (field, arrow_types.get(self.types.get(field), pa.string()))
+            for field in self.fields])
+        self._writer = self._open()
+
+    def _open(self):
+        raise NotImplementedError()
+
+    def _write(self, rows):
+        columns = {}
+        for field in self.fields:
+            type_ = self.types.get(field, str)
+            if type_ not in (int, float):
+                type_ = str
+            columns[field] = [_convert(row.get(field), type_)
+                              for row in rows]
+        table = self._pa.Table.from_pydict(columns, schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        self._write_batch()
+        self._writer.close()
+        self.fileobj.flush()
+
+
+class ParquetWriter(_ColumnarWriter):
+    """Apache Parquet, one row group per batch. Requires pyarrow."""
+
+    def _open(self):
+        return self._pa.parquet.ParquetWriter(self.fileobj, self._schema)
+
+
+class ArrowWriter(_ColumnarWriter):
+    """Arrow IPC file format, one record batch per batch. Requires
+    pyarrow.
+    """
+
+    def _open(self):
+        return self._pa.ipc.new_file(self.fileobj, self._schema)
+
+
+FORMATS = {
+    'csv': CSVWriter,
+    'csv.gz': GzipCSVWriter,
+    'jsonl': JSONLinesWriter,
+    'parquet': ParquetWriter,
+    'arrow': ArrowWriter,
+}
+
+_EXTENSIONS = [
+    ('.csv.gz', 'csv.gz'),
+    ('.csv', 'csv'),
+    ('.jsonl', 'jsonl'),
+    ('.ndjson', 'jsonl'),
+    ('.parquet', 'parquet'),
+    ('.arrow', 'arrow'),
+]
+
+
+def guess_format(filename):
+    """Returns the format named by a file's extension, defaulting to
+    csv.
+    """
+    for extension, name in _EXTENSIONS:
+        if filename.endswith(extension):
+            return name
+    return 'csv'
+
+
+def iter_rows(fileobj, format='csv'):
+    """Yields the rows of a file written in ``format`` as dicts, reading
+    the file as it goes.
+
+    CSV values are read back as strings.
+    """
+    if format == 'csv.gz':
+        fileobj = gzip.GzipFile(fileobj=fileobj, mode='rb')
+        format = 'csv'
+    if format == 'csv':
+        if PY2:
+            for row in csv.DictReader(fileobj):
+                yield row
+            return
+        text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+        try:
+            for row in csv.DictReader(text):
+                yield row
+        finally:
+            text.detach()
+        return
+    if format == 'jsonl':
+        for line in fileobj:
+            if line.strip():
+                yield json.loads(line.decode('utf-8'))
+        return
+    pa = _pyarrow()
+    if format == 'parquet':
+        batches = pa.parquet.ParquetFile(fileobj).iter_batches(
+            batch_size=1000)
+    elif format == 'arrow':
+        reader = pa.ipc.open_file(fileobj)
+        batches = (reader.get_batch(index)
+                   for index in range(reader.num_record_batches))
+    else:
+        raise ValueError('Unknown format %r' % format)
+    for batch in batches:
+        for row in batch.to_pylist():
+            yield row
+
+
+def read_rows(fileobj, format='csv'):
+    """Returns the rows of a file written in ``format`` as a list of
+    dicts. See :func:`iter_rows`.
+    """
+    return list(iter_rows(fileobj, format))
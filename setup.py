@@ -32,7 +32,13 @@ setuptools.setup(
 
     scripts=[],
 
-    install_requires=['requests'],
+    entry_points={
+        'console_scripts': [
+            'ceilometer-export = ceilometerclient.cli:main',
+        ],
+    },
+
+    install_requires=['requests>=2.14.0'],
 
     zip_safe=False,
     )
@@ -0,0 +1,90 @@
+
+import random
+import unittest
+
+from ceilometerclient import aggregate
+from ceilometerclient import records
+
+
+def event(resource_id, volume, second):
+    return {'resource_id': resource_id,
+            'counter_name': 'cpu',
+            'counter_volume': volume,
+            'timestamp': '2012-09-01T%02d:%02d:%02d' % (
+                second // 3600, second // 60 % 60, second % 60),
+            }
+
+EVENTS = [event('r1', 10.0, 0),
+          event('r1', 30.0, 7200),
+          event('r1', 20.0, 3600),
+          event('r2', 5.0, 60),
+          event('r2', None, 120),
+          ]
+
+START = records.parse_timestamp('2012-09-01T00:00:00')
+
+
+class AggregateTests(unittest.TestCase):
+
+    use_numpy = False
+
+    def aggregate(self, events, **kwargs):
+        return aggregate.aggregate(events, use_numpy=self.use_numpy,
+                                   **kwargs)
+
+    def test_grouped(self):
+        results = self.aggregate(records.EventBatch.from_events(EVENTS),
+                                 percentiles=[50, 90])
+        self.assertEqual(sorted(results), ['r1', 'r2'])
+        r1 = results['r1']
+        self.assertEqual((r1['count'], r1['sum'], r1['min'], r1['max'],
+                          r1['avg']),
+                         (3, 60.0, 10.0, 30.0, 20.0))
+        self.assertEqual(r1['p50'], 20.0)
+        self.assertAlmostEqual(r1['p90'], 28.0)
+        self.assertAlmostEqual(r1['rate'], 20.0 / 7200)
+        self.assertEqual(results['r2']['count'], 1)
+        self.assertEqual(results['r2']['rate'], None)
+
+    def test_bucketed(self):
+        results = self.aggregate(EVENTS, bucket=3600)
+        self.assertEqual(sorted(results),
+                         [('r1', START), ('r1', START + 3600),
+                          ('r1', START + 7200), ('r2', START)])
+        self.assertEqual(results[('r1', START + 3600)]['sum'], 20.0)
+
+    def test_single_group(self):
+        results = self.aggregate(EVENTS, group_by=None)
+        self.assertEqual(list(results), [None])
+        self.assertEqual(results[None]['sum'], 65.0)
+
+    def test_incremental(self):
+        aggregator = aggregate.Aggregator(percentiles=[50],
+                                          use_numpy=self.use_numpy)
+        for e in EVENTS:
+            aggregator.add(records.EventBatch.from_events([e]))
+        self.assertEqual(aggregator.results(),
+                         self.aggregate(EVENTS, percentiles=[50]))
+
+
+@unittest.skipIf(aggregate.numpy is None, 'NumPy is not installed')
+class NumpyAggregateTests(AggregateTests):
+
+    use_numpy = True
+
+    def test_matches_python(self):
+        rnd = random.Random(42)
+        events = [event('r%d' % rnd.randint(0, 20),
+                        float(rnd.randint(0, 1000)),
+                        rnd.randint(0, 86399))
+                  for _ in range(2000)]
+        kwargs = dict(bucket=900, percentiles=[5, 50, 99])
+        python = aggregate.aggregate(events, use_numpy=False, **kwargs)
+        vectorized = aggregate.aggregate(events, use_numpy=True, **kwargs)
+        self.assertEqual(sorted(python), sorted(vectorized))
+        for key in python:
+            for name, value in python[key].items():
+                if value is None:
+                    self.assertEqual(vectorized[key][name], None)
+                else:
+                    self.assertAlmostEqual(value, vectorized[key][name])
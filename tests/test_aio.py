@@ -0,0 +1,66 @@
+
+import json
+import threading
+import unittest
+
+import mock
+
+try:
+    import asyncio
+    from ceilometerclient import aio
+except (ImportError, SyntaxError):
+    aio = None
+
+BASE_URL = u'http://localhost:9000'
+
+
+@unittest.skipIf(aio is None, 'asyncio is not available')
+class AsyncClientTests(unittest.TestCase):
+
+    def setUp(self):
+        self.c = aio.AsyncClient(base_url=BASE_URL, concurrency=2)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.c.close()
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def test_same_surface(self):
+        for name in aio.METHODS:
+            self.assertTrue(hasattr(self.c, name), name)
+
+    def test_get_projects(self):
+        response = mock.Mock()
+        response.content = json.dumps(
+            {'projects': ['project1']}).encode('utf-8')
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = response
+            prjs = self.loop.run_until_complete(self.c.get_projects())
+            getter.assert_called_once_with('%s/v1/projects' % BASE_URL)
+        self.assertEqual(prjs, ['project1'])
+
+    def test_concurrency_limit(self):
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+        release = threading.Event()
+
+        def get(url, **kwargs):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            release.wait(0.05)
+            with lock:
+                state['active'] -= 1
+            response = mock.Mock()
+            response.content = json.dumps({'volume': 1}).encode('utf-8')
+            return response
+
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = get
+            calls = [self.c.get_project_volume_sum('p', 'm%d' % i)
+                     for i in range(6)]
+            results = self.loop.run_until_complete(asyncio.gather(*calls))
+        self.assertEqual(results, [1] * 6)
+        self.assertEqual(state['peak'], 2)
@@ -0,0 +1,150 @@
+
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+import requests
+
+from ceilometerclient import cache
+from ceilometerclient import client
+
+BASE_URL = u'http://localhost:9000'
+
+
+class CachePolicyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = cache.MemoryCache(ttl=30,
+                                       settle=datetime.timedelta(hours=1))
+        self.now = datetime.datetime(2012, 9, 10, 12)
+
+    def test_key_is_normalized(self):
+        self.assertEqual(
+            self.cache.make_key(BASE_URL + '/v2/projects/p/resources/',
+                                {'b': 2, 'a': 1}),
+            self.cache.make_key(BASE_URL + '/v2/projects/p/resources',
+                                {'a': 1, 'b': 2}))
+        self.assertEqual(self.cache.make_key(BASE_URL + '/v2/projects'),
+                         BASE_URL + '/v2/projects')
+
+    def test_closed_range_kept_forever(self):
+        params = {'start_timestamp': '2012-09-01T00:00:00',
+                  'end_timestamp': '2012-09-02T00:00:00'}
+        self.assertEqual(self.cache.ttl_for(params, self.now), None)
+
+    def test_recent_range_short_ttl(self):
+        params = {'end_timestamp': '2012-09-10T11:30:00.000001'}
+        self.assertEqual(self.cache.ttl_for(params, self.now), 30)
+
+    def test_open_range_short_ttl(self):
+        params = {'start_timestamp': '2012-09-01T00:00:00'}
+        self.assertEqual(self.cache.ttl_for(params, self.now), 30)
+        self.assertEqual(self.cache.ttl_for(None, self.now), 30)
+
+
+class MemoryCacheTests(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        c = cache.MemoryCache()
+        self.assertRaises(KeyError, c.get, '/projects')
+        c.set('/projects', None, {'projects': []})
+        self.assertEqual(c.get('/projects'), {'projects': []})
+        self.assertEqual(c.stats(), {'hits': 1, 'misses': 1, 'evictions': 0,
+                                     'expirations': 0, 'size': 1})
+
+    def test_lru_eviction(self):
+        c = cache.MemoryCache(maxsize=2)
+        c.set('/a', None, 1)
+        c.set('/b', None, 2)
+        c.get('/a')
+        c.set('/c', None, 3)
+        self.assertRaises(KeyError, c.get, '/b')
+        self.assertEqual(c.get('/a'), 1)
+        self.assertEqual(c.stats()['evictions'], 1)
+
+    def test_expiry(self):
+        c = cache.MemoryCache(ttl=10)
+        with mock.patch('time.time') as now:
+            now.return_value = 1000
+            c.set('/projects', None, 1)
+            now.return_value = 1009
+            self.assertEqual(c.get('/projects'), 1)
+            now.return_value = 1010
+            self.assertRaises(KeyError, c.get, '/projects')
+        self.assertEqual(c.stats()['expirations'], 1)
+
+
+class DiskCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_persists(self):
+        c = cache.DiskCache(self.path)
+        c.set('/projects', None, {'projects': ['p1']})
+        c.close()
+        c = cache.DiskCache(self.path)
+        self.assertEqual(c.get('/projects'), {'projects': ['p1']})
+        self.assertEqual(len(c), 1)
+        c.close()
+
+    def test_memory_backed_by_disk(self):
+        disk = cache.DiskCache(self.path)
+        cache.MemoryCache(backing=disk).set('/projects', None, 1)
+        mem = cache.MemoryCache(backing=disk)
+        self.assertEqual(mem.get('/projects'), 1)
+        self.assertEqual(len(mem), 1)
+        disk.close()
+
+
+class ClientCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.c = client.Client(base_url=BASE_URL, cache=cache.MemoryCache())
+        self.response = mock.Mock()
+        self.response.status_code = requests.codes.ok
+
+    def test_cached_response(self):
+        self.response.content = json.dumps(
+            {'projects': ['p1']}).encode('utf-8')
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            self.assertEqual(self.c.get_projects(), ['p1'])
+            self.assertEqual(self.c.get_projects(), ['p1'])
+        self.assertEqual(getter.call_count, 1)
+        stats = self.c.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_shared_between_endpoints(self):
+        other = client.Client(base_url='http://other:9000',
+                              cache=self.c.cache)
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            for c, projects in ((self.c, ['p1']), (other, ['p2'])):
+                self.response.content = json.dumps(
+                    {'projects': projects}).encode('utf-8')
+                self.assertEqual(c.get_projects(), projects)
+            self.assertEqual(self.c.get_projects(), ['p1'])
+            self.assertEqual(other.get_projects(), ['p2'])
+        self.assertEqual(getter.call_count, 2)
+
+    def test_errors_not_cached(self):
+        self.response.status_code = requests.codes.server_error
+        self.response.content = json.dumps({}).encode('utf-8')
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            self.c.get_project_volume_sum('p1', 'meter')
+            self.c.get_project_volume_sum('p1', 'meter')
+        self.assertEqual(getter.call_count, 2)
+
+    def test_no_cache(self):
+        self.assertEqual(client.Client(base_url=BASE_URL).cache_stats(), None)
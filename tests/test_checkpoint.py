@@ -0,0 +1,104 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ceilometerclient import checkpoint
+from ceilometerclient import writers
+
+
+class CheckpointTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'export.checkpoint')
+        self.output = open(os.path.join(self.tmpdir, 'export.csv'), 'w+')
+
+    def tearDown(self):
+        self.output.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_marks_survive_reopen(self):
+        with checkpoint.Checkpoint(self.path, self.output) as done:
+            self.output.write('header\n')
+            self.output.write('row1\n')
+            done.mark('p1', '2012-09-01T00:00:00')
+            self.output.write('row2\n')
+            done.mark('p1', '2012-09-02T00:00:00')
+        done = checkpoint.Checkpoint(self.path)
+        self.assertTrue(('p1', '2012-09-01T00:00:00') in done)
+        self.assertTrue(('p1', '2012-09-02T00:00:00') in done)
+        self.assertFalse(('p2', '2012-09-01T00:00:00') in done)
+        self.assertEqual(done.offset, len('header\nrow1\nrow2\n'))
+        done.close()
+
+    def test_resume_truncates_output(self):
+        with checkpoint.Checkpoint(self.path, self.output) as done:
+            self.output.write('header\nrow1\n')
+            done.mark('p1')
+            self.output.write('partial row')
+        with checkpoint.Checkpoint(self.path) as done:
+            self.assertTrue(done.resume(self.output))
+        self.output.seek(0)
+        self.assertEqual(self.output.read(), 'header\nrow1\n')
+
+    def test_resume_without_marks(self):
+        with checkpoint.Checkpoint(self.path) as done:
+            self.assertFalse(done.resume(self.output))
+
+    def test_partial_line_ignored(self):
+        with checkpoint.Checkpoint(self.path) as done:
+            done.mark('p1')
+        with open(self.path, 'a') as f:
+            f.write('{"units": [["p')
+        with checkpoint.Checkpoint(self.path) as done:
+            self.assertEqual(list(done), [('p1',)])
+            done.mark('p2')
+        with checkpoint.Checkpoint(self.path) as done:
+            self.assertEqual(sorted(done), [('p1',), ('p2',)])
+
+    def test_reset(self):
+        with checkpoint.Checkpoint(self.path) as done:
+            done.mark('p1')
+            done.mark('p2')
+            done.reset([('p2',), ('p3',)])
+        with checkpoint.Checkpoint(self.path) as done:
+            self.assertEqual(sorted(done), [('p2',), ('p3',)])
+
+    def test_in_memory(self):
+        done = checkpoint.Checkpoint(None)
+        done.mark('p1')
+        self.assertTrue(('p1',) in done)
+        self.assertEqual(len(done), 1)
+        done.close()
+
+    def test_batched_commits(self):
+        done = checkpoint.Checkpoint(self.path, self.output, every=2)
+        self.output.write('row1\n')
+        done.mark('p1')
+        with open(self.path) as f:
+            self.assertEqual(f.read(), '')
+        self.output.write('row2\n')
+        done.mark('p2')
+        self.output.write('row3\n')
+        done.mark('p3')
+        with checkpoint.Checkpoint(self.path) as saved:
+            self.assertEqual(sorted(saved), [('p1',), ('p2',)])
+            self.assertEqual(saved.offset, len('row1\nrow2\n'))
+        done.close()
+        with checkpoint.Checkpoint(self.path) as saved:
+            self.assertEqual(len(saved), 3)
+
+    def test_commits_follow_writer_batches(self):
+        with open(os.path.join(self.tmpdir, 'rows.csv'), 'wb') as f:
+            dumper = writers.CSVWriter(f, ['n'], batch_size=3)
+            done = checkpoint.Checkpoint(self.path, dumper, every=None)
+            for n in range(5):
+                dumper.writerow({'n': n})
+                done.mark(str(n))
+            with checkpoint.Checkpoint(self.path) as saved:
+                self.assertEqual(sorted(saved), [('0',), ('1',), ('2',)])
+            self.assertEqual(dumper._rows, [{'n': 3}, {'n': 4}])
+            done.close()
+            dumper.close()
@@ -0,0 +1,128 @@
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import mock
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from ceilometerclient import cli
+from ceilometerclient.cli import bandwidth
+from ceilometerclient.cli import common
+from ceilometerclient.cli import resources
+
+HEAVY = ['keystoneclient', 'multiprocessing', 'numpy', 'orjson',
+         'pyarrow', 'ujson']
+if sys.version_info >= (3, 7):
+    HEAVY.append('requests')
+
+
+class CLITests(unittest.TestCase):
+
+    def test_resources(self):
+        with mock.patch.object(common, 'export') as export:
+            cli.main(['resources', '--workers', '4', 'out.csv'])
+        report, args, parser = export.call_args[0]
+        self.assertIs(report, resources.REPORT)
+        self.assertEqual(args.workers, 4)
+        self.assertEqual(args.filename, 'out.csv')
+
+    def test_bandwidth(self):
+        with mock.patch.object(common, 'export') as export:
+            cli.main(['bandwidth', '--since-last-run', 'out.csv'])
+        report, args, parser = export.call_args[0]
+        self.assertIs(report, bandwidth.REPORT)
+        self.assertEqual(export.call_args[1], {'update': bandwidth.update})
+        self.assertTrue(args.since_last_run)
+
+    def test_unknown_command(self):
+        with mock.patch('sys.stderr'):
+            self.assertRaises(SystemExit, cli.main, ['nosuchreport', 'x'])
+
+    def test_make_client_base_url(self):
+        with mock.patch.object(common, 'export') as export:
+            cli.main(['resources', '--base-url', 'http://h:1', 'out.csv'])
+        args = export.call_args[0][1]
+        args.os_username = None
+        ceilometer = common.make_client(args)
+        self.assertEqual(ceilometer.base_url, 'http://h:1')
+
+    def test_import_is_light(self):
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            'import sys\n'
+            'from ceilometerclient import cli\n'
+            'from ceilometerclient.cli import bandwidth, resources\n'
+            'print(",".join(sorted(set(name.split(".")[0]\n'
+            '                          for name in sys.modules))))\n'])
+        loaded = output.decode('ascii').strip().split(',')
+        self.assertEqual([name for name in HEAVY if name in loaded], [])
+
+
+class ExportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'out.csv')
+        self.checkpoint = self.filename + '.checkpoint'
+        patcher = mock.patch.object(common, 'make_client')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def export(self, dump, *argv):
+        parser = argparse.ArgumentParser()
+        common.add_arguments(parser)
+        args = parser.parse_args(list(argv) + [self.filename])
+        report = common.Report(['n'], {}, dump)
+        common.export(report, args, parser)
+
+    def test_checkpoint_removed_when_done(self):
+        def dump(ceilometer, dumper, args, checkpoint=None, projects=None):
+            dumper.writerow({'n': 1})
+            checkpoint.mark('1')
+        self.export(dump)
+        self.assertFalse(os.path.exists(self.checkpoint))
+        with open(self.filename) as f:
+            self.assertEqual(f.read().split(), ['n', '1'])
+
+    def test_checkpoint_kept_when_interrupted(self):
+        def dump(ceilometer, dumper, args, checkpoint=None, projects=None):
+            dumper.writerow({'n': 1})
+            checkpoint.mark('1')
+            raise KeyboardInterrupt()
+        self.assertRaises(KeyboardInterrupt, self.export, dump)
+        self.assertTrue(os.path.exists(self.checkpoint))
+
+        def resumed(ceilometer, dumper, args, checkpoint=None,
+                    projects=None):
+            self.assertTrue(('1',) in checkpoint)
+            dumper.writerow({'n': 2})
+        self.export(resumed, '--resume')
+        self.assertFalse(os.path.exists(self.checkpoint))
+        with open(self.filename) as f:
+            self.assertEqual(f.read().split(), ['n', '1', '2'])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_not_checkpointed(self):
+        self.filename = os.path.join(self.tmpdir, 'out.parquet')
+
+        def dump(ceilometer, dumper, args, checkpoint=None, projects=None):
+            self.assertIs(checkpoint, None)
+            dumper.writerows({'n': n} for n in range(1500))
+        self.export(dump)
+        self.assertFalse(os.path.exists(self.filename + '.checkpoint'))
+        metadata = pyarrow.parquet.ParquetFile(self.filename).metadata
+        self.assertEqual(metadata.num_rows, 1500)
+        self.assertEqual(metadata.num_row_groups, 2)
@@ -0,0 +1,171 @@
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+from ceilometerclient.cli import bandwidth
+from ceilometerclient.cli import common
+from ceilometerclient import checkpoint
+from ceilometerclient import writers
+
+
+def make_client(projects=('p1', 'p2'), fail_project=None, wait=None):
+    """A stand-in for Client whose bandwidth volumes are the day of the
+    window, with no internal traffic for p2, raising IOError for
+    ``fail_project`` if given (once the ``wait`` event is set, if any).
+    """
+    ceilometer = mock.Mock()
+    ceilometer.get_projects.return_value = [None] + list(projects)
+
+    def matrix(project_id, meters, windows, workers=1):
+        if project_id == fail_project:
+            if wait is not None:
+                wait.wait(5)
+            raise IOError('connection reset')
+        return [[None if project_id == 'p2' and ':internal.' in meter
+                 else float(start.day)
+                 for meter in meters]
+                for start, end in windows]
+    ceilometer.get_project_volume_matrix.side_effect = matrix
+    return ceilometer
+
+
+class Rows(list):
+
+    writerow = list.append
+
+
+def fetched(ceilometer):
+    """Returns the (project_id, day) pairs the client was asked for."""
+    calls = ceilometer.get_project_volume_matrix.call_args_list
+    return sorted((call[0][0], start.isoformat())
+                  for call in calls
+                  for start, end in call[0][2])
+
+
+class DumpBandwidthTests(unittest.TestCase):
+
+    def test_rows(self):
+        rows = Rows()
+        written = bandwidth.dump_bandwidth(make_client(), rows, 2)
+        windows = bandwidth.report_windows(2)
+        self.assertEqual(written, 12)
+        self.assertEqual(
+            [(row['project_id'], row['date'], row['category'], row['type'])
+             for row in rows],
+            [(project_id, start, category, type_)
+             for project_id, categories in (('p1', ['internal', 'external']),
+                                            ('p2', ['external']))
+             for start, _ in windows
+             for category in categories
+             for type_ in ('in', 'out')])
+        for row in rows:
+            self.assertEqual(row['bytes'], float(row['date'].day))
+            self.assertEqual(row['packets'], float(row['date'].day))
+
+    def test_checkpoint(self):
+        windows = bandwidth.report_windows(2)
+        done = checkpoint.Checkpoint(None)
+        done.mark('p1', windows[0][0].isoformat())
+        ceilometer = make_client()
+        rows = Rows()
+        bandwidth.dump_bandwidth(ceilometer, rows, 2, checkpoint=done)
+        self.assertEqual(fetched(ceilometer), sorted(
+            [('p1', windows[1][0].isoformat())] +
+            [('p2', start.isoformat()) for start, _ in windows]))
+        self.assertEqual(len(done), 4)
+
+
+class ExportBandwidthTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'out.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def export(self, ceilometer, *argv):
+        parser = argparse.ArgumentParser()
+        bandwidth.add_arguments(parser)
+        args = parser.parse_args(list(argv) + [self.filename])
+        with mock.patch.object(common, 'make_client',
+                               return_value=ceilometer):
+            bandwidth.run(args, parser)
+
+    def read(self):
+        with open(self.filename, 'rb') as f:
+            return [(row['project_id'], row['date'], row['category'],
+                     row['type'], row['bytes'])
+                    for row in writers.read_rows(f, 'csv')]
+
+    def test_since_last_run(self):
+        self.export(make_client(), '--days', '2')
+        self.assertFalse(os.path.exists(self.filename + '.checkpoint'))
+        before = self.read()
+
+        ceilometer = make_client(projects=('p1', 'p2', 'p3'))
+        self.export(ceilometer, '--days', '3', '--since-last-run')
+        windows = bandwidth.report_windows(3)
+        self.assertEqual(fetched(ceilometer), sorted(
+            [(project_id, windows[2][0].isoformat())
+             for project_id in ('p1', 'p2', 'p3')] +
+            [('p3', start.isoformat()) for start, _ in windows[:2]]))
+        merged = self.read()
+        self.assertTrue(set(before) < set(merged))
+
+        self.export(make_client(projects=('p1', 'p2', 'p3')), '--days', '3')
+        self.assertEqual(len(merged), 30)
+        self.assertEqual(merged, self.read())
+
+    def test_since_last_run_drops_old_days(self):
+        self.export(make_client(), '--days', '3')
+        ceilometer = make_client()
+        self.export(ceilometer, '--days', '2', '--since-last-run')
+        self.assertFalse(ceilometer.get_project_volume_matrix.called)
+        oldest = str(bandwidth.report_windows(3)[2][0])
+        rows = self.read()
+        self.assertEqual(len(rows), 12)
+        self.assertFalse(any(row[1] == oldest for row in rows))
+
+    def test_resume(self):
+        self.export(make_client(), '--days', '2')
+        expected = self.read()
+
+        writing = threading.Event()
+        written = []
+        dump = bandwidth.dump_bandwidth
+
+        def slow_dump(ceilometer, dumper, *args, **kwargs):
+            writerow = dumper.writerow
+
+            def slow_writerow(row):
+                written.append(row)
+                if len(written) > 4:
+                    writing.set()
+                time.sleep(0.01)
+                writerow(row)
+            dumper.writerow = slow_writerow
+            return dump(ceilometer, dumper, *args, **kwargs)
+
+        # p2 fails while the rows of the second day of p1 are being
+        # written: p1 is finished, and nothing else is.
+        with mock.patch.object(bandwidth, 'dump_bandwidth', slow_dump):
+            self.assertRaises(IOError, self.export,
+                              make_client(fail_project='p2', wait=writing),
+                              '--days', '2')
+        self.assertTrue(os.path.exists(self.filename + '.checkpoint'))
+        self.assertEqual(self.read(), expected[:8])
+
+        ceilometer = make_client()
+        self.export(ceilometer, '--days', '2', '--resume')
+        windows = bandwidth.report_windows(2)
+        self.assertEqual(fetched(ceilometer), sorted(
+            ('p2', start.isoformat()) for start, _ in windows))
+        self.assertEqual(self.read(), expected)
+        self.assertFalse(os.path.exists(self.filename + '.checkpoint'))
@@ -0,0 +1,207 @@
+import argparse
+import functools
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from ceilometerclient.cli import common
+from ceilometerclient.cli import resources
+from ceilometerclient import checkpoint
+from ceilometerclient import writers
+
+RESOURCES = {
+    'p1': [
+        {'resource_id': 'vm-1',
+         'metadata': {'name': 'instance', 'display_name': 'vm'},
+         'meter': [{'counter_name': 'instance:m1.small'},
+                   {'counter_name': 'cpu'}]},
+        {'resource_id': 'disk-1',
+         'metadata': {'name': 'volume', 'size': 10},
+         'meter': [{'counter_name': 'volume.size'}]},
+    ],
+    'p2': [
+        {'resource_id': 'port-1',
+         'metadata': {'name': 'port', 'network_id': 'net-1',
+                      'mac_address': 'fa:16:3e:00:00:01',
+                      'fixed_ips': [{'ip_address': '10.0.0.2'},
+                                    {'ip_address': '10.0.0.3'}]},
+         'meter': [{'counter_name': 'port'}]},
+    ],
+}
+
+
+def make_client(fail_after=None):
+    """A stand-in for Client serving RESOURCES, raising IOError after
+    ``fail_after`` duration lookups if given.
+    """
+    ceilometer = mock.Mock()
+    ceilometer.get_projects.return_value = [None, 'p1', 'p2']
+    ceilometer.get_resources.side_effect = (
+        lambda project_id: RESOURCES[project_id])
+    durations = []
+
+    def duration(resource_id, meter):
+        durations.append(resource_id)
+        if fail_after is not None and len(durations) > fail_after:
+            raise IOError('connection reset')
+        return {'start_timestamp': '2012-09-01T00:00:00',
+                'end_timestamp': '2012-09-02T00:00:00',
+                'duration': 86400.0}
+    ceilometer.get_resource_duration_info.side_effect = duration
+    ceilometer.get_resource_volume_max.return_value = 20
+    return ceilometer
+
+
+class Rows(list):
+
+    writerow = list.append
+
+
+class DispatchTests(unittest.TestCase):
+
+    def setUp(self):
+        exact = dict(resources._EXACT_METERS)
+        prefixes = list(resources._PREFIX_METERS)
+
+        def restore():
+            resources._EXACT_METERS.clear()
+            resources._EXACT_METERS.update(exact)
+            resources._PREFIX_METERS[:] = prefixes
+            resources._classified.clear()
+        self.addCleanup(restore)
+
+    def test_exact_meter(self):
+        type_, _, calls = resources.classify('volume.size')
+        self.assertEqual((type_, calls), ('volume', ('size', 'duration')))
+
+    def test_prefix_meter(self):
+        type_, fields, calls = resources.classify('instance:m1.small')
+        self.assertEqual((type_, calls), ('instance', ('duration',)))
+        self.assertEqual(fields('instance:m1.small', {}),
+                         {'instance_flavor': 'm1.small'})
+
+    def test_unknown_meter(self):
+        self.assertEqual(resources.classify('cpu'), None)
+
+    def test_exact_meter_before_prefix(self):
+        @resources.meter_type('baremetal', 'instance:baremetal', calls=())
+        def baremetal(meter, metadata):
+            return {}
+        self.assertEqual(resources.classify('instance:baremetal')[0],
+                         'baremetal')
+        self.assertEqual(resources.classify('instance:m1.small')[0],
+                         'instance')
+
+    def test_registering_clears_memo(self):
+        self.assertEqual(resources.classify('router:ha'), None)
+
+        @resources.meter_type('router', prefix='router:')
+        def router(meter, metadata):
+            return {}
+        self.assertEqual(resources.classify('router:ha')[0], 'router')
+
+    def test_plan_calls_made_once(self):
+        ceilometer = make_client()
+        planned = [
+            (('p1', 'disk-1', 'volume.size'), {'n': 1},
+             [('size', 'disk-1', 'volume.size'),
+              ('duration', 'disk-1', 'volume.size')]),
+            (('p1', 'disk-1', 'volume.size'), {'n': 2},
+             [('size', 'disk-1', 'volume.size')]),
+        ]
+        rows = resources.run_plan(ceilometer, planned, workers=2)
+        self.assertEqual(ceilometer.get_resource_volume_max.call_count, 1)
+        self.assertEqual(ceilometer.get_resource_duration_info.call_count, 1)
+        self.assertEqual([row['n'] for _, row in rows], [1, 2])
+        self.assertEqual([row['size'] for _, row in rows], [20, 20])
+        self.assertEqual(rows[0][1]['duration'], 86400.0)
+        self.assertFalse('duration' in rows[1][1])
+
+
+class DumpResourcesTests(unittest.TestCase):
+
+    def test_rows(self):
+        rows = Rows()
+        written = resources.dump_resources(make_client(), rows, workers=2,
+                                           batch_size=2)
+        self.assertEqual(written, 3)
+        self.assertEqual([(row['project_id'], row['resource_id'],
+                           row['type']) for row in rows],
+                         [('p1', 'vm-1', 'instance'),
+                          ('p1', 'disk-1', 'volume'),
+                          ('p2', 'port-1', 'port')])
+        instance, volume, port = rows
+        self.assertEqual(instance['instance_flavor'], 'm1.small')
+        self.assertEqual(instance['display_name'], 'vm')
+        self.assertEqual(instance['duration'], 86400.0)
+        self.assertEqual(instance['first_seen'], '2012-09-01T00:00:00')
+        self.assertEqual(volume['size'], 20)
+        self.assertEqual(port['mac'], 'fa:16:3e:00:00:01')
+        self.assertEqual(port['ips'], '10.0.0.2,10.0.0.3')
+        self.assertEqual(sorted(rows[0].keys()),
+                         sorted(resources.RESOURCE_FIELDS))
+
+    def test_checkpointed_units_skipped(self):
+        done = checkpoint.Checkpoint(None)
+        done.mark('p1', 'vm-1', 'instance:m1.small')
+        rows = Rows()
+        resources.dump_resources(make_client(), rows, checkpoint=done)
+        self.assertEqual([row['resource_id'] for row in rows],
+                         ['disk-1', 'port-1'])
+        self.assertTrue(('p2', 'port-1', 'port') in done)
+
+    def test_projects(self):
+        rows = Rows()
+        ceilometer = make_client()
+        resources.dump_resources(ceilometer, rows, projects=['p2'])
+        self.assertEqual([row['resource_id'] for row in rows], ['port-1'])
+        self.assertFalse(ceilometer.get_projects.called)
+
+
+class ExportResourcesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def export(self, ceilometer, filename, *argv):
+        parser = argparse.ArgumentParser()
+        resources.add_arguments(parser)
+        args = parser.parse_args(list(argv) + [filename])
+        # One row per batch, so an export can fail part way through.
+        dump = functools.partial(resources.dump_resources, batch_size=1)
+        with mock.patch.object(common, 'make_client',
+                               return_value=ceilometer):
+            with mock.patch.object(resources, 'dump_resources', dump):
+                resources.run(args, parser)
+
+    def read(self, filename):
+        with open(filename, 'rb') as f:
+            return list(writers.read_rows(f, 'csv'))
+
+    def test_resume(self):
+        expected = os.path.join(self.tmpdir, 'expected.csv')
+        self.export(make_client(), expected)
+
+        filename = os.path.join(self.tmpdir, 'out.csv')
+        self.assertRaises(IOError, self.export, make_client(fail_after=1),
+                          filename)
+        self.assertTrue(os.path.exists(filename + '.checkpoint'))
+        # The first row may or may not have been written before the
+        # failure stopped the pipeline.
+        written = [row['resource_id'] for row in self.read(filename)]
+        self.assertTrue(written in ([], ['vm-1']), written)
+
+        ceilometer = make_client()
+        self.export(ceilometer, filename, '--resume')
+        self.assertEqual(
+            [call[1]['resource_id'] for call in
+             ceilometer.get_resource_duration_info.call_args_list],
+            ['vm-1', 'disk-1', 'port-1'][len(written):])
+        self.assertEqual(self.read(filename), self.read(expected))
+        self.assertFalse(os.path.exists(filename + '.checkpoint'))
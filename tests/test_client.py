@@ -0,0 +1,101 @@
+
+import json
+import threading
+import time
+import unittest
+
+import mock
+
+from ceilometerclient import client
+
+BASE_URL = u'http://localhost:9000'
+
+
+class ClientPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.c = client.Client(base_url=BASE_URL,
+                               pool_connections=2,
+                               pool_maxsize=4,
+                               pool_block=True,
+                               max_retries=5,
+                               )
+
+    def test_session_adapter_configured(self):
+        adapter = self.c.session.get_adapter(BASE_URL)
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertEqual(adapter._pool_block, True)
+        self.assertEqual(adapter.max_retries.total, 5)
+        self.assertIs(adapter, self.c.session.get_adapter('https://x/'))
+
+    def test_get_uses_session(self):
+        with mock.patch('requests.Session.get') as getter:
+            self.c.get('/projects')
+            getter.assert_called_once_with('%s/v1/projects' % BASE_URL)
+
+    def test_pool_stats_empty(self):
+        self.assertEqual(self.c.pool_stats(),
+                         {'requests': 0, 'new_connections': 0, 'pool_hits': 0})
+
+    def test_pool_stats_counts_reuse(self):
+        adapter = self.c.session.get_adapter(BASE_URL)
+        pool = adapter.poolmanager.connection_from_url(BASE_URL)
+        pool.num_requests = 10
+        pool.num_connections = 2
+        self.assertEqual(self.c.pool_stats(),
+                         {'requests': 10, 'new_connections': 2,
+                          'pool_hits': 8})
+
+    def test_context_manager_closes_session(self):
+        with mock.patch('requests.Session.close') as closer:
+            with self.c:
+                pass
+            closer.assert_called_once_with()
+
+
+class ClientSingleFlightTests(unittest.TestCase):
+
+    def setUp(self):
+        self.c = client.Client(base_url=BASE_URL)
+        self.release = threading.Event()
+        self.response = mock.Mock()
+        self.response.status_code = 200
+        self.response.content = json.dumps(
+            {'projects': ['p1']}).encode('utf-8')
+
+    def slow_get(self, *args, **kwargs):
+        self.release.wait(5)
+        return self.response
+
+    def test_concurrent_identical_requests_shared(self):
+        results = []
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = self.slow_get
+            threads = [threading.Thread(
+                target=lambda: results.append(self.c.get_projects()))
+                for _ in range(4)]
+            for t in threads:
+                t.start()
+            while self.c.single_flight_stats()['saved'] < 3:
+                time.sleep(0.001)
+            self.release.set()
+            for t in threads:
+                t.join()
+        self.assertEqual(results, [['p1']] * 4)
+        self.assertEqual(getter.call_count, 1)
+        self.assertEqual(self.c.single_flight_stats(),
+                         {'calls': 1, 'saved': 3})
+
+    def test_different_params_not_shared(self):
+        self.release.set()
+        self.response.content = json.dumps({'volume': 1}).encode('utf-8')
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = self.slow_get
+            self.c.get_project_volume_sum('p1', 'm')
+            self.c.get_project_volume_max('p1', 'm')
+        self.assertEqual(getter.call_count, 2)
+
+    def test_disabled(self):
+        c = client.Client(base_url=BASE_URL, single_flight=False)
+        self.assertEqual(c.single_flight_stats(), None)
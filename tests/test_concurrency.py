@@ -0,0 +1,159 @@
+
+import threading
+import time
+import unittest
+
+from ceilometerclient import concurrency
+
+
+class ThreadPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = concurrency.ThreadPool(4)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_submit(self):
+        future = self.pool.submit(lambda a, b: a + b, 1, b=2)
+        self.assertEqual(future.result(), 3)
+        self.assertTrue(future.done())
+
+    def test_submit_exception(self):
+        def fail():
+            raise ValueError('boom')
+        future = self.pool.submit(fail)
+        self.assertRaises(ValueError, future.result)
+
+    def test_imap_keeps_order(self):
+        def slow_square(n):
+            time.sleep(0.001 * (10 - n))
+            return n * n
+        results = list(self.pool.imap(slow_square, range(10)))
+        self.assertEqual(results, [n * n for n in range(10)])
+
+    def test_imap_unordered(self):
+        results = list(self.pool.imap_unordered(lambda n: n * 2, range(10)))
+        self.assertEqual(sorted(results), [n * 2 for n in range(10)])
+
+    def test_imap_bounds_inflight(self):
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def items():
+            for n in range(50):
+                with lock:
+                    state['active'] += 1
+                    state['peak'] = max(state['peak'], state['active'])
+                yield n
+
+        for _ in self.pool.imap(lambda n: n, items(), window=3):
+            with lock:
+                state['active'] -= 1
+        self.assertTrue(state['peak'] <= 3)
+
+    def test_imap_runs_concurrently(self):
+        barrier = threading.Event()
+        seen = []
+
+        def wait_for_peer(n):
+            seen.append(n)
+            if len(seen) == 2:
+                barrier.set()
+            return barrier.wait(5)
+
+        self.assertEqual(list(self.pool.imap(wait_for_peer, range(2))),
+                         [True, True])
+
+    def test_cancel_pending(self):
+        future = concurrency.Future()
+        self.assertTrue(future.cancel())
+        self.assertTrue(future.cancelled())
+        self.assertFalse(future.set_running())
+        self.assertRaises(concurrency.CancelledError, future.result)
+
+
+class ImapOrderedTests(unittest.TestCase):
+
+    def test_serial(self):
+        threads = set()
+
+        def record(n):
+            threads.add(threading.current_thread())
+            return n
+        self.assertEqual(list(concurrency.imap_ordered(record, range(5))),
+                         list(range(5)))
+        self.assertEqual(threads, set([threading.current_thread()]))
+
+    def test_parallel(self):
+        self.assertEqual(
+            list(concurrency.imap_ordered(str, range(20), workers=5)),
+            [str(n) for n in range(20)])
+
+
+class ImapUnorderedTests(unittest.TestCase):
+
+    def test_serial(self):
+        self.assertEqual(list(concurrency.imap_unordered(str, range(5))),
+                         [str(n) for n in range(5)])
+
+    def test_parallel(self):
+        self.assertEqual(
+            sorted(concurrency.imap_unordered(int, range(20), workers=5)),
+            list(range(20)))
+
+
+class SingleFlightTests(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = concurrency.SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+
+    def slow(self, value):
+        self.calls.append(value)
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def run_concurrently(self, key, value, followers=3):
+        results = []
+
+        def call():
+            try:
+                results.append(self.flight.do(key, self.slow, value))
+            except Exception as e:
+                results.append(e)
+        leader = threading.Thread(target=call)
+        leader.start()
+        self.started.wait(5)
+        threads = [threading.Thread(target=call) for _ in range(followers)]
+        for t in threads:
+            t.start()
+        while self.flight.stats()['saved'] < followers:
+            time.sleep(0.001)
+        self.release.set()
+        for t in [leader] + threads:
+            t.join()
+        return results
+
+    def test_shares_result(self):
+        results = self.run_concurrently('k', 42)
+        self.assertEqual(results, [42] * 4)
+        self.assertEqual(self.calls, [42])
+        self.assertEqual(self.flight.stats(), {'calls': 1, 'saved': 3})
+
+    def test_shares_exception(self):
+        error = ValueError('boom')
+        results = self.run_concurrently('k', error)
+        self.assertEqual(results, [error] * 4)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_later_calls_not_shared(self):
+        self.release.set()
+        self.assertEqual(self.flight.do('k', self.slow, 1), 1)
+        self.assertEqual(self.flight.do('k', self.slow, 2), 2)
+        self.assertEqual(self.flight.stats(), {'calls': 2, 'saved': 0})
@@ -0,0 +1,183 @@
+import datetime
+import gc
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+import unittest
+
+import mock
+import requests
+
+from ceilometerclient import client
+from ceilometerclient import credentials
+
+BASE_URL = u'http://localhost:9000'
+
+
+def make_keystone(token='token-1', expires_in=3600, username='user'):
+    keystone = mock.Mock()
+    keystone.auth_url = 'http://keystone:5000/v2.0'
+    keystone.username = username
+    keystone.tenant_id = None
+    keystone.tenant_name = 'tenant'
+    keystone.auth_token = token
+    keystone.auth_ref.expires = (datetime.datetime.utcnow() +
+                                 datetime.timedelta(seconds=expires_in))
+    keystone.service_catalog.get_endpoints.return_value = {
+        'metering': [{'adminURL': BASE_URL + '/'}]}
+    tokens = iter(['token-%d' % i for i in range(2, 10)])
+
+    def authenticate():
+        keystone.auth_token = next(tokens)
+        keystone.auth_ref.expires = (datetime.datetime.utcnow() +
+                                     datetime.timedelta(hours=1))
+    keystone.authenticate.side_effect = authenticate
+    return keystone
+
+
+class CredentialsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'tokens.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_token_and_endpoint_cached(self):
+        keystone = make_keystone()
+        creds = credentials.Credentials(keystone)
+        self.assertEqual(creds.endpoint('metering', 'adminURL'), BASE_URL)
+        self.assertEqual(creds.endpoint('metering', 'adminURL'), BASE_URL)
+        self.assertEqual(creds.token(), 'token-1')
+        self.assertEqual(creds.token(), 'token-1')
+        self.assertEqual(
+            keystone.service_catalog.get_endpoints.call_count, 1)
+        self.assertFalse(keystone.authenticate.called)
+
+    def test_expired_token_renewed(self):
+        keystone = make_keystone(expires_in=-1)
+        creds = credentials.Credentials(keystone)
+        self.assertEqual(creds.token(), 'token-2')
+        self.assertEqual(creds.stats()['authentications'], 1)
+
+    def test_expiring_token_renewed_in_background(self):
+        keystone = make_keystone(expires_in=60)
+        creds = credentials.Credentials(keystone, refresh_before=300)
+        self.assertEqual(creds.token(), 'token-1')
+        for _ in range(500):
+            if creds.token() == 'token-2':
+                break
+            time.sleep(0.01)
+        self.assertEqual(creds.token(), 'token-2')
+        self.assertEqual(creds.stats()['background_refreshes'], 1)
+
+    def test_expiring_token_renewed_in_foreground(self):
+        keystone = make_keystone(expires_in=60)
+        creds = credentials.Credentials(keystone, refresh_before=300,
+                                        background=False)
+        self.assertEqual(creds.token(), 'token-1')
+        self.assertEqual(creds.token(), 'token-2')
+
+    def test_refresh_only_once_for_stale_token(self):
+        creds = credentials.Credentials(make_keystone())
+        self.assertEqual(creds.refresh(stale='token-1'), 'token-2')
+        self.assertEqual(creds.refresh(stale='token-1'), 'token-2')
+        self.assertEqual(creds.stats()['authentications'], 1)
+
+    def test_shared_between_clients(self):
+        keystone = make_keystone(username='shared')
+        self.assertTrue(credentials.Credentials.for_keystone_client(keystone)
+                        is credentials.Credentials.for_keystone_client(
+                            make_keystone(username='shared')))
+        clients = [client.Client(keystone), client.Client(keystone)]
+        self.assertTrue(clients[0].credentials is clients[1].credentials)
+        self.assertEqual(
+            keystone.service_catalog.get_endpoints.call_count, 1)
+
+    def test_token_users_not_shared(self):
+        first, second = make_keystone(username=None), make_keystone(
+            token='other-token', username=None)
+        first.auth_ref.user_id = 'user-id-1'
+        second.auth_ref.user_id = 'user-id-2'
+        first_credentials = credentials.Credentials.for_keystone_client(
+            first)
+        second_credentials = credentials.Credentials.for_keystone_client(
+            second)
+        self.assertFalse(first_credentials is second_credentials)
+        self.assertEqual(second_credentials.token(), 'other-token')
+
+    def test_unknown_user_not_shared(self):
+        keystone = make_keystone(username=None)
+        self.assertFalse(credentials.Credentials.for_keystone_client(keystone)
+                         is credentials.Credentials.for_keystone_client(
+                             make_keystone(username=None)))
+
+    def test_shared_only_while_used(self):
+        keystone = make_keystone(username='released')
+        shared = credentials.Credentials.for_keystone_client(keystone)
+        key = shared.identity
+        self.assertTrue(key in credentials.Credentials._shared)
+        del shared
+        gc.collect()
+        self.assertFalse(key in credentials.Credentials._shared)
+
+    def test_file_cache_avoids_keystone(self):
+        factory = mock.Mock(return_value=make_keystone())
+        identity = ('http://keystone:5000/v2.0', 'user', 'tenant')
+        creds = credentials.Credentials(factory=factory, identity=identity,
+                                        path=self.path)
+        self.assertEqual(creds.endpoint('metering', 'adminURL'), BASE_URL)
+        self.assertEqual(creds.token(), 'token-1')
+        self.assertEqual(factory.call_count, 1)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+        creds = credentials.Credentials(factory=factory, identity=identity,
+                                        path=self.path)
+        self.assertEqual(creds.endpoint('metering', 'adminURL'), BASE_URL)
+        self.assertEqual(creds.token(), 'token-1')
+        self.assertEqual(factory.call_count, 1)
+        self.assertEqual(creds.stats()['loaded'], 1)
+
+    def test_file_cache_ignores_expired_token(self):
+        identity = ('http://keystone:5000/v2.0', 'user', 'tenant')
+        credentials.Credentials(make_keystone(expires_in=1),
+                                identity=identity, path=self.path).token()
+        with mock.patch('time.time', return_value=time.time() + 5):
+            creds = credentials.Credentials(
+                make_keystone(token='other'), identity=identity,
+                path=self.path)
+            self.assertEqual(creds.token(), 'other')
+
+
+class ClientReplayTests(unittest.TestCase):
+
+    def setUp(self):
+        self.keystone = make_keystone()
+        self.c = client.Client(
+            credentials=credentials.Credentials(self.keystone))
+
+    def response(self, status):
+        response = mock.Mock()
+        response.status_code = status
+        response.content = json.dumps({'projects': ['p1']}).encode('utf-8')
+        return response
+
+    def test_replayed_once_after_401(self):
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = [self.response(requests.codes.unauthorized),
+                                  self.response(requests.codes.ok)]
+            self.assertEqual(self.c.get_projects(), ['p1'])
+        tokens = [call[1]['headers']['X-Auth-Token']
+                  for call in getter.call_args_list]
+        self.assertEqual(tokens, ['token-1', 'token-2'])
+
+    def test_not_replayed_twice(self):
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response(requests.codes.unauthorized)
+            r = self.c.get('/projects')
+        self.assertEqual(r.status_code, requests.codes.unauthorized)
+        self.assertEqual(getter.call_count, 2)
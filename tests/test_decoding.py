@@ -0,0 +1,53 @@
+
+import json
+import unittest
+
+import mock
+
+from ceilometerclient import client
+from ceilometerclient import decoding
+
+BASE_URL = u'http://localhost:9000'
+BODY = {'events': [{'counter_volume': 1.5, 'resource_id': u'r\xe9'}]}
+
+
+class DecodingTests(unittest.TestCase):
+
+    def test_backends_decode_bytes(self):
+        data = json.dumps(BODY).encode('utf-8')
+        for name in decoding.available():
+            self.assertEqual(decoding.get_decoder(name)(data), BODY)
+
+    def test_json_always_available(self):
+        self.assertEqual(decoding.available()[-1], 'json')
+
+    def test_default_is_fastest(self):
+        name = decoding.available()[0]
+        self.assertIs(decoding.get_decoder(),
+                      decoding.get_decoder(name))
+
+    def test_callable(self):
+        loads = mock.Mock()
+        self.assertIs(decoding.get_decoder(loads), loads)
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, decoding.get_decoder, 'nosuchjson')
+
+
+class ClientDecoderTests(unittest.TestCase):
+
+    def test_decoder_used(self):
+        loads = mock.Mock(return_value={'projects': ['p1']})
+        c = client.Client(base_url=BASE_URL, decoder=loads)
+        response = mock.Mock(status_code=200, content=b'raw')
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = response
+            self.assertEqual(c.get_projects(), ['p1'])
+        loads.assert_called_once_with(b'raw')
+
+    def test_missing_key(self):
+        c = client.Client(base_url=BASE_URL, decoder='json')
+        response = mock.Mock(status_code=200, content=b'{}')
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = response
+            self.assertEqual(c.get_projects(), [])
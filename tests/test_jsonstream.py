@@ -0,0 +1,59 @@
+
+import json
+import unittest
+
+from ceilometerclient import jsonstream
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterItemsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.events = [{'counter_volume': i,
+                        'timestamp': '2012-09-01T00:00:%02d' % i,
+                        'resource_metadata': {'name': u'caf\xe9 %d' % i,
+                                              'tags': [1, [2, {}], '}]']},
+                        }
+                       for i in range(20)]
+        self.data = json.dumps({'before': 12345,
+                                'events': self.events,
+                                'after': [1, 2, 3],
+                                }).encode('utf-8')
+
+    def test_whole_document(self):
+        items = list(jsonstream.iter_items([self.data], 'events'))
+        self.assertEqual(items, self.events)
+
+    def test_any_chunk_size(self):
+        for size in (1, 2, 3, 7, 64, 1000):
+            items = list(jsonstream.iter_items(split(self.data, size),
+                                               'events'))
+            self.assertEqual(items, self.events, size)
+
+    def test_empty_array(self):
+        self.assertEqual(
+            list(jsonstream.iter_items([b'{"events": [ ]}'], 'events')), [])
+
+    def test_missing_key(self):
+        self.assertEqual(
+            list(jsonstream.iter_items([b'{"other": [1]}'], 'events')), [])
+        self.assertEqual(list(jsonstream.iter_items([b'{}'], 'events')), [])
+
+    def test_truncated(self):
+        chunks = split(self.data[:-20], 16)
+        self.assertRaises(ValueError, list,
+                          jsonstream.iter_items(chunks, 'events'))
+
+    def test_lazy(self):
+        consumed = []
+
+        def chunks():
+            for chunk in split(self.data, 8):
+                consumed.append(chunk)
+                yield chunk
+        items = jsonstream.iter_items(chunks(), 'events')
+        next(items)
+        self.assertTrue(len(consumed) < len(split(self.data, 8)) / 2)
@@ -0,0 +1,112 @@
+import json
+import unittest
+
+import mock
+
+import requests
+
+from ceilometerclient import client
+from ceilometerclient import metrics
+
+BASE_URL = u'http://localhost:9000'
+
+
+class EndpointTemplateTests(unittest.TestCase):
+
+    def test_templates(self):
+        self.assertEqual(metrics.endpoint_template('/projects'), '/projects')
+        self.assertEqual(metrics.endpoint_template('projects/p1/resources'),
+                         '/projects/{project_id}/resources')
+        self.assertEqual(
+            metrics.endpoint_template('/resources/meters/meters/cpu/duration'),
+            '/resources/{resource_id}/meters/{meter}/duration')
+
+
+class HistogramTests(unittest.TestCase):
+
+    def test_observe(self):
+        h = metrics.Histogram(buckets=(1, 2, float('inf')))
+        for value in (0.5, 1, 1.5, 3):
+            h.observe(value)
+        self.assertEqual(h.counts, [2, 1, 1])
+        self.assertEqual((h.count, h.sum, h.min, h.max), (4, 6.0, 0.5, 3))
+        self.assertEqual(h.cumulative(),
+                         [(1, 2), (2, 3), (float('inf'), 4)])
+
+    def test_quantile(self):
+        h = metrics.Histogram(buckets=(1, 2, float('inf')))
+        self.assertEqual(h.quantile(0.5), None)
+        for value in (0.5, 1, 1.5, 3):
+            h.observe(value)
+        self.assertEqual(h.quantile(0.5), 1)
+        self.assertEqual(h.quantile(1), 3)
+
+
+class ClientHookTests(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = metrics.Metrics()
+        self.c = client.Client(base_url=BASE_URL, hooks=[self.metrics])
+        self.response = mock.Mock()
+        self.response.status_code = requests.codes.ok
+        self.response.headers = {'Content-Length': '20'}
+        self.response.raw.retries.history = ('first try',)
+        self.response.content = json.dumps({'volume': 1}).encode('utf-8')
+
+    def test_hooks_called(self):
+        hook = mock.Mock()
+        self.c.hooks.append(hook)
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            self.c.get('/projects', params={'a': 1})
+        request = hook.before.call_args[0][0]
+        self.assertTrue(hook.after.call_args[0][0] is request)
+        self.assertEqual(request.url, '/projects')
+        self.assertEqual(request.params, {'a': 1})
+        self.assertTrue(request.response is self.response)
+        self.assertTrue(request.elapsed >= 0)
+
+    def test_metrics_per_endpoint(self):
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            self.c.get_project_volume_sum('p1', 'cpu')
+            self.c.get_project_volume_sum('p2', 'cpu')
+            self.response.status_code = requests.codes.server_error
+            self.c.get_project_volume_max('p1', 'cpu')
+        summary = self.metrics.summary()
+        stats = summary['/projects/{project_id}/meters/{meter}/volume/sum']
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['statuses'], {200: 2})
+        self.assertEqual(stats['bytes'], 40)
+        self.assertEqual(stats['retries'], 2)
+        stats = summary['/projects/{project_id}/meters/{meter}/volume/max']
+        self.assertEqual(stats['statuses'], {500: 1})
+
+    def test_error_counted(self):
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = requests.ConnectionError()
+            self.assertRaises(requests.ConnectionError,
+                              self.c.get_projects)
+        stats = self.metrics.summary()['/projects']
+        self.assertEqual((stats['requests'], stats['errors']), (1, 1))
+        self.assertEqual(stats['statuses'], {})
+
+    def test_exports(self):
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            self.c.get_projects()
+        self.assertTrue('ceilometerclient.projects.requests:1|c\n'
+                        in self.metrics.to_statsd())
+        self.assertTrue('ceilometerclient.projects.status.200:1|c\n'
+                        in self.metrics.to_statsd())
+        text = self.metrics.to_prometheus()
+        self.assertTrue('ceilometerclient_request_duration_seconds_bucket'
+                        '{endpoint="/projects",le="+Inf"} 1\n' in text)
+        self.assertTrue('ceilometerclient_responses_total'
+                        '{endpoint="/projects",code="200"} 1\n' in text)
+        self.assertTrue(self.metrics.format_summary().splitlines()[1]
+                        .startswith('/projects '))
+
+    def test_no_hooks(self):
+        c = client.Client(base_url=BASE_URL)
+        self.assertEqual(c.hooks, [])
@@ -0,0 +1,107 @@
+
+import threading
+import time
+import unittest
+
+import mock
+
+from ceilometerclient import pipeline
+
+
+class PipelineTests(unittest.TestCase):
+
+    def test_stages_in_order(self):
+        written = []
+        flow = pipeline.Pipeline(range(10), [
+            pipeline.Stage('double', lambda n: (n, n)),
+            pipeline.Stage('square', lambda n: (n * n,)),
+            pipeline.Stage('write', lambda n: written.append(n)),
+        ])
+        flow.run()
+        self.assertEqual(written, [n * n for n in range(10) for _ in '..'])
+        self.assertEqual([(s['stage'], s['items_in'], s['items_out'])
+                          for s in flow.stats()],
+                         [('double', 10, 20), ('square', 20, 20),
+                          ('write', 20, 0)])
+
+    def test_stage_error_raised(self):
+        def fail(n):
+            if n == 3:
+                raise ValueError('bad item')
+            return (n,)
+
+        flow = pipeline.Pipeline(range(1000), [
+            pipeline.Stage('fail', fail, queue_size=2),
+            pipeline.Stage('write', lambda n: None, queue_size=2),
+        ])
+        self.assertRaisesRegexp(ValueError, 'bad item', flow.run)
+
+    def test_source_error_raised(self):
+        def source():
+            yield 1
+            raise IOError('listing failed')
+
+        flow = pipeline.Pipeline(source(), [
+            pipeline.Stage('write', lambda n: None)])
+        self.assertRaisesRegexp(IOError, 'listing failed', flow.run)
+
+    def test_bounded_queues(self):
+        release = threading.Event()
+        produced = []
+
+        def source():
+            for n in range(100):
+                produced.append(n)
+                yield n
+
+        def write(n):
+            release.wait(5)
+
+        flow = pipeline.Pipeline(source(), [
+            pipeline.Stage('pass', lambda n: (n,), queue_size=2),
+            pipeline.Stage('write', write, queue_size=2),
+        ])
+        runner = threading.Thread(target=flow.run)
+        runner.start()
+        runner.join(0.2)
+        # Two queues of two, one item in each stage and one being put.
+        self.assertTrue(len(produced) <= 7)
+        release.set()
+        runner.join(5)
+        self.assertEqual(len(produced), 100)
+        self.assertEqual(max(s['queue_max'] for s in flow.stats()), 2)
+
+    def test_interrupt_stops_stages(self):
+        written = []
+
+        def write(n):
+            time.sleep(0.01)
+            written.append(n)
+
+        interrupts = [KeyboardInterrupt()]
+        real_join = threading.Thread.join
+
+        def join(thread, timeout=None):
+            if interrupts:
+                raise interrupts.pop()
+            return real_join(thread, timeout)
+
+        flow = pipeline.Pipeline(range(1000), [
+            pipeline.Stage('write', write)])
+        with mock.patch.object(threading.Thread, 'join', join):
+            self.assertRaises(KeyboardInterrupt, flow.run)
+        count = len(written)
+        time.sleep(0.05)
+        self.assertEqual(len(written), count)
+        self.assertTrue(count < 1000)
+
+    def test_format_stats(self):
+        flow = pipeline.Pipeline([1], [pipeline.Stage('write', lambda n: ())])
+        flow.run()
+        lines = pipeline.format_stats(flow.stats()).splitlines()
+        self.assertEqual(lines[0].split()[:3], ['stage', 'in', 'out'])
+        self.assertEqual(lines[1].split()[:3], ['write', '1', '0'])
+
+    def test_batches(self):
+        self.assertEqual(list(pipeline.batches(range(5), 2)),
+                         [[0, 1], [2, 3], [4]])
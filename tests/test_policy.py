@@ -0,0 +1,114 @@
+
+import json
+import threading
+import unittest
+
+import mock
+import requests
+
+from ceilometerclient import client
+from ceilometerclient import policy
+
+BASE_URL = u'http://localhost:9000'
+
+
+def response(status=200):
+    return mock.Mock(status_code=status,
+                     content=json.dumps({'projects': ['p1']}).encode())
+
+
+class RequestPolicyTests(unittest.TestCase):
+
+    def setUp(self):
+        sleep = mock.patch('time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_timeout_per_endpoint(self):
+        p = policy.RequestPolicy(
+            timeout=5,
+            endpoints={'/resources/{resource_id}/meters/{meter}':
+                       {'timeout': (1, 30)}})
+        send = mock.Mock(return_value=response())
+        p.send(send, '/projects', {})
+        send.assert_called_with({'timeout': 5})
+        p.send(send, '/resources/r1/meters/cpu', {'params': {}})
+        send.assert_called_with({'timeout': (1, 30), 'params': {}})
+
+    def test_retries_transient_failures(self):
+        p = policy.RequestPolicy(retries=3)
+        send = mock.Mock(side_effect=[requests.exceptions.ReadTimeout(),
+                                      requests.exceptions.ConnectionError(),
+                                      response(503),
+                                      response(200)])
+        self.assertEqual(p.send(send, '/projects', {}).status_code, 200)
+        self.assertEqual(send.call_count, 4)
+        self.assertEqual(self.sleep.call_count, 3)
+        self.assertEqual(p.stats(), {'requests': 1, 'timeouts': 1,
+                                     'errors': 1, 'retries': 3,
+                                     'hedges': 0, 'hedge_wins': 0})
+
+    def test_gives_up(self):
+        p = policy.RequestPolicy(retries=1)
+        send = mock.Mock(side_effect=requests.exceptions.ReadTimeout())
+        self.assertRaises(requests.exceptions.ReadTimeout,
+                          p.send, send, '/projects', {})
+        self.assertEqual(send.call_count, 2)
+        send = mock.Mock(return_value=response(503))
+        self.assertEqual(p.send(send, '/projects', {}).status_code, 503)
+
+    def test_client_errors_not_retried(self):
+        p = policy.RequestPolicy()
+        send = mock.Mock(return_value=response(404))
+        p.send(send, '/projects', {})
+        self.assertEqual(send.call_count, 1)
+
+    def test_backoff_jittered_and_capped(self):
+        p = policy.RequestPolicy(backoff_factor=1, backoff_max=3)
+        delays = [p.backoff(attempt) for attempt in range(10)]
+        self.assertTrue(all(0 <= delay <= 3 for delay in delays))
+        self.assertTrue(len(set(delays)) > 1)
+
+    def test_hedge(self):
+        p = policy.RequestPolicy(hedge_after=0.01)
+        release = threading.Event()
+        slow, fast = response(), response()
+        calls = []
+
+        def send(kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                release.wait(5)
+                return slow
+            return fast
+
+        self.assertIs(p.send(send, '/projects', {}), fast)
+        release.set()
+        self.assertEqual(p.stats()['hedges'], 1)
+        self.assertEqual(p.stats()['hedge_wins'], 1)
+
+    def test_fast_response_not_hedged(self):
+        p = policy.RequestPolicy(hedge_after=5)
+        send = mock.Mock(return_value=response())
+        p.send(send, '/projects', {})
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(p.stats()['hedges'], 0)
+
+
+class ClientPolicyTests(unittest.TestCase):
+
+    def test_policy_applied(self):
+        c = client.Client(base_url=BASE_URL,
+                          policy=policy.RequestPolicy(timeout=2))
+        adapter = c.session.get_adapter(BASE_URL)
+        self.assertEqual(adapter.max_retries.read, 0)
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = response()
+            self.assertEqual(c.get_projects(), ['p1'])
+        getter.assert_called_once_with(BASE_URL + '/v1/projects',
+                                       timeout=2)
+        self.assertEqual(c.policy_stats()['requests'], 1)
+
+    def test_no_policy(self):
+        c = client.Client(base_url=BASE_URL)
+        self.assertEqual(c.policy_stats(), None)
@@ -1,4 +1,6 @@
 
+import datetime
+import json
 import unittest
 
 import mock
@@ -23,22 +25,89 @@ class ProjectTests(unittest.TestCase):
         self.response = mock.Mock()
 
     def test_get_projects(self):
-        self.response.json = {'projects': ['project1', 'project2']}
-        with mock.patch('requests.get') as getter:
+        self.response.content = json.dumps(
+            {'projects': ['project1', 'project2']}).encode('utf-8')
+        with mock.patch('requests.Session.get') as getter:
             getter.return_value = self.response
             prjs = self.c.get_projects()
         self.assertEquals(prjs, ['project1', 'project2'])
 
     def test_get_project_volume_max(self):
-        self.response.json = {'volume': 123}
-        with mock.patch('requests.get') as getter:
+        self.response.content = json.dumps({'volume': 123}).encode('utf-8')
+        with mock.patch('requests.Session.get') as getter:
             getter.return_value = self.response
             volume = self.c.get_project_volume_max('project1', 'meter')
         self.assertEquals(volume, 123)
 
     def test_get_project_volume_sum(self):
-        self.response.json = {'volume': 456}
-        with mock.patch('requests.get') as getter:
+        self.response.content = json.dumps({'volume': 456}).encode('utf-8')
+        with mock.patch('requests.Session.get') as getter:
             getter.return_value = self.response
             volume = self.c.get_project_volume_sum('project1', 'meter')
         self.assertEquals(volume, 456)
+
+    def test_get_project_volume_matrix(self):
+        day1 = (datetime.datetime(2012, 9, 1), datetime.datetime(2012, 9, 2))
+        day2 = (datetime.datetime(2012, 9, 2), datetime.datetime(2012, 9, 3))
+        volumes = {('m1', day1[0]): 1, ('m2', day1[0]): 2,
+                   ('m1', day2[0]): 3, ('m2', day2[0]): 4}
+
+        def get(url, **kwargs):
+            meter = url.split('/')[-3]
+            start = kwargs['params']['start_timestamp']
+            response = mock.Mock()
+            for (m, d), v in volumes.items():
+                if m == meter and d.isoformat() == start:
+                    response.content = json.dumps(
+                        {'volume': v}).encode('utf-8')
+            return response
+
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = get
+            matrix = self.c.get_project_volume_matrix(
+                'project1', ['m1', 'm2'], [day1, day2, day1], workers=2)
+        self.assertEquals(matrix, [[1, 2], [3, 4], [1, 2]])
+        # the repeated window is only fetched once
+        self.assertEquals(getter.call_count, 4)
+
+    def test_get_fleet_volume(self):
+        volumes = {'p1': 10, 'p2': 5, 'p3': None}
+
+        def get(url, **kwargs):
+            project_id = url.split('/')[-5]
+            if project_id == 'p4':
+                raise requests.exceptions.Timeout('p4 timed out')
+            response = mock.Mock(status_code=200)
+            response.content = json.dumps(
+                {'volume': volumes[project_id]}).encode('utf-8')
+            return response
+
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = get
+            fleet = self.c.get_fleet_volume(
+                'm', 'sum', projects=['p1', 'p2', 'p3', 'p4', 'p1', None])
+        self.assertEquals(fleet['volumes'], volumes)
+        self.assertEquals(fleet['total'], 15)
+        self.assertEquals(list(fleet['errors']), ['p4'])
+        self.assertTrue(isinstance(fleet['errors']['p4'],
+                                   requests.exceptions.Timeout))
+        self.assertEquals(getter.call_count, 4)
+
+    def test_get_fleet_volume_max_lists_projects(self):
+        def get(url, **kwargs):
+            response = mock.Mock(status_code=200)
+            if url.endswith('/projects'):
+                body = {'projects': ['p1', 'p2']}
+            else:
+                body = {'volume': int(url.split('/')[-5][1:])}
+            response.content = json.dumps(body).encode('utf-8')
+            return response
+
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = get
+            fleet = self.c.get_fleet_volume('m', 'max')
+        self.assertEquals(fleet, {'volumes': {'p1': 1, 'p2': 2},
+                                  'total': 2, 'errors': {}})
+
+    def test_get_fleet_volume_bad_aggregate(self):
+        self.assertRaises(ValueError, self.c.get_fleet_volume, 'm', 'avg')
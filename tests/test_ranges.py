@@ -0,0 +1,142 @@
+import datetime
+import json
+import unittest
+
+import mock
+import requests
+
+from ceilometerclient import client
+from ceilometerclient import ranges
+
+BASE_URL = u'http://localhost:9000'
+START = datetime.datetime(2012, 9, 1)
+DAY = datetime.timedelta(days=1)
+
+
+class MergeTests(unittest.TestCase):
+
+    def test_concatenate(self):
+        self.assertEqual(ranges.concatenate([[1, 2], [], [3]]), [1, 2, 3])
+
+    def test_add_and_maximum(self):
+        self.assertEqual(ranges.add([1, None, 2.5]), 3.5)
+        self.assertEqual(ranges.maximum([1, None, 2.5]), 2.5)
+        self.assertEqual(ranges.add([None, None]), None)
+        self.assertEqual(ranges.maximum([]), None)
+
+    def test_durations(self):
+        merged = ranges.durations([
+            {'start_timestamp': '2012-09-01T10:00:00',
+             'end_timestamp': '2012-09-01T12:00:00', 'duration': 7200},
+            {'start_timestamp': None, 'end_timestamp': None,
+             'duration': None},
+            {'start_timestamp': '2012-09-02T00:00:00.500000',
+             'end_timestamp': '2012-09-02T01:00:00', 'duration': 3599.5},
+        ])
+        self.assertEqual(merged, {'start_timestamp': '2012-09-01T10:00:00',
+                                  'end_timestamp': '2012-09-02T01:00:00',
+                                  'duration': 54000.0})
+        self.assertEqual(ranges.durations([{}])['duration'], None)
+
+
+class RangePlannerTests(unittest.TestCase):
+
+    def test_windows_cover_range(self):
+        planner = ranges.RangePlanner(window=DAY)
+        windows = list(planner.windows(START, START + 2 * DAY +
+                                       datetime.timedelta(hours=12)))
+        self.assertEqual(windows, [
+            (START, START + DAY),
+            (START + DAY, START + 2 * DAY),
+            (START + 2 * DAY, START + 2 * DAY + datetime.timedelta(hours=12)),
+        ])
+
+    def test_window_adapts(self):
+        planner = ranges.RangePlanner(window=DAY, target_latency=1.0,
+                                      target_size=100)
+        planner.observe(86400, latency=4.0)
+        self.assertEqual(planner.window, datetime.timedelta(hours=12))
+        planner.observe(86400, latency=0.1)
+        self.assertEqual(planner.window, 2 * DAY)
+        planner.observe(86400, latency=0.1, size=125)
+        self.assertEqual(planner.window, datetime.timedelta(hours=19.2))
+
+    def test_window_bounds(self):
+        planner = ranges.RangePlanner(
+            window=DAY, max_window=datetime.timedelta(hours=36))
+        planner.observe(86400, latency=0.0)
+        self.assertEqual(planner.window, datetime.timedelta(hours=36))
+
+    def test_run_merges_in_order(self):
+        planner = ranges.RangePlanner(window=DAY, workers=3)
+        result = planner.run(lambda start, end: [(start, end)],
+                             START, START + 4 * DAY, ranges.concatenate)
+        self.assertEqual([start for start, _ in result],
+                         [START + i * DAY for i in range(4)])
+        self.assertEqual(planner.stats()['requests'], 4)
+
+    def test_split_on_timeout(self):
+        planner = ranges.RangePlanner(window=DAY,
+                                      min_window=datetime.timedelta(hours=6))
+        calls = []
+
+        def fetch(start, end):
+            calls.append(end - start)
+            if end - start > datetime.timedelta(hours=12):
+                raise requests.exceptions.Timeout()
+            return 1
+        self.assertEqual(planner.run(fetch, START, START + DAY, ranges.add),
+                         2)
+        self.assertEqual(calls, [DAY] + [datetime.timedelta(hours=12)] * 2)
+        self.assertEqual(planner.stats()['splits'], 1)
+
+    def test_no_split_below_min_window(self):
+        planner = ranges.RangePlanner(window=DAY, min_window=DAY)
+
+        def fetch(start, end):
+            raise requests.exceptions.Timeout()
+        self.assertRaises(requests.exceptions.Timeout, planner.run, fetch,
+                          START, START + DAY, ranges.add)
+
+
+class ClientPlannerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.c = client.Client(base_url=BASE_URL)
+        self.planner = ranges.RangePlanner(window=DAY, max_window=DAY,
+                                           workers=1)
+
+    def respond(self, body):
+        response = mock.Mock()
+        response.status_code = requests.codes.ok
+        response.content = json.dumps(body).encode('utf-8')
+        return response
+
+    def test_events_fetched_in_windows(self):
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = [self.respond({'events': [i]})
+                                  for i in range(3)]
+            events = self.c.get_events('r', 'm', START, START + 3 * DAY,
+                                       planner=self.planner)
+        self.assertEqual(events, [0, 1, 2])
+        self.assertEqual(
+            [call[1]['params']['start_timestamp']
+             for call in getter.call_args_list],
+            ['2012-09-01T00:00:00', '2012-09-02T00:00:00',
+             '2012-09-03T00:00:00'])
+
+    def test_volumes_merged(self):
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = [self.respond({'volume': v})
+                                  for v in (3, 5, 3, 5)]
+            self.assertEqual(self.c.get_project_volume_sum(
+                'p', 'm', START, START + 2 * DAY, planner=self.planner), 8)
+            self.assertEqual(self.c.get_resource_volume_max(
+                'r', 'm', START, START + 2 * DAY, planner=self.planner), 5)
+
+    def test_open_range_not_split(self):
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.respond({'volume': 1})
+            self.c.get_project_volume_max('p', 'm', START,
+                                          planner=self.planner)
+        self.assertEqual(getter.call_count, 1)
@@ -0,0 +1,95 @@
+
+import unittest
+
+from ceilometerclient import records
+
+EVENTS = [{'resource_id': 'r%d' % (i % 3),
+           'project_id': 'p1',
+           'user_id': 'u1',
+           'counter_name': 'cpu',
+           'counter_type': 'cumulative',
+           'source': '?',
+           'counter_volume': float(i),
+           'timestamp': '2012-09-01T00:00:%02d.500000' % i,
+           'resource_metadata': {'name': 'vm%d' % (i % 3)},
+           }
+          for i in range(10)]
+
+
+class TimestampTests(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(records.parse_timestamp('1970-01-02T00:00:01'),
+                         86401)
+        self.assertEqual(
+            records.parse_timestamp('1970-01-01T00:00:01.250000'), 1.25)
+        self.assertEqual(records.parse_timestamp('1970-01-01T00:00:01Z'), 1)
+        self.assertEqual(records.parse_timestamp(None), None)
+        self.assertRaises(ValueError, records.parse_timestamp, 'yesterday')
+
+    def test_round_trip(self):
+        ts = '2012-09-01T12:34:56.500000'
+        self.assertEqual(
+            records.format_timestamp(records.parse_timestamp(ts)), ts)
+
+
+class EventTests(unittest.TestCase):
+
+    def test_from_dict(self):
+        event = records.Event.from_dict(EVENTS[1])
+        self.assertEqual(event.resource_id, 'r1')
+        self.assertEqual(event.counter_volume, 1.0)
+        self.assertEqual(event.resource_metadata, None)
+        self.assertEqual(records.Event.from_dict(EVENTS[1], metadata=True)
+                         .to_dict(), EVENTS[1])
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(records.Event(), '__dict__'))
+
+
+class ResourceTests(unittest.TestCase):
+
+    def test_from_dict(self):
+        resource = records.Resource.from_dict({
+            'resource_id': 'r1',
+            'project_id': 'p1',
+            'metadata': {'size': 1},
+            'meter': [{'counter_name': 'cpu'}, {'counter_name': 'port'}],
+            })
+        self.assertEqual(resource.meters, ('cpu', 'port'))
+        self.assertEqual(resource.metadata, {'size': 1})
+        self.assertEqual(resource.timestamp, None)
+
+
+class EventBatchTests(unittest.TestCase):
+
+    def setUp(self):
+        self.batch = records.EventBatch.from_events(EVENTS)
+
+    def test_columns(self):
+        self.assertEqual(len(self.batch), 10)
+        self.assertEqual(list(self.batch.volumes), [float(i)
+                                                    for i in range(10)])
+        self.assertEqual(self.batch.timestamps[1] - self.batch.timestamps[0],
+                         1.0)
+        self.assertEqual(list(self.batch.column('resource_id'))[:4],
+                         ['r0', 'r1', 'r2', 'r0'])
+
+    def test_dictionary_encoding(self):
+        self.assertEqual(self.batch.values('resource_id'), ['r0', 'r1', 'r2'])
+        self.assertEqual(list(self.batch.codes('resource_id'))[:4],
+                         [0, 1, 2, 0])
+        self.assertEqual(self.batch.values('project_id'), ['p1'])
+
+    def test_events(self):
+        events = list(self.batch)
+        self.assertEqual(events[3], records.Event.from_dict(EVENTS[3]))
+
+    def test_metadata(self):
+        batch = records.EventBatch.from_events(EVENTS, metadata=True)
+        self.assertEqual(batch[2].to_dict(), EVENTS[2])
+
+    def test_missing_volume(self):
+        batch = records.EventBatch.from_events([{'timestamp': None}])
+        self.assertEqual(batch[0].counter_volume, None)
+        self.assertEqual(batch[0].timestamp, None)
@@ -1,5 +1,6 @@
 
 import datetime
+import json
 import unittest
 
 import mock
@@ -24,13 +25,14 @@ class ResourceTests(unittest.TestCase):
         self.response = mock.Mock()
 
     def test_get_resources(self):
-        self.response.json = {'resources': ['resource1', 'resource2']}
-        with mock.patch('requests.get') as getter:
+        self.response.content = json.dumps(
+            {'resources': ['resource1', 'resource2']}).encode('utf-8')
+        with mock.patch('requests.Session.get') as getter:
             getter.return_value = self.response
             rsrces = self.c.get_resources('project-id')
             getter.assert_called_once_with(
                 '%s/v1/projects/project-id/resources' % BASE_URL,
-                headers={'X-Auth-Token': self.c.ksclient.auth_token},
+                headers={'X-Auth-Token': self.c.keystone_client.auth_token},
                 params={},
                 )
         self.assertEquals(rsrces, ['resource1', 'resource2'])
@@ -38,7 +40,7 @@ class ResourceTests(unittest.TestCase):
 
     def test_get_resources_not_found(self):
         self.response.status_code = requests.codes.not_found
-        with mock.patch('requests.get') as getter:
+        with mock.patch('requests.Session.get') as getter:
             getter.return_value = self.response
             self.assertRaisesRegexp(ValueError, 'project-id',
                                     self.c.get_resources, 'project-id',
@@ -47,13 +49,14 @@ class ResourceTests(unittest.TestCase):
 
     def test_get_resources_with_start_time(self):
         d = datetime.datetime.utcnow()
-        self.response.json = {'resources': ['resource1', 'resource2']}
-        with mock.patch('requests.get') as getter:
+        self.response.content = json.dumps(
+            {'resources': ['resource1', 'resource2']}).encode('utf-8')
+        with mock.patch('requests.Session.get') as getter:
             getter.return_value = self.response
             rsrces = self.c.get_resources('project-id', start_timestamp=d)
             getter.assert_called_once_with(
                 '%s/v1/projects/project-id/resources' % BASE_URL,
-                headers={'X-Auth-Token': self.c.ksclient.auth_token},
+                headers={'X-Auth-Token': self.c.keystone_client.auth_token},
                 params={'start_timestamp': d.isoformat()},
                 )
         self.assertEquals(rsrces, ['resource1', 'resource2'])
@@ -61,13 +64,112 @@ class ResourceTests(unittest.TestCase):
 
     def test_get_resources_with_end_time(self):
         d = datetime.datetime.utcnow()
-        self.response.json = {'resources': ['resource1', 'resource2']}
-        with mock.patch('requests.get') as getter:
+        self.response.content = json.dumps(
+            {'resources': ['resource1', 'resource2']}).encode('utf-8')
+        with mock.patch('requests.Session.get') as getter:
             getter.return_value = self.response
             rsrces = self.c.get_resources('project-id', end_timestamp=d)
             getter.assert_called_once_with(
                 '%s/v1/projects/project-id/resources' % BASE_URL,
-                headers={'X-Auth-Token': self.c.ksclient.auth_token},
+                headers={'X-Auth-Token': self.c.keystone_client.auth_token},
                 params={'end_timestamp': d.isoformat()},
                 )
         self.assertEquals(rsrces, ['resource1', 'resource2'])
+
+    def test_iter_events(self):
+        self.response.status_code = requests.codes.ok
+        self.response.iter_content.return_value = [
+            b'{"events": [{"counter_volume": 1}, ',
+            b'{"counter_volume": 2}]}',
+            ]
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            events = list(self.c.iter_events('resource-id', 'meter'))
+            getter.assert_called_once_with(
+                '%s/v1/resources/resource-id/meters/meter' % BASE_URL,
+                headers={'X-Auth-Token': self.c.keystone_client.auth_token},
+                params={},
+                stream=True,
+                )
+        self.assertEquals(events, [{'counter_volume': 1},
+                                   {'counter_volume': 2}])
+        self.response.close.assert_called_once_with()
+
+    def test_iter_events_windows(self):
+        start = datetime.datetime(2012, 9, 1)
+        end = datetime.datetime(2012, 9, 3, 12)
+        self.response.status_code = requests.codes.ok
+        self.response.iter_content.return_value = [b'{"events": [1]}']
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            events = list(self.c.iter_events(
+                'resource-id', 'meter', start, end,
+                window=datetime.timedelta(days=1)))
+        self.assertEquals(events, [1, 1, 1])
+        self.assertEquals(
+            [(c[1]['params']['start_timestamp'],
+              c[1]['params']['end_timestamp'])
+             for c in getter.call_args_list],
+            [('2012-09-01T00:00:00', '2012-09-02T00:00:00'),
+             ('2012-09-02T00:00:00', '2012-09-03T00:00:00'),
+             ('2012-09-03T00:00:00', '2012-09-03T12:00:00'),
+             ])
+
+    def test_iter_events_default_window(self):
+        start = datetime.datetime(2012, 9, 1)
+        self.response.status_code = requests.codes.ok
+        self.response.iter_content.return_value = [b'{"events": [1]}']
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            events = list(self.c.iter_events(
+                'resource-id', 'meter', start,
+                start + datetime.timedelta(days=2)))
+        self.assertEquals(events, [1, 1])
+        self.assertEquals(getter.call_count, 2)
+
+    def test_iter_events_no_window(self):
+        start = datetime.datetime(2012, 9, 1)
+        self.response.status_code = requests.codes.ok
+        self.response.iter_content.return_value = [b'{"events": [1]}']
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            events = list(self.c.iter_events(
+                'resource-id', 'meter', start,
+                start + datetime.timedelta(days=2), window=None))
+        self.assertEquals(events, [1])
+        self.assertEquals(getter.call_count, 1)
+
+    def test_iter_events_not_found(self):
+        self.response.status_code = requests.codes.not_found
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            self.assertRaisesRegexp(ValueError, 'resource-id', list,
+                                    self.c.iter_events('resource-id', 'm'))
+
+    def test_get_resources_duration_info(self):
+        def get(url, **kwargs):
+            response = mock.Mock(status_code=200)
+            response.content = json.dumps(
+                {'duration': len(url),
+                 'search_offset': kwargs['params']['search_offset'],
+                 }).encode('utf-8')
+            return response
+
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = get
+            info = self.c.get_resources_duration_info(
+                [('r1', 'cpu'), ('r22', 'cpu'), ('r1', 'cpu')],
+                search_offset=5)
+        self.assertEqual(getter.call_count, 2)
+        self.assertEqual(sorted(info), [('r1', 'cpu'), ('r22', 'cpu')])
+        self.assertEqual(info[('r22', 'cpu')]['duration'],
+                         info[('r1', 'cpu')]['duration'] + 1)
+        self.assertEqual(info[('r1', 'cpu')]['search_offset'], 5)
+
+    def test_get_resources_duration_info_not_found(self):
+        self.response.status_code = requests.codes.not_found
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = self.response
+            self.assertRaisesRegexp(ValueError, 'r1',
+                                    self.c.get_resources_duration_info,
+                                    [('r1', 'cpu')])
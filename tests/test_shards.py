@@ -0,0 +1,107 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from ceilometerclient import shards
+from ceilometerclient import writers
+
+
+def count_projects(index, projects):
+    return len(projects) * 10
+
+
+class ShardTests(unittest.TestCase):
+
+    def test_split(self):
+        self.assertEqual(shards.split(['c', 'a', None, 'b', 'a', 'd'], 3),
+                         [['a', 'd'], ['b'], ['c']])
+
+    def test_split_more_shards_than_projects(self):
+        self.assertEqual(shards.split(['a'], 4), [['a']])
+
+    def test_run(self):
+        timings = shards.run(count_projects, [['a', 'b'], ['c']], 2)
+        self.assertEqual([(t['shard'], t['projects'], t['rows'])
+                          for t in timings],
+                         [(0, 2, 20), (1, 1, 10)])
+        self.assertTrue(all(t['seconds'] >= 0 for t in timings))
+
+    def test_merge(self):
+        rows = []
+
+        class Dumper(object):
+            writerow = rows.append
+
+        written = shards.merge([
+            [{'project_id': 'a', 'n': 1}, {'project_id': 'c', 'n': 2}],
+            [{'project_id': 'b', 'n': 3}, {'project_id': 'b', 'n': 4}],
+        ], Dumper())
+        self.assertEqual(written, 4)
+        self.assertEqual([row['n'] for row in rows], [1, 3, 4, 2])
+
+
+class MergeFilesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'export.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, index, projects):
+        with open(shards.path(self.filename, index), 'wb') as output:
+            dumper = writers.CSVWriter(output, ['project_id', 'value'])
+            dumper.writeheader()
+            for project_id in projects:
+                dumper.writerow({'project_id': project_id, 'value': 1})
+            dumper.close()
+
+    def test_merge_files(self):
+        self.write(0, ['a', 'c'])
+        self.write(1, ['b'])
+        written = shards.merge_files(self.filename, 2, 'csv',
+                                     ['project_id', 'value'])
+        self.assertEqual(written, 3)
+        with open(self.filename, 'rb') as f:
+            rows = writers.read_rows(f)
+        self.assertEqual([row['project_id'] for row in rows],
+                         ['a', 'b', 'c'])
+        self.assertEqual(os.listdir(self.tmpdir), ['export.csv'])
+
+    def test_partials_read_as_merged(self):
+        self.write(0, ['a', 'c'])
+        self.write(1, ['b', 'd'])
+        iter_rows = writers.iter_rows
+        read = []
+
+        def rows(fileobj, format):
+            for row in iter_rows(fileobj, format):
+                read.append(row['project_id'])
+                yield row
+
+        class Dumper(writers.CSVWriter):
+
+            def writerow(self, row):
+                # Rows are read no further ahead than one per partial.
+                self.test.assertTrue(len(read) <= self.rows + 2)
+                writers.CSVWriter.writerow(self, row)
+        Dumper.test = self
+
+        with mock.patch.object(writers, 'iter_rows', rows):
+            with mock.patch.dict(writers.FORMATS, {'csv': Dumper}):
+                written = shards.merge_files(self.filename, 2, 'csv',
+                                             ['project_id', 'value'])
+        self.assertEqual(written, 4)
+        self.assertEqual(sorted(read), ['a', 'b', 'c', 'd'])
+
+    def test_format_timings(self):
+        report = shards.format_timings([
+            {'shard': 0, 'projects': 2, 'rows': 5, 'seconds': 1.5},
+        ])
+        self.assertEqual(report, 'shard 0: 2 projects, 5 rows in 1.50s\n'
+                         '1 shards, 5 rows, slowest shard 1.50s\n')
@@ -0,0 +1,162 @@
+
+import datetime
+import json
+import unittest
+
+import mock
+
+from ceilometerclient import client
+from ceilometerclient import store
+
+BASE_URL = u'http://localhost:9000'
+DAY = datetime.timedelta(days=1)
+START = datetime.datetime(2012, 9, 1)
+
+
+class UTC(datetime.tzinfo):
+
+    def utcoffset(self, dt):
+        return datetime.timedelta(0)
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+
+def event(day, volume=1.0):
+    return {'timestamp': (START + day * DAY).isoformat(),
+            'counter_volume': volume}
+
+
+class EventStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.store = store.EventStore()
+
+    def test_empty(self):
+        self.assertEqual(self.store.gaps('r', 'm', START, START + DAY),
+                         [(START, START + DAY)])
+        self.assertEqual(self.store.events('r', 'm', START, START + DAY),
+                         [])
+
+    def test_add_covers_range(self):
+        self.store.add('r', 'm', START, START + 2 * DAY,
+                       [event(0), event(1), event(2)])
+        self.assertEqual(self.store.gaps('r', 'm', START, START + 3 * DAY),
+                         [(START + 2 * DAY, START + 3 * DAY)])
+        # The event at the end of the range belongs to the next one.
+        self.assertEqual(self.store.events('r', 'm', START, START + 3 * DAY),
+                         [event(0), event(1)])
+        self.assertEqual(self.store.gaps('r', 'other', START, START + DAY),
+                         [(START, START + DAY)])
+
+    def test_gaps_between_ranges(self):
+        self.store.add('r', 'm', START + DAY, START + 2 * DAY, [])
+        self.store.add('r', 'm', START + 3 * DAY, START + 4 * DAY, [])
+        self.assertEqual(self.store.gaps('r', 'm', START, START + 5 * DAY),
+                         [(START, START + DAY),
+                          (START + 2 * DAY, START + 3 * DAY),
+                          (START + 4 * DAY, START + 5 * DAY)])
+
+    def test_adjacent_ranges_merged(self):
+        self.store.add('r', 'm', START, START + DAY, [])
+        self.store.add('r', 'm', START + DAY, START + 2 * DAY, [])
+        self.assertEqual(self.store.gaps('r', 'm', START, START + 2 * DAY),
+                         [])
+        self.assertEqual(self.store._db.execute(
+            'SELECT COUNT(*) FROM covered').fetchone()[0], 1)
+
+    def test_add_twice_stores_once(self):
+        self.store.add('r', 'm', START, START + DAY, [event(0)])
+        self.store.add('r', 'm', START, START + DAY, [event(0)])
+        self.assertEqual(self.store.stats()['events'], 1)
+
+    def test_unsettled_range_not_covered(self):
+        now = START + DAY
+        self.store.add('r', 'm', START, START + 2 * DAY,
+                       [event(0), event(0.99), event(1.5)], now=now)
+        self.assertEqual(self.store.gaps('r', 'm', START, START + 2 * DAY),
+                         [(now - self.store.settle, START + 2 * DAY)])
+        self.assertEqual(self.store.events('r', 'm', START, START + 2 * DAY),
+                         [event(0)])
+
+    def test_volume(self):
+        self.store.add('r', 'm', START, START + 3 * DAY,
+                       [event(0, 2.0), event(1, 5.0), event(2, 1.0)])
+        self.assertEqual(self.store.volume('r', 'm', START, START + 2 * DAY),
+                         7.0)
+        self.assertEqual(self.store.volume('r', 'm', START, START + 3 * DAY,
+                                           'max'), 5.0)
+        self.assertEqual(self.store.volume('r', 'x', START, START + DAY),
+                         None)
+
+
+class ClientStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.store = store.EventStore()
+        self.c = client.Client(base_url=BASE_URL, store=self.store)
+        self.events = [event(day * 0.5, day) for day in range(8)]
+
+    def get(self, url, params=None, **kwargs):
+        start = params['start_timestamp']
+        end = params['end_timestamp']
+        events = [e for e in self.events if start <= e['timestamp'] < end]
+        if url.endswith('/volume/sum'):
+            body = {'volume': sum(e['counter_volume'] for e in events)}
+        else:
+            body = {'events': events}
+        return mock.Mock(status_code=200,
+                         content=json.dumps(body).encode('utf-8'))
+
+    def test_get_events_fetches_gaps(self):
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = self.get
+            first = self.c.get_events('r', 'm', START + DAY, START + 2 * DAY)
+            events = self.c.get_events('r', 'm', START, START + 4 * DAY)
+        self.assertEqual(first, self.events[2:4])
+        self.assertEqual(events, self.events)
+        ranges = [(call[1]['params']['start_timestamp'],
+                   call[1]['params']['end_timestamp'])
+                  for call in getter.call_args_list]
+        self.assertEqual(ranges, [
+            ('2012-09-02T00:00:00', '2012-09-03T00:00:00'),
+            ('2012-09-01T00:00:00', '2012-09-02T00:00:00'),
+            ('2012-09-03T00:00:00', '2012-09-05T00:00:00'),
+        ])
+        with mock.patch('requests.Session.get') as getter:
+            self.assertEqual(self.c.get_events('r', 'm', START,
+                                               START + 4 * DAY),
+                             self.events)
+        self.assertEqual(getter.call_count, 0)
+
+    def test_get_events_aware_timestamps(self):
+        start = START.replace(tzinfo=UTC())
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = self.get
+            self.c.get_events('r', 'm', START, START + DAY)
+            events = self.c.get_events('r', 'm', start, start + 2 * DAY)
+        self.assertEqual(events, self.events[:4])
+        self.assertEqual(
+            [call[1]['params']['start_timestamp']
+             for call in getter.call_args_list],
+            ['2012-09-01T00:00:00', '2012-09-02T00:00:00'])
+        self.assertEqual(self.store.gaps('r', 'm', start, start + 2 * DAY),
+                         [])
+
+    def test_open_range_not_stored(self):
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = mock.Mock(
+                status_code=200, content=b'{"events": []}')
+            self.c.get_events('r', 'm', START)
+        self.assertEqual(self.store.stats()['queries'], 0)
+
+    def test_volume_sum_from_store_and_gaps(self):
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = self.get
+            self.c.get_events('r', 'm', START, START + 2 * DAY)
+            total = self.c.get_resource_volume_sum('r', 'm', START,
+                                                   START + 4 * DAY)
+        self.assertEqual(total, sum(range(8)))
+        self.assertEqual(getter.call_args_list[-1][0][0],
+                         BASE_URL + '/v1/resources/r/meters/m/volume/sum')
+        self.assertEqual(getter.call_count, 2)
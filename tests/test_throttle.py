@@ -0,0 +1,158 @@
+
+import json
+import threading
+import unittest
+
+import mock
+import requests
+
+from ceilometerclient import client
+from ceilometerclient import metrics
+from ceilometerclient import throttle
+
+BASE_URL = u'http://localhost:9000'
+
+
+class TokenBucketTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        patcher = mock.patch.object(metrics, 'clock', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sleep = mock.patch('time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_burst_then_rate(self):
+        bucket = throttle.TokenBucket(10, burst=2)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(self.sleep.call_count, 0)
+        bucket.acquire()
+        self.sleep.assert_called_once_with(mock.ANY)
+        self.assertAlmostEqual(self.sleep.call_args[0][0], 0.1)
+        self.assertEqual(bucket.stats()['delayed'], 1)
+
+    def test_refills(self):
+        bucket = throttle.TokenBucket(10, burst=1)
+        bucket.acquire()
+        self.now += 0.2
+        bucket.acquire()
+        self.assertEqual(self.sleep.call_count, 0)
+
+    def test_bad_rate(self):
+        self.assertRaises(ValueError, throttle.TokenBucket, 0)
+
+
+def finished(elapsed, status=200, error=None, started=0.0):
+    request = metrics.Request('/projects')
+    request.started = started
+    request.elapsed = elapsed
+    if error is None:
+        request.response = mock.Mock(status_code=status)
+    request.error = error
+    return request
+
+
+class AdaptiveConcurrencyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.limit = throttle.AdaptiveConcurrency(initial=4, maximum=8)
+
+    def run_requests(self, *requests):
+        for request in requests:
+            self.limit.before(request)
+            self.limit.after(request)
+
+    def test_increases_when_healthy(self):
+        self.run_requests(*[finished(0.1) for _ in range(30)])
+        self.assertEqual(self.limit.limit, 8)
+        self.assertEqual(self.limit.stats()['in_flight'], 0)
+
+    def test_halves_on_server_error(self):
+        self.run_requests(finished(0.1, status=503, started=1e9))
+        self.assertEqual(self.limit.limit, 2)
+
+    def test_halves_on_timeout(self):
+        self.run_requests(finished(
+            1.0, error=requests.exceptions.Timeout(), started=1e9))
+        self.assertEqual(self.limit.limit, 2)
+
+    def test_halves_on_any_error(self):
+        self.run_requests(finished(1.0, error=ValueError(), started=1e9))
+        self.assertEqual(self.limit.limit, 2)
+
+    def test_halves_on_rising_latency(self):
+        self.run_requests(finished(0.1), finished(0.5, started=1e9))
+        self.assertEqual(self.limit.limit, 2)
+
+    def test_once_per_round_trip(self):
+        self.run_requests(finished(0.1, status=500, started=1e9),
+                          finished(0.1, status=500, started=0.0))
+        self.assertEqual(self.limit.limit, 2)
+        self.assertEqual(self.limit.stats()['decreases'], 1)
+
+    def test_not_below_minimum(self):
+        for _ in range(5):
+            self.run_requests(finished(0.1, status=500, started=1e9 + _))
+        self.assertEqual(self.limit.limit, 1)
+
+    def test_blocks_at_limit(self):
+        limit = throttle.AdaptiveConcurrency(initial=1)
+        first = finished(0.1)
+        limit.before(first)
+        second = threading.Thread(target=limit.before,
+                                  args=(finished(0.1),))
+        second.start()
+        second.join(0.05)
+        self.assertTrue(second.is_alive())
+        limit.after(first)
+        second.join(5)
+        self.assertFalse(second.is_alive())
+        self.assertEqual(limit.stats()['waits'], 1)
+
+
+class ClientThrottleTests(unittest.TestCase):
+
+    def test_limits_are_hooks(self):
+        concurrency = throttle.AdaptiveConcurrency()
+        c = client.Client(base_url=BASE_URL, rate_limit=1000,
+                          concurrency_limit=concurrency)
+        response = mock.Mock(status_code=200,
+                             content=json.dumps({'projects': []}).encode())
+        with mock.patch('requests.Session.get') as getter:
+            getter.return_value = response
+            c.get_projects()
+        stats = c.throttle_stats()
+        self.assertEqual(stats['rate_limit']['acquired'], 1)
+        self.assertEqual(stats['concurrency_limit']['in_flight'], 0)
+        self.assertEqual(c.hooks[:2], [c.rate_limit, concurrency])
+
+    def test_slot_released_when_hook_raises(self):
+        concurrency = throttle.AdaptiveConcurrency(initial=2)
+        failing = mock.Mock(spec=metrics.Hook)
+        failing.before.side_effect = RuntimeError('broken hook')
+        c = client.Client(base_url=BASE_URL, concurrency_limit=concurrency,
+                          hooks=[failing])
+        with mock.patch('requests.Session.get') as getter:
+            for _ in range(3):
+                self.assertRaises(RuntimeError, c.get_projects)
+        self.assertFalse(getter.called)
+        self.assertFalse(failing.after.called)
+        self.assertEqual(concurrency.stats()['in_flight'], 0)
+        self.assertEqual(concurrency.limit, 1)
+
+    def test_slot_released_on_any_error(self):
+        concurrency = throttle.AdaptiveConcurrency(initial=2)
+        c = client.Client(base_url=BASE_URL, concurrency_limit=concurrency)
+        with mock.patch('requests.Session.get') as getter:
+            getter.side_effect = ValueError('bad URL')
+            self.assertRaises(ValueError, c.get_projects)
+        self.assertEqual(concurrency.stats()['in_flight'], 0)
+        self.assertEqual(concurrency.limit, 1)
+
+    def test_no_limits(self):
+        c = client.Client(base_url=BASE_URL)
+        self.assertEqual(c.throttle_stats(), {})
+        self.assertEqual(c.hooks, [])
@@ -0,0 +1,43 @@
+import datetime
+import unittest
+
+from ceilometerclient import timestamps
+
+
+class Offset(datetime.tzinfo):
+
+    def __init__(self, hours):
+        self.offset = datetime.timedelta(hours=hours)
+
+    def utcoffset(self, dt):
+        return self.offset
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+
+class ParseTests(unittest.TestCase):
+
+    def test_seconds(self):
+        self.assertEqual(timestamps.parse('2012-09-01T10:20:30'),
+                         datetime.datetime(2012, 9, 1, 10, 20, 30))
+
+    def test_microseconds(self):
+        self.assertEqual(timestamps.parse('2012-09-01T10:20:30.000005'),
+                         datetime.datetime(2012, 9, 1, 10, 20, 30, 5))
+
+    def test_invalid(self):
+        for value in ('2012-09-01', 'yesterday', None):
+            self.assertRaises(ValueError, timestamps.parse, value)
+
+
+class UTCTests(unittest.TestCase):
+
+    def test_naive_unchanged(self):
+        value = datetime.datetime(2012, 9, 1, 10)
+        self.assertEqual(timestamps.utc(value), value)
+
+    def test_aware_converted(self):
+        value = datetime.datetime(2012, 9, 1, 1, tzinfo=Offset(2))
+        self.assertEqual(timestamps.utc(value),
+                         datetime.datetime(2012, 8, 31, 23))
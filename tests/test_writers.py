@@ -0,0 +1,81 @@
+import gzip
+import io
+import unittest
+
+from ceilometerclient import writers
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+FIELDS = ['name', 'count', 'size']
+TYPES = {'count': int, 'size': float}
+ROWS = [{'name': 'a', 'count': 1, 'size': 1.5},
+        {'name': 'b', 'count': 2, 'size': None},
+        {'name': 'c', 'count': 3, 'size': 0.25}]
+
+
+class WriterTests(unittest.TestCase):
+
+    def write(self, format, rows=ROWS, **kwargs):
+        output = io.BytesIO()
+        dumper = writers.FORMATS[format](output, FIELDS, types=TYPES,
+                                         **kwargs)
+        dumper.writeheader()
+        dumper.writerows(rows)
+        dumper.close()
+        output.seek(0)
+        return output
+
+    def test_csv(self):
+        output = self.write('csv')
+        self.assertEqual(output.getvalue(),
+                         b'name,count,size\r\na,1,1.5\r\nb,2,\r\nc,3,0.25\r\n')
+        self.assertEqual(writers.read_rows(output, 'csv')[1],
+                         {'name': 'b', 'count': '2', 'size': ''})
+
+    def test_csv_leaves_file_open(self):
+        output = self.write('csv')
+        self.assertFalse(output.closed)
+
+    def test_gzip_member_per_batch(self):
+        output = self.write('csv.gz', batch_size=2)
+        data = output.getvalue()
+        # header, then batches of two and one rows
+        self.assertEqual(data.count(b'\x1f\x8b\x08'), 3)
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(data)).read(),
+                         self.write('csv').getvalue())
+        self.assertEqual(len(writers.read_rows(output, 'csv.gz')), 3)
+
+    def test_jsonl(self):
+        output = self.write('jsonl')
+        self.assertEqual(writers.read_rows(output, 'jsonl'), ROWS)
+
+    def test_batching(self):
+        output = io.BytesIO()
+        dumper = writers.JSONLinesWriter(output, FIELDS, batch_size=2)
+        dumper.writerow(ROWS[0])
+        self.assertEqual(dumper.tell(), 0)
+        dumper.writerow(ROWS[1])
+        self.assertNotEqual(dumper.tell(), 0)
+        dumper.writerow(ROWS[2])
+        dumper.flush()
+        self.assertEqual(len(output.getvalue().splitlines()), 3)
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        output = self.write('parquet', batch_size=2)
+        self.assertEqual(writers.read_rows(output, 'parquet'), ROWS)
+        self.assertFalse(writers.ParquetWriter.resumable)
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow(self):
+        output = self.write('arrow', batch_size=2)
+        self.assertEqual(writers.read_rows(output, 'arrow'), ROWS)
+
+    def test_guess_format(self):
+        self.assertEqual(writers.guess_format('out.csv.gz'), 'csv.gz')
+        self.assertEqual(writers.guess_format('out.ndjson'), 'jsonl')
+        self.assertEqual(writers.guess_format('out.parquet'), 'parquet')
+        self.assertEqual(writers.guess_format('out'), 'csv')
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""Compare client-side aggregation with a naive loop over event dicts
+
+Computes per-resource hourly count, sum, min, max and average over
+synthetic events with a plain Python loop over the API dicts and with
+ceilometerclient.aggregate, in pure Python and (if installed) NumPy
+mode. Events arrive from the API as dicts, so the end-to-end times,
+which include building the batch, are the ones to compare with the
+naive loop.
+"""
+
+import argparse
+import datetime
+import sys
+import time
+
+from ceilometerclient import aggregate
+from ceilometerclient import records
+
+
+def synthetic_events(count, resources):
+    """One event per resource per minute."""
+    start = datetime.datetime(2012, 9, 1)
+    for i in range(count):
+        yield {'resource_id': 'resource-%06d' % (i % resources),
+               'counter_name': 'network.incoming.bytes',
+               'counter_volume': float(i % 9973),
+               'timestamp': (start + datetime.timedelta(
+                   minutes=i // resources)).isoformat(),
+               }
+
+
+def naive(events):
+    stats = {}
+    for event in events:
+        ts = datetime.datetime.strptime(event['timestamp'],
+                                        '%Y-%m-%dT%H:%M:%S')
+        key = (event['resource_id'], ts.replace(minute=0, second=0))
+        volume = event['counter_volume']
+        s = stats.get(key)
+        if s is None:
+            stats[key] = {'count': 1, 'sum': volume, 'min': volume,
+                          'max': volume}
+        else:
+            s['count'] += 1
+            s['sum'] += volume
+            s['min'] = min(s['min'], volume)
+            s['max'] = max(s['max'], volume)
+    for s in stats.values():
+        s['avg'] = s['sum'] / s['count']
+    return stats
+
+
+def timed(name, func, *args, **kwargs):
+    start = time.time()
+    result = func(*args, **kwargs)
+    elapsed = time.time() - start
+    print('%-24s %.2fs' % (name, elapsed))
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--resources', type=int, default=100)
+    args = parser.parse_args()
+
+    events = list(synthetic_events(args.events, args.resources))
+    naive_stats, naive_time = timed('naive loop', naive, events)
+    batch, build_time = timed('build batch',
+                              records.EventBatch.from_events, events)
+    modes = [False]
+    if aggregate.numpy is not None:
+        modes.append(True)
+    for use_numpy in modes:
+        mode = 'numpy' if use_numpy else 'python'
+        results, aggregate_time = timed('aggregate %s' % mode,
+                                        aggregate.aggregate, batch,
+                                        bucket=3600, use_numpy=use_numpy)
+        assert len(results) == len(naive_stats)
+        total = build_time + aggregate_time
+        print('%-24s %.2fs (%.1fx the naive loop)'
+              % ('end to end %s' % mode, total, naive_time / total))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
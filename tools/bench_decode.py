@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""Compare the speed of the JSON decoding backends
+
+Builds a synthetic /events response body and decodes it repeatedly,
+first the way requests' Response.json() does (decoding the bytes to
+text, then the standard library json module) and then with each
+backend installed, reporting MB/s and events/s.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from ceilometerclient import decoding
+
+
+def make_body(events):
+    start = datetime.datetime(2012, 9, 1)
+    return json.dumps({'events': [
+        {'counter_name': 'cpu',
+         'counter_type': 'cumulative',
+         'counter_volume': i * 1.5,
+         'project_id': 'project-%d' % (i % 10),
+         'resource_id': 'resource-%d' % (i % 100),
+         'resource_metadata': {'display_name': 'vm-%d' % (i % 100),
+                               'flavor': 'm1.small'},
+         'source': 'openstack',
+         'timestamp': (start + datetime.timedelta(seconds=300 * i)
+                       ).isoformat(),
+         'user_id': 'user-%d' % (i % 7)}
+        for i in range(events)]}).encode('utf-8')
+
+
+def requests_json(data):
+    return json.loads(data.decode('utf-8'))
+
+
+def measure(loads, data, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        loads(data)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs per backend; the fastest is reported')
+    args = parser.parse_args()
+
+    data = make_body(args.events)
+    print('%d events, %.1f MB' % (args.events, len(data) / 1048576.0))
+    print('%-16s %9s %9s %12s' % ('backend', 'seconds', 'MB/s', 'events/s'))
+    backends = [('requests', requests_json)] + [
+        (name, decoding.get_decoder(name)) for name in decoding.available()]
+    for name, loads in backends:
+        elapsed = measure(loads, data, args.repeat)
+        print('%-16s %9.3f %9.1f %12.0f' % (
+            name, elapsed, len(data) / 1048576.0 / elapsed,
+            args.events / elapsed))
+
+
+if __name__ == '__main__':
+    main()
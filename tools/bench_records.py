@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""Compare event dicts with the compact record types
+
+Builds the same synthetic events as plain dicts decoded from JSON, as
+Event objects and as an EventBatch, then reports the memory each form
+holds and how fast a per-resource volume total can be computed over it.
+"""
+
+import argparse
+import collections
+import gc
+import json
+import sys
+import time
+
+from ceilometerclient import records
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None  # Python 2: memory is not reported
+
+
+def synthetic_events(count, resources):
+    return json.dumps({'events': [
+        {'resource_id': 'resource-%06d' % (i % resources),
+         'project_id': 'project-%03d' % (i % resources % 50),
+         'user_id': 'user-%03d' % (i % resources % 50),
+         'counter_name': 'network.incoming.bytes',
+         'counter_type': 'cumulative',
+         'source': 'openstack',
+         'counter_volume': i * 1.5,
+         'timestamp': '2012-09-%02dT%02d:%02d:%02d' % (
+             1 + i // 86400 % 28, i // 3600 % 24, i // 60 % 60, i % 60),
+         }
+        for i in range(count)]})
+
+
+def measure(name, build, total):
+    gc.collect()
+    start = time.time()
+    data = build()
+    built = time.time() - start
+    start = time.time()
+    total(data)
+    scanned = time.time() - start
+    del data
+
+    size = None
+    if tracemalloc:
+        # Built a second time, as tracing slows allocation down.
+        gc.collect()
+        tracemalloc.start()
+        data = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del data
+    print('%-12s build=%.2fs scan=%.3fs memory=%s' %
+          (name, built, scanned,
+           'n/a' if size is None else '%.1fMB' % (size / 1e6)))
+
+
+def total_dicts(events):
+    totals = collections.defaultdict(float)
+    for event in events:
+        totals[event['resource_id']] += event['counter_volume']
+    return totals
+
+
+def total_objects(events):
+    totals = collections.defaultdict(float)
+    for event in events:
+        totals[event.resource_id] += event.counter_volume
+    return totals
+
+
+def total_batch(batch):
+    totals = [0.0] * len(batch.values('resource_id'))
+    for code, volume in zip(batch.codes('resource_id'), batch.volumes):
+        totals[code] += volume
+    return dict(zip(batch.values('resource_id'), totals))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=500000)
+    parser.add_argument('--resources', type=int, default=1000)
+    args = parser.parse_args()
+
+    payload = synthetic_events(args.events, args.resources)
+
+    def dicts():
+        return json.loads(payload)['events']
+    measure('dicts', dicts, total_dicts)
+    measure('Event', lambda: [records.Event.from_dict(event)
+                              for event in dicts()],
+            total_objects)
+    measure('EventBatch',
+            lambda: records.EventBatch.from_events(dicts()),
+            total_batch)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
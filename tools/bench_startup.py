@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""Measure the startup time of ceilometer-export
+
+Runs ``ceilometer-export COMMAND --help`` (as ``python -m
+ceilometerclient.cli``) repeatedly in fresh processes and reports the
+median time, beside that of an empty ``python -c pass`` for reference.
+The exit status is 1 if the time added to the interpreter's own startup
+exceeds --target seconds.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def median_time(command, repeat):
+    times = []
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(repeat):
+            start = time.time()
+            subprocess.check_call(command, stdout=devnull, env=env)
+            times.append(time.time() - start)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=11)
+    parser.add_argument('--target', type=float, default=0.075,
+                        help='seconds the tool may add to the startup of '
+                        'the interpreter (default: %(default)s)')
+    args = parser.parse_args()
+
+    baseline = median_time([sys.executable, '-c', 'pass'], args.repeat)
+    print('%-24s %8.3f s' % ('python -c pass', baseline))
+    slow = False
+    for command in ('resources', 'bandwidth'):
+        elapsed = median_time([sys.executable, '-m', 'ceilometerclient.cli',
+                               command, '--help'], args.repeat)
+        added = elapsed - baseline
+        print('%-24s %8.3f s (+%.3f s)' % (command + ' --help', elapsed,
+                                           added))
+        slow = slow or added > args.target
+    if slow:
+        print('Startup exceeds the target of +%.3f s' % args.target)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""Compare serial project volume queries with get_project_volume_matrix
+
+Runs the bandwidth report's queries against a local fake server and
+prints the number of requests issued and the wall-clock time taken.
+"""
+
+import argparse
+import datetime
+import sys
+import time
+
+import ceilometerclient
+
+from fake_ceilometer import FakeCeilometer
+
+METERS = ['akanda.bandwidth:%s.%s.%s' % (category, type_, valuetype)
+          for category in ('internal', 'external')
+          for type_ in ('in', 'out')
+          for valuetype in ('packets', 'bytes')]
+
+
+def serial(ceilometer, windows):
+    for project_id in ceilometer.get_projects():
+        for start_timestamp, end_timestamp in windows:
+            for meter in METERS:
+                ceilometer.get_project_volume_sum(
+                    project_id,
+                    meter,
+                    start_timestamp=start_timestamp,
+                    end_timestamp=end_timestamp,
+                    )
+
+
+def matrix(ceilometer, windows, workers):
+    for project_id in ceilometer.get_projects():
+        ceilometer.get_project_volume_matrix(project_id, METERS, windows,
+                                             workers=workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=5)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='seconds added to each server response')
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    today = datetime.datetime(2012, 10, 1)
+    windows = [(today - datetime.timedelta(days=(i + 1)),
+                today - datetime.timedelta(days=i))
+               for i in range(args.days)]
+
+    with FakeCeilometer(projects=args.projects,
+                        latency=args.latency) as server:
+        ceilometer = ceilometerclient.Client(base_url=server.base_url,
+                                             pool_maxsize=args.workers)
+        for name, run in [('serial', lambda: serial(ceilometer, windows)),
+                          ('matrix', lambda: matrix(ceilometer, windows,
+                                                    args.workers)),
+                          ]:
+            server.reset()
+            start = time.time()
+            run()
+            print('%-8s requests=%-6d wall=%.3fs' %
+                  (name, server.requests, time.time() - start))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+"""Benchmark the client and the export tools against a fake server
+
+Starts tools/fake_ceilometer.py with synthetic data at the requested
+scale and runs each benchmark case in a fresh process, reporting the
+number of API requests issued, the wall-clock time, the peak resident
+set size of the process and the rows (or records) produced per second.
+
+Results can be saved with --save and compared with a saved run with
+--baseline; the exit status is 1 if any case issued more requests, or
+took more time or memory than the tolerance allows.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows
+
+import requests
+
+import ceilometerclient
+from ceilometerclient.cli import bandwidth
+from ceilometerclient.cli import resources
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+
+
+class RowCounter(object):
+    """Stands in for an output writer, counting the rows."""
+
+    def __init__(self):
+        self.rows = 0
+
+    def writerow(self, row):
+        self.rows += 1
+
+
+def _windows(days):
+    today = datetime.datetime(2012, 10, 1)
+    return [(today - datetime.timedelta(days=(i + 1)),
+             today - datetime.timedelta(days=i))
+            for i in range(days)]
+
+
+def _resources(ceilometer):
+    return [resource
+            for project_id in ceilometer.get_projects()
+            for resource in ceilometer.get_resources(project_id)]
+
+
+def bench_get_projects(ceilometer, args):
+    return len(ceilometer.get_projects())
+
+
+def bench_get_resources(ceilometer, args):
+    return len(_resources(ceilometer))
+
+
+def bench_get_events(ceilometer, args):
+    rows = 0
+    for item in _resources(ceilometer)[:args.sample]:
+        rows += len(ceilometer.get_events(
+            item['resource_id'], item['meter'][0]['counter_name']))
+    return rows
+
+
+def bench_iter_events(ceilometer, args):
+    rows = 0
+    for item in _resources(ceilometer)[:args.sample]:
+        for event in ceilometer.iter_events(
+                item['resource_id'], item['meter'][0]['counter_name']):
+            rows += 1
+    return rows
+
+
+def bench_get_resource_duration_info(ceilometer, args):
+    rows = 0
+    for item in _resources(ceilometer):
+        for meter in item['meter']:
+            ceilometer.get_resource_duration_info(item['resource_id'],
+                                                  meter['counter_name'])
+            rows += 1
+    return rows
+
+
+def bench_get_resources_duration_info(ceilometer, args):
+    pairs = [(item['resource_id'], meter['counter_name'])
+             for item in _resources(ceilometer)
+             for meter in item['meter']]
+    return len(ceilometer.get_resources_duration_info(
+        pairs, workers=args.workers))
+
+
+def bench_get_project_volume_matrix(ceilometer, args):
+    windows = _windows(args.days)
+    rows = 0
+    for project_id in ceilometer.get_projects():
+        rows += len(ceilometer.get_project_volume_matrix(
+            project_id, bandwidth.BANDWIDTH_METERS, windows,
+            workers=args.workers))
+    return rows
+
+
+def bench_dump_resources(ceilometer, args):
+    dumper = RowCounter()
+    resources.dump_resources(ceilometer, dumper, args.workers)
+    return dumper.rows
+
+
+def bench_dump_bandwidth(ceilometer, args):
+    dumper = RowCounter()
+    bandwidth.dump_bandwidth(ceilometer, dumper, args.days, args.workers)
+    return dumper.rows
+
+
+CASES = [
+    ('get_projects', bench_get_projects),
+    ('get_resources', bench_get_resources),
+    ('get_events', bench_get_events),
+    ('iter_events', bench_iter_events),
+    ('get_resource_duration_info', bench_get_resource_duration_info),
+    ('get_resources_duration_info', bench_get_resources_duration_info),
+    ('get_project_volume_matrix', bench_get_project_volume_matrix),
+    ('dump_resources', bench_dump_resources),
+    ('dump_bandwidth', bench_dump_bandwidth),
+]
+
+
+def peak_rss():
+    """Returns the peak resident set size of this process in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak  # already in bytes
+    return peak * 1024
+
+
+def server_requests(base_url):
+    return requests.get(base_url + '/_stats').json()['requests']
+
+
+def run_case(name, args):
+    """Runs one case in this process and returns its measurements."""
+    func = dict(CASES)[name]
+    ceilometer = ceilometerclient.Client(base_url=args.base_url,
+                                         pool_maxsize=max(args.workers, 10))
+    before = server_requests(args.base_url)
+    start = time.time()
+    rows = func(ceilometer, args)
+    wall = time.time() - start
+    ceilometer.close()
+    return {
+        'case': name,
+        'requests': server_requests(args.base_url) - before,
+        'wall': wall,
+        'peak_rss': peak_rss(),
+        'rows': rows,
+        'rows_per_second': rows / wall if wall else None,
+    }
+
+
+def start_server(args):
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(TOOLS, 'fake_ceilometer.py'),
+         '--projects', str(args.projects),
+         '--resources', str(args.resources),
+         '--events', str(args.events),
+         '--latency', str(args.latency)],
+        stdout=subprocess.PIPE)
+    base_url = server.stdout.readline().decode('ascii').strip()
+    if not base_url:
+        server.wait()
+        raise RuntimeError('The fake server did not start')
+    return server, base_url
+
+
+def run_in_child(name, base_url, args):
+    command = [sys.executable, os.path.abspath(__file__),
+               '--run-case', name, '--base-url', base_url,
+               '--workers', str(args.workers),
+               '--days', str(args.days),
+               '--sample', str(args.sample)]
+    output = subprocess.check_output(command)
+    return json.loads(output.decode('utf-8'))
+
+
+def compare(results, baseline, tolerance):
+    """Returns a description of each regression from ``baseline``."""
+    regressions = []
+    for result in results:
+        old = baseline.get(result['case'])
+        if old is None:
+            continue
+        if result['requests'] > old['requests']:
+            regressions.append('%s: %d requests, was %d' % (
+                result['case'], result['requests'], old['requests']))
+        for key in ('wall', 'peak_rss'):
+            if (result[key] is not None and old.get(key)
+                    and result[key] > old[key] * (1 + tolerance)):
+                regressions.append('%s: %s %.4g, was %.4g' % (
+                    result['case'], key, result[key], old[key]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=5)
+    parser.add_argument('--resources', type=int, default=20,
+                        help='resources per project')
+    parser.add_argument('--events', type=int, default=1000,
+                        help='events per resource meter')
+    parser.add_argument('--latency', type=float, default=0.002,
+                        help='seconds added to each server response')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--days', type=int, default=7,
+                        help='days covered by the bandwidth cases')
+    parser.add_argument('--sample', type=int, default=20,
+                        help='resources whose events are fetched')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='runs per case; the fastest is reported')
+    parser.add_argument('--case', action='append',
+                        choices=[name for name, _ in CASES],
+                        help='case to run (default: all)')
+    parser.add_argument('--save', metavar='FILE',
+                        help='write the results to FILE as JSON')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='compare with results saved by --save')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative increase in time and '
+                        'memory over the baseline')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args)))
+        return
+
+    server, base_url = start_server(args)
+    results = []
+    try:
+        print('%-28s %8s %9s %9s %9s %12s' % (
+            'case', 'requests', 'wall s', 'rss MB', 'rows', 'rows/s'))
+        for name in args.case or [name for name, _ in CASES]:
+            runs = [run_in_child(name, base_url, args)
+                    for _ in range(args.repeat)]
+            result = min(runs, key=lambda run: run['wall'])
+            result['peak_rss'] = max(run['peak_rss'] for run in runs)
+            results.append(result)
+            print('%-28s %8d %9.3f %9.1f %9d %12.0f' % (
+                name, result['requests'], result['wall'],
+                (result['peak_rss'] or 0) / 1048576.0, result['rows'],
+                result['rows_per_second'] or 0))
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'results': results}, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = dict((result['case'], result)
+                            for result in json.load(f)['results'])
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print('REGRESSION %s' % regression)
+        if regressions:
+            return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""A fake ceilometer v1 API server for local benchmarks
+
+Serves synthetic projects, resources and events at a configurable
+scale. Run it on its own with::
+
+    python fake_ceilometer.py --projects 10 --resources 100 --events 1000
+
+which prints the base URL to use and serves until interrupted.
+"""
+
+import argparse
+import datetime
+import json
+import sys
+import threading
+import time
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+# The meter each synthetic resource is listed with, in rotation, and the
+# metadata the tools read for it.
+RESOURCE_KINDS = [
+    ('instance:m1.small', {'name': 'instance', 'display_name': 'vm'}),
+    ('volume.size', {'name': 'volume', 'display_name': 'disk',
+                     'size': 10}),
+    ('image.size', {'name': 'image', 'size': 1024}),
+    ('network', {'name': 'net'}),
+    ('subnet', {'name': 'subnet', 'network_id': 'net-0',
+                'cidr': '10.0.0.0/24'}),
+    ('port', {'name': 'port', 'network_id': 'net-0',
+              'mac_address': 'fa:16:3e:00:00:01',
+              'fixed_ips': [{'ip_address': '10.0.0.2'}]}),
+]
+
+
+def _parse_timestamp(value):
+    for fmt in ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S'):
+        try:
+            return datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise ValueError('Invalid timestamp %r' % value)
+
+
+def _seed(*parts):
+    return zlib.crc32('/'.join(parts).encode('utf-8')) & 0xffff
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        if url.path == '/_stats':
+            status, body = 200, {'requests': fake.requests}
+        else:
+            fake.count_request(self.path)
+            if fake.latency:
+                time.sleep(fake.latency)
+            params = dict((key, values[-1]) for key, values
+                          in parse_qs(url.query).items())
+            status, body = fake.handle(url.path, params)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeCeilometer(object):
+    """Serves synthetic data for ``projects`` projects with ``resources``
+    resources each, and ``events`` events per resource meter, one every
+    ``interval`` seconds from ``start``.
+
+    ``latency`` seconds are added to every response. The number of
+    requests served is kept in ``requests``, and also served as JSON at
+    ``/_stats`` (which is not counted).
+    """
+
+    def __init__(self, projects=10, resources=10, events=100, latency=0.0,
+                 port=0, start=datetime.datetime(2012, 9, 1),
+                 interval=300):
+        self.projects = ['project-%d' % i for i in range(projects)]
+        self.resources_per_project = resources
+        self.events = events
+        self.start_timestamp = start
+        self.interval = interval
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', port), _Handler)
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:%d' % self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        """Serves requests in the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count_request(self, path):
+        with self._lock:
+            self.requests += 1
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+
+    # Synthetic data
+
+    def _project_index(self, project_id):
+        try:
+            return self.projects.index(project_id)
+        except ValueError:
+            return None
+
+    def _resource(self, resource_id):
+        """Returns the (project_id, index) of a resource, or None."""
+        project_id, sep, index = resource_id.rpartition('-resource-')
+        if (not sep or self._project_index(project_id) is None
+                or not index.isdigit()
+                or int(index) >= self.resources_per_project):
+            return None
+        return project_id, int(index)
+
+    def resource(self, project_id, index):
+        meter, metadata = RESOURCE_KINDS[index % len(RESOURCE_KINDS)]
+        return {
+            'resource_id': '%s-resource-%d' % (project_id, index),
+            'project_id': project_id,
+            'user_id': 'user-%d' % (index % 3),
+            'timestamp': self.start_timestamp.isoformat(),
+            'metadata': dict(metadata),
+            'meter': [{'counter_name': meter}],
+        }
+
+    def iter_events(self, resource_id, meter, params):
+        """Yields the events of a resource meter inside the time range in
+        ``params``.
+        """
+        project_id, _ = self._resource(resource_id)
+        seed = _seed(resource_id, meter)
+        first = 0
+        last = self.events
+        if params.get('start_timestamp'):
+            start = _parse_timestamp(params['start_timestamp'])
+            offset = (start - self.start_timestamp).total_seconds()
+            first = max(first, int(-(-offset // self.interval)))
+        if params.get('end_timestamp'):
+            end = _parse_timestamp(params['end_timestamp'])
+            offset = (end - self.start_timestamp).total_seconds()
+            last = min(last, int(-(-offset // self.interval)))
+        for i in range(first, last):
+            timestamp = (self.start_timestamp +
+                         datetime.timedelta(seconds=i * self.interval))
+            yield {
+                'resource_id': resource_id,
+                'project_id': project_id,
+                'user_id': 'user-%d' % (seed % 3),
+                'counter_name': meter,
+                'counter_type': 'gauge',
+                'counter_volume': (seed + i * 37) % 1000,
+                'source': 'fake',
+                'timestamp': timestamp.isoformat(),
+                'resource_metadata': {},
+            }
+
+    def handle(self, path, params=None):
+        """Returns the status and body of a GET of ``path``."""
+        params = params or {}
+        parts = path.strip('/').split('/')
+        if parts[:1] != ['v1']:
+            return 404, {}
+        parts = parts[1:]
+        if parts == ['projects']:
+            return 200, {'projects': self.projects}
+
+        if parts[:1] == ['projects'] and len(parts) > 1:
+            project_id = parts[1]
+            if self._project_index(project_id) is None:
+                return 404, {}
+            if parts[2:] == ['resources']:
+                return 200, {'resources': [
+                    self.resource(project_id, i)
+                    for i in range(self.resources_per_project)]}
+            if (len(parts) == 6 and parts[2] == 'meters'
+                    and parts[4] == 'volume' and parts[5] in ('sum', 'max')):
+                # Bandwidth and other project meters are not backed by
+                # resources; their values only depend on the query.
+                query = ['%s=%s' % item for item in sorted(params.items())]
+                return 200, {'volume': _seed(path, *query) % 1000}
+            return 404, {}
+
+        if parts[:1] == ['resources'] and len(parts) >= 4:
+            if parts[2] != 'meters' or self._resource(parts[1]) is None:
+                return 404, {}
+            resource_id, meter = parts[1], parts[3]
+            events = self.iter_events(resource_id, meter, params)
+            rest = parts[4:]
+            if not rest:
+                return 200, {'events': list(events)}
+            if rest == ['duration']:
+                timestamps = [event['timestamp'] for event in events]
+                if not timestamps:
+                    return 200, {'start_timestamp': None,
+                                 'end_timestamp': None, 'duration': None}
+                duration = (_parse_timestamp(timestamps[-1]) -
+                            _parse_timestamp(timestamps[0]))
+                return 200, {'start_timestamp': timestamps[0],
+                             'end_timestamp': timestamps[-1],
+                             'duration': duration.total_seconds()}
+            if rest in (['volume', 'sum'], ['volume', 'max']):
+                volumes = [event['counter_volume'] for event in events]
+                if not volumes:
+                    return 200, {'volume': None}
+                return 200, {'volume': (sum(volumes) if rest[1] == 'sum'
+                                        else max(volumes))}
+        return 404, {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=10)
+    parser.add_argument('--resources', type=int, default=10,
+                        help='resources per project')
+    parser.add_argument('--events', type=int, default=100,
+                        help='events per resource meter')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to each response')
+    parser.add_argument('--port', type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeCeilometer(projects=args.projects,
+                            resources=args.resources,
+                            events=args.events,
+                            latency=args.latency,
+                            port=args.port)
+    print(server.base_url)
+    sys.stdout.flush()
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    sys.exit(main())